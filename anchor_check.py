@@ -0,0 +1,297 @@
+"""
+LG Art Director System v5.9.0 - Biometric Anchor Checker
+§2.1 BIOMETRIC ANCHOR 점검 (SetDocument 기준) - 세트마다 다른 앵커 조합, HEADER_JSON biometric_ids = SET 01 앵커,
+Image 1/Image 2 프롬프트의 앵커 묘사, 배치에서는 project_id별 조합 색인으로 패키지 사이 재사용까지 보고
+위반한 세트만 새 앵커로 다시 생성 (fanout.regenerate_set), HEADER_JSON biometric_ids는 SET 01 기준으로 로컬에서 맞춤
+"""
+
+import random
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+from cast_planner import ANCHORS_PER_SET, BIOMETRIC_IDS, CAST_MODE_LOOKBOOK
+from fanout import FANOUT_WORKERS, regenerate_set
+
+# 앵커가 묘사돼야 하는 이미지 프롬프트 (§2.1 세트 내 두 이미지 일관성)
+IMAGE_PROMPT_KINDS = ("image1", "image2")
+
+# 식별자 비교에서 빼는 수식어 ("Small mole under left eye" = mole_under_left_eye)
+ANCHOR_STOPWORDS = frozenset(
+    ("a", "an", "the", "on", "in", "of", "with", "and", "small", "subtle", "slight", "distinctive", "unique",
+     "naturally", "natural", "defined", "structure")
+)
+
+# 단어 비교 길이 (asymmetric/asymmetry, freckle/freckles, widow's/widows를 같은 단어로)
+STEM_CHARS = 5
+
+# §2.1 풀에서 만들 수 있는 세트 앵커 조합 (15개 중 2개 = 105)
+ALL_COMBOS = tuple(frozenset(combo) for combo in combinations(BIOMETRIC_IDS, ANCHORS_PER_SET))
+
+ISSUE_MISSING = "missing"
+ISSUE_UNKNOWN = "unknown"
+ISSUE_DUPLICATE = "duplicate"
+ISSUE_LOOKBOOK = "lookbook"
+ISSUE_HEADER = "header"
+ISSUE_PROMPT = "prompt"
+ISSUE_REUSED = "reused"
+
+_WORD_RE = re.compile(r"[a-z]+")
+_ID_ORDER = {anchor: index for index, anchor in enumerate(BIOMETRIC_IDS)}
+
+
+def _stems(text) -> frozenset:
+    words = _WORD_RE.findall((text or "").lower().replace("'", "").replace("_", " "))
+    return frozenset(word[:STEM_CHARS] for word in words if word not in ANCHOR_STOPWORDS)
+
+
+_ID_STEMS = {anchor: _stems(anchor) for anchor in BIOMETRIC_IDS}
+
+
+def anchor_id(text) -> str:
+    """앵커 표기("Small mole under left eye", "mole_under_left_eye") → 풀 식별자, 풀에 없으면 snake_case 원문"""
+    stems = _stems(text)
+    for anchor, required in _ID_STEMS.items():
+        if required <= stems:
+            return anchor
+    return "_".join(_WORD_RE.findall((text or "").lower()))
+
+
+def mentions(prompt_text, anchor) -> bool:
+    """프롬프트에 앵커 묘사가 있는지 (식별자 단어가 모두 등장)"""
+    return (_ID_STEMS.get(anchor) or _stems(anchor)) <= _stems(prompt_text)
+
+
+def ordered(combo) -> tuple:
+    """조합 → 풀 순서 튜플 (요청 줄/표시용)"""
+    return tuple(sorted(combo, key=lambda anchor: (_ID_ORDER.get(anchor, len(_ID_ORDER)), anchor)))
+
+
+def fresh_anchors(taken, counts=None, seed="") -> tuple:
+    """taken에 없는 조합 중 가장 적게 쓴 것 (같으면 seed 고정 순서) - 남은 조합이 없으면 ()"""
+    order = list(ALL_COMBOS)
+    random.Random(f"anchors:{seed}").shuffle(order)
+    counts = counts or {}
+    candidates = [combo for combo in order if combo not in taken]
+    if not candidates:
+        return ()
+    return ordered(min(candidates, key=lambda combo: counts.get(combo, 0)))
+
+
+class AnchorIssue:
+    """§2.1 위반 하나 - 세트 번호, 종류(ISSUE_*), 설명"""
+
+    __slots__ = ("set_no", "kind", "detail")
+
+    def __init__(self, set_no, kind, detail):
+        self.set_no = set_no
+        self.kind = kind
+        self.detail = detail
+
+    def __str__(self):
+        return f"SET {self.set_no:02d} {self.detail}"
+
+
+class AnchorReport:
+    """문서 점검 결과 - 세트별 앵커 조합(frozenset)과 위반 목록"""
+
+    __slots__ = ("anchors", "issues", "lookbook")
+
+    def __init__(self, anchors, issues, lookbook=False):
+        self.anchors = anchors
+        self.issues = issues
+        self.lookbook = lookbook
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    @property
+    def sets(self) -> list:
+        """다시 생성할 세트 번호 (오름차순, HEADER 불일치는 세트를 다시 만들지 않고 헤더를 고침)"""
+        return sorted({issue.set_no for issue in self.issues if issue.kind != ISSUE_HEADER})
+
+    def for_set(self, set_no) -> list:
+        return [issue for issue in self.issues if issue.set_no == set_no]
+
+
+def check_document(doc, lookbook=None, index=None, project_id="") -> AnchorReport:
+    """SetDocument §2.1 점검 - index(AnchorIndex)를 주면 같은 project_id의 다른 패키지와 조합 재사용도 점검
+
+    lookbook이 None이면 HEADER_JSON cast_mode로 판단 (룩북은 모든 세트가 SET 01 앵커를 공유해야 함).
+    """
+    header = doc.header if isinstance(doc.header, dict) else {}
+    if lookbook is None:
+        lookbook = header.get("cast_mode") == CAST_MODE_LOOKBOOK
+    anchors = {entry.number: frozenset(anchor_id(text) for text in entry.anchors) for entry in doc.sets}
+    issues = []
+    seen = {}
+    first = anchors.get(1) or (anchors[min(anchors)] if anchors else frozenset())
+
+    for entry in doc.sets:
+        combo = anchors[entry.number]
+        if not combo:
+            issues.append(AnchorIssue(entry.number, ISSUE_MISSING, "Primary Biometric Anchor 없음"))
+            continue
+        unknown = sorted(anchor for anchor in combo if anchor not in _ID_STEMS)
+        if unknown:
+            issues.append(AnchorIssue(entry.number, ISSUE_UNKNOWN, f"§2.1 풀에 없는 식별자 {', '.join(unknown)}"))
+        if lookbook:
+            if combo != first:
+                issues.append(AnchorIssue(entry.number, ISSUE_LOOKBOOK, "룩북인데 SET 01과 다른 앵커"))
+        elif combo in seen:
+            issues.append(AnchorIssue(entry.number, ISSUE_DUPLICATE, f"SET {seen[combo]:02d}과 같은 앵커 조합"))
+        else:
+            seen[combo] = entry.number
+        for kind in IMAGE_PROMPT_KINDS:
+            prompt = entry.prompt(kind)
+            if prompt is None:
+                continue
+            missing = [anchor for anchor in ordered(combo) if not mentions(prompt, anchor)]
+            if missing:
+                issues.append(AnchorIssue(entry.number, ISSUE_PROMPT, f"{kind} 프롬프트에 앵커 묘사 없음 ({', '.join(missing)})"))
+
+    header_ids = header.get("biometric_ids")
+    if isinstance(header_ids, list) and first:
+        header_combo = frozenset(anchor_id(str(text)) for text in header_ids)
+        if header_combo != first:
+            issues.append(AnchorIssue(1, ISSUE_HEADER, "HEADER_JSON biometric_ids가 SET 01 앵커와 다름"))
+
+    if index is not None:
+        combos = [first] if lookbook else [anchors[set_no] for set_no in sorted(anchors)]
+        for combo in combos:
+            if combo and index.reused(project_id, combo):
+                set_no = seen.get(combo, 1)
+                issues.append(AnchorIssue(set_no, ISSUE_REUSED, "같은 project_id의 다른 패키지에서 쓴 앵커 조합"))
+    return AnchorReport(anchors, issues, lookbook)
+
+
+def replacement_anchors(report, set_no, taken, index=None, project_id="") -> tuple:
+    """위반 세트에 새로 줄 앵커 - 룩북은 SET 01 앵커, 프롬프트 묘사만 빠졌으면 기존 앵커, 그 밖에는 안 쓴 조합
+
+    taken(set)에는 이 문서에서 이미 쓰는 조합이 들어 있고 고른 조합을 추가한다.
+    """
+    kinds = {issue.kind for issue in report.for_set(set_no)}
+    if report.lookbook and set_no != 1 and report.anchors.get(1):
+        return ordered(report.anchors[1])
+    current = report.anchors.get(set_no, frozenset())
+    if kinds <= {ISSUE_PROMPT, ISSUE_HEADER}:
+        return ordered(current)
+    if index is not None:
+        anchors = index.pick(project_id, taken)
+    else:
+        anchors = fresh_anchors(taken, seed=project_id)
+    if anchors:
+        taken.add(frozenset(anchors))
+    return anchors or ordered(current)
+
+
+def repair_note(issues) -> str:
+    """재생성 요청 메모 - 위반 내용 + 앵커를 Image 1/Image 2에 묘사하라는 지시"""
+    details = "; ".join(issue.detail for issue in issues)
+    return (
+        f"§2.1 BIOMETRIC ANCHOR 위반: {details}. "
+        "Biometric_Anchor 값을 Primary Biometric Anchor 줄과 Image 1/Image 2 프롬프트에 그대로 묘사하세요."
+    )
+
+
+def sync_header(doc) -> bool:
+    """HEADER_JSON biometric_ids를 SET 01 앵커로 맞춤 (§9.2 "Set 01 기준") - 바꿨으면 True"""
+    entry = doc.get(1)
+    if entry is None or not entry.anchors or not isinstance(doc.header, dict):
+        return False
+    anchors = list(ordered(frozenset(anchor_id(text) for text in entry.anchors)))
+    current = doc.header.get("biometric_ids")
+    if isinstance(current, list) and frozenset(anchor_id(str(text)) for text in current) == frozenset(anchors):
+        return False
+    doc.update_header(biometric_ids=anchors)
+    return True
+
+
+def repair_anchors(doc, report, generate_set, combined_prompt, plan=None, index=None, project_id="",
+                   workers=FANOUT_WORKERS):
+    """위반 세트만 새 앵커로 동시에 다시 생성해 문서에 제자리 교체 - (교체한 세트 번호 목록, {세트: 오류})
+
+    generate_set(prompt)는 응답 텍스트를 돌려주는 단발 생성 함수 (fanout.fan_out과 같은 형태).
+    룩북은 SET 01 앵커를 먼저 정하고(바뀌면 새 조합) 그 앵커와 다른 세트를 모두 같은 앵커로 다시 생성한다.
+    세트 교체 후 HEADER_JSON biometric_ids를 SET 01 앵커로 맞춘다 (API 호출 없음).
+    """
+    taken = {combo for combo in report.anchors.values() if combo}
+    jobs = []
+    if report.lookbook and doc.get(1) is not None:
+        first = replacement_anchors(report, 1, taken, index, project_id) if 1 in report.sets else ordered(report.anchors[1])
+        for entry in doc.sets:
+            issues = [issue for issue in report.for_set(entry.number) if issue.kind != ISSUE_HEADER]
+            if not issues and report.anchors.get(entry.number) == frozenset(first):
+                continue
+            issues = issues or [AnchorIssue(entry.number, ISSUE_LOOKBOOK, "룩북 SET 01 앵커 변경")]
+            jobs.append((entry.number, first, repair_note(issues)))
+    else:
+        for set_no in report.sets:
+            if doc.get(set_no) is None:
+                continue
+            anchors = replacement_anchors(report, set_no, taken, index, project_id)
+            jobs.append((set_no, anchors, repair_note(report.for_set(set_no))))
+    if not jobs:
+        sync_header(doc)
+        return [], {}
+
+    def run(set_no, anchors, note):
+        regenerate_set(generate_set, doc, set_no, combined_prompt, plan, note, anchors=anchors)
+
+    repaired, failed = [], {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs))), thread_name_prefix="lgad-anchor") as pool:
+        futures = {set_no: pool.submit(run, set_no, anchors, note) for set_no, anchors, note in jobs}
+        for set_no, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed[set_no] = f"{type(e).__name__}: {e}"
+            else:
+                repaired.append(set_no)
+    sync_header(doc)
+    return repaired, failed
+
+
+class AnchorIndex:
+    """project_id → 앵커 조합 사용 수 (frozenset 해시 색인) - 배치 워커 스레드가 공유
+
+    조합은 105개뿐이라 수백 패키지에서 모두 다르게 쓸 수는 없으므로, 안 쓴 조합이 남아 있는 동안만 재사용을 위반으로 보고
+    새 앵커는 가장 적게 쓴 조합부터 고른다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._projects = {}
+
+    def _counts(self, project_id) -> Counter:
+        return self._projects.setdefault(project_id or "", Counter())
+
+    def reused(self, project_id, combo) -> bool:
+        with self._lock:
+            counts = self._counts(project_id)
+            return counts[combo] > 0 and len(counts) < len(ALL_COMBOS)
+
+    def add(self, project_id, combos) -> None:
+        with self._lock:
+            counts = self._counts(project_id)
+            for combo in combos:
+                if combo:
+                    counts[frozenset(combo)] += 1
+
+    def add_report(self, project_id, report) -> None:
+        """점검한 문서의 조합 등록 (룩북은 패키지당 한 조합)"""
+        combos = [report.anchors.get(1)] if report.lookbook else list(report.anchors.values())
+        self.add(project_id, combos)
+
+    def pick(self, project_id, taken) -> tuple:
+        with self._lock:
+            counts = dict(self._counts(project_id))
+        return fresh_anchors(taken, counts, seed=project_id)
+
+    def stats(self, project_id) -> dict:
+        with self._lock:
+            counts = self._counts(project_id)
+            return {"combos": len(counts), "uses": sum(counts.values()), "pool": len(ALL_COMBOS)}
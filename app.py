@@ -1,18 +1,73 @@
 ﻿import streamlit as st
-import google.generativeai as genai
 import json
-import re
 import os
-import hashlib
-from datetime import datetime
+import time
+import uuid
+from functools import partial
+from types import SimpleNamespace
 
 try:
-    from prompt import LG_SYSTEM_PROMPT
+    from prompt import current_prompt, get_prompt_version, slice_prompt
     PROMPT_AVAILABLE = True
 except ImportError:
-    LG_SYSTEM_PROMPT = "LG Art Director System v5.8 System Prompt Placeholder"
     PROMPT_AVAILABLE = False
 
+    def current_prompt():
+        return SimpleNamespace(
+            text="LG Art Director System v5.8 System Prompt Placeholder",
+            hash="placeholder",
+            version_id="placeholder",
+        )
+
+    def get_prompt_version(version_id):
+        return None
+
+    def slice_prompt(version, settings, texts=(), enabled=None):
+        return version, None
+
+from backend import fake_backend_enabled, fingerprint_key, get_backend
+from climate import SEASON_LIGHTING
+from client_pool import get_request_limiter
+from fanout import requested_sets
+from generation import ChatTurn, fanout_generator, run_chat_turn, run_set_regeneration
+from history import build_chat_history, compact_history, resolve_token_budget
+from input_gate import ACTION_BLOCK, ACTION_SANITIZE, gate_input
+from jobs import (
+    KIND_REGENERATE,
+    STATUS_CANCELLED,
+    STATUS_DONE,
+    STATUS_ERROR,
+    STATUS_INTERRUPTED,
+    get_job_queue,
+)
+from model_catalog import MODEL_OPTIONS, get_model_catalog
+from package_store import get_package_store, job_package_key, store_enabled, update_package
+from render_cache import SHOW_MORE_STEP, VISIBLE_MESSAGES, get_artifact, percentile
+from request_builder import (
+    CITY_OPTIONS,
+    OUTPUT_MODE_PROSE,
+    OUTPUT_MODES,
+    REGION_OPTIONS,
+    build_combined_prompt,
+    default_settings,
+    format_target_date,
+)
+from response_cache import DEFAULT_VARIANTS, MAX_VARIANTS, get_response_cache, response_key
+from schema_validator import format_errors
+from structured_output import generation_config_for, generation_overrides
+from set_document import assistant_message
+from streaming import format_metrics
+from telemetry import (
+    SOURCE_APP,
+    STATUS_BLOCKED,
+    export_csv,
+    format_summary,
+    get_ledger,
+    make_entry,
+    record_turn,
+    telemetry_enabled,
+)
+
 APP_TITLE = "LG Art Director System v5.9.0"
 APP_CAPTION = "🚀 Editorial Story Arc + Auto-Balance System Integrator"
 SYSTEM_GREETING = (
@@ -21,84 +76,10 @@ SYSTEM_GREETING = (
     "예시: `카멜 코트, 모던한 분위기, 미술관 프리오프닝 데이`"
 )
 
-MODEL_OPTIONS = [
-    "gemini-2.0-flash",
-    "gemini-2.0-flash-001",
-    "gemini-2.0-flash-lite",
-    "gemini-2.5-flash",
-    "gemini-2.5-pro",
-    "gemini-flash-latest",
-    "gemini-pro-latest",
-]
-
-MODEL_EXCLUDE_TOKENS = (
-    "image",
-    "audio",
-    "tts",
-    "native",
-    "preview",
-    "exp",
-    "embedding",
-    "gemma",
-    "nano",
-    "aqa",
-    "imagen",
-    "veo",
-    "robotics",
-)
-
-REGION_OPTIONS = ["EU", "LATAM"]
 REGION_LABELS = {
     "EU": "EU(유럽)",
     "LATAM": "LATAM(라틴아메리카)",
 }
-CITY_OPTIONS = {
-    "EU": [
-        "Paris (파리)",
-        "London (런던)",
-        "Rome (로마)",
-        "Barcelona (바르셀로나)",
-        "Amsterdam (암스테르담)",
-        "Berlin (베를린)",
-        "Prague (프라하)",
-        "Vienna (비엔나)",
-        "Madrid (마드리드)",
-        "Florence (피렌체)",
-        "Venice (베네치아)",
-        "Lisbon (리스본)",
-        "Athens (아테네)",
-        "Munich (뮌헨)",
-        "Budapest (부다페스트)",
-        "Brussels (브뤼셀)",
-        "Zurich (취리히)",
-        "Copenhagen (코펜하겐)",
-        "Lyon (리옹)",
-        "Krakow (크라쿠프)",
-    ],
-    "LATAM": [
-        "Mexico City (멕시코시티)",
-        "Sao Paulo (상파울루)",
-        "Buenos Aires (부에노스아이레스)",
-        "Rio de Janeiro (리우데자네이루)",
-        "Bogota (보고타)",
-        "Lima (리마)",
-        "Santiago (산티아고)",
-        "Medellin (메데인)",
-        "Cusco (쿠스코)",
-        "Havana (아바나)",
-        "Cartagena (카르타헤나)",
-        "Quito (키토)",
-        "Panama City (파나마시티)",
-        "Montevideo (몬테비데오)",
-        "San Jose (산호세)",
-        "La Paz (라파스)",
-        "Cancun (칸쿤)",
-        "San Juan (산후안)",
-        "Brasilia (브라질리아)",
-        "Guadalajara (과달라하라)",
-    ],
-}
-
 GENDER_OPTIONS = ["FEMALE", "MALE", "NON_BINARY"]
 GENDER_LABELS = {
     "FEMALE": "여성",
@@ -168,24 +149,33 @@ ASPECT_RATIO_LABELS = {
     "1:1": "1:1 (정사각)",
 }
 
-JSON_BLOCK_RE = re.compile(r"```json\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
-
-
-def default_settings():
-    return {
-        "project_id": "LG_AD_2026_CAMPAIGN_01",
-        "region": "EU",
-        "city": CITY_OPTIONS["EU"][0],
-        "target_date": datetime.today().date(),
-        "age": 35,
-        "gender": "FEMALE",
-        "occupation": "직업 없음",
-        "ethnicity": "",
-        "cast_mode": "SINGLE",
-        "family_count": 3,
-        "diversity_mode": "SAFE",
-        "aspect_ratio": "4:5",
-    }
+OUTPUT_MODE_LABELS = {
+    "PROSE": "프로즈 + JSON",
+    "JSON": "구조화 JSON",
+    "JSON_PROSE": "구조화 JSON + SET 본문",
+}
+
+# 디버그 패널에 보관할 rerun 시간 샘플 수
+RERUN_SAMPLES = 50
+
+# 생성 작업 진행 상황 폴링 간격(초)
+JOB_POLL_INTERVAL = 0.1
+
+# 저장된 패키지 검색 - 결과 최대 SET 수, 필터 (컬럼 → 라벨, 선택지)
+PACKAGE_SEARCH_LIMIT = 30
+PACKAGE_FILTERS = {
+    "region": ("지역", REGION_OPTIONS),
+    "season": ("시즌", list(SEASON_LIGHTING)),
+    "cast_mode": ("캐스팅 모드", CAST_MODE_OPTIONS),
+    "diversity_mode": ("다양성 모드", DIVERSITY_OPTIONS),
+}
+
+# 끝났지만 응답이 없는 작업의 안내문
+JOB_NOTES = {
+    STATUS_ERROR: "⚠️ 생성 중 오류 발생: {error}",
+    STATUS_CANCELLED: "⏹️ 생성을 취소했습니다.",
+    STATUS_INTERRUPTED: "⚠️ 서버가 재시작되어 생성이 중단되었습니다. 다시 요청해주세요.",
+}
 
 
 def resolve_api_key(user_input):
@@ -205,147 +195,181 @@ def resolve_api_key(user_input):
     return "", ""
 
 
-def fingerprint_key(api_key):
-    if not api_key:
-        return ""
-    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
-
-
 def load_model_options(api_key):
-    if not api_key:
-        return MODEL_OPTIONS
-
-    fingerprint = fingerprint_key(api_key)
-    cached = st.session_state.get("model_options_cache", {})
-    if cached.get("fingerprint") == fingerprint and cached.get("options"):
-        return cached["options"]
-
-    try:
-        genai.configure(api_key=api_key)
-        models = genai.list_models()
-        options = []
-        for model in models:
-            name = getattr(model, "name", "")
-            methods = getattr(model, "supported_generation_methods", []) or []
-            if "generateContent" not in methods:
-                continue
-            if name.startswith("models/"):
-                name = name.split("/", 1)[1]
-            options.append(name)
-        options = [
-            option
-            for option in options
-            if option.startswith("gemini-")
-            and not any(token in option for token in MODEL_EXCLUDE_TOKENS)
-        ]
-        options = sorted(set(options))
-        if not options:
-            options = MODEL_OPTIONS
-    except Exception:
-        options = MODEL_OPTIONS
-
-    st.session_state["model_options_cache"] = {
-        "fingerprint": fingerprint,
-        "options": options,
-    }
-    return options
-
-
-def build_chat_history(messages):
-    history = []
+    return get_model_catalog().get(api_key)
+
+
+def get_chat_session(api_key, model_name, history, prompt_version):
+    return get_backend(api_key).start_chat(model_name, prompt_version, history)
+
+
+def render_stream_progress(accumulator, json_slot, text_slot):
+    if accumulator.json_started:
+        with json_slot.container():
+            with st.expander("📦 STEP 2 데이터 핸드오프(JSON)", expanded=True):
+                st.code(accumulator.json_text, language="json")
+    text_slot.markdown(accumulator.prose_text + " ▌")
+
+
+def follow_job(job):
+    """작업이 끝날 때까지 진행 상황을 그림 (도중에 rerun되면 여기서 중단되고 작업은 워커에서 계속)"""
+    stage_slot = st.empty()
+    json_slot = st.empty()
+    text_slot = st.empty()
+    while not job.finished:
+        stage_slot.caption(job.stage or "⏳ 생성 작업 대기 중...")
+        render_stream_progress(job.progress(), json_slot, text_slot)
+        time.sleep(JOB_POLL_INTERVAL)
+
+
+def deliver_job(job, messages, model_messages):
+    """끝난 작업 → 대화에 응답 추가 (실패/취소는 안내만 보이고 모델 히스토리에서는 요청도 뺌)"""
+    if job.status == STATUS_DONE:
+        # 원문 대신 SET 문서를 두 목록이 함께 참조 (모델 히스토리에는 markdown()으로 복원)
+        message = assistant_message(job.response)
+        messages.append({**message, "metrics": job.metrics, "job_id": job.id})
+        model_messages.append(message)
+        return
+    if model_messages and model_messages[-1]["role"] == "user":
+        model_messages.pop()
+    messages.append({"role": "assistant", "content": JOB_NOTES[job.status].format(error=job.error)})
+
+
+def deliver_regeneration(job, messages):
+    """끝난 SET 재생성 작업 → 원래 응답 메시지의 렌더 캐시를 비우고 결과 알림 (문서는 워커가 이미 제자리 교체)"""
+    if job.status != STATUS_DONE:
+        st.session_state["regenerate_notice"] = f"{job.user_content} - " + JOB_NOTES[job.status].format(error=job.error)
+        return
+    set_no = job.metrics.get("regenerated_set")
     for msg in messages:
-        role = msg.get("role")
-        content = (msg.get("content") or "").strip()
-        if not content:
-            continue
-        if role == "user":
-            history.append({"role": "user", "parts": [content]})
-        elif role == "assistant":
-            history.append({"role": "model", "parts": [content]})
-    return history
-
-
-def get_chat_session(api_key, model_name, history):
-    genai.configure(api_key=api_key)
-
-    generation_config = {
-        "temperature": 0.7,
-        "top_p": 0.95,
-        "top_k": 40,
-        "max_output_tokens": 8192,
-    }
-
-    model = genai.GenerativeModel(
-        model_name=model_name,
-        generation_config=generation_config,
-        system_instruction=LG_SYSTEM_PROMPT,
+        if msg.get("job_id") == job.model_content:
+            msg.pop("id", None)
+            regenerated = set(msg.get("metrics", {}).get("regenerated_sets", ()))
+            msg["metrics"] = {**msg.get("metrics", {}), "regenerated_sets": sorted(regenerated | {set_no})}
+    st.session_state["regenerate_notice"] = f"🔄 SET {set_no:02d}을 다시 생성했습니다."
+
+
+def update_turn_response(job_id, response):
+    """SET 재생성 결과 → 원래 턴의 작업 기록과 패키지 저장소에 함께 반영"""
+    get_job_queue().update_response(job_id, response)
+    update_package(job_package_key(job_id), response)
+
+
+def render_package_search(project_id):
+    """사이드바 - 저장된 패키지 검색 (검색어/필터가 있을 때만 조회), 불러오기 버튼은 load_package에 id 기록"""
+    package_store = get_package_store()
+    scope = project_id if st.checkbox("현재 프로젝트만", value=True, key="package_project_only") else None
+    query = st.text_input(
+        "검색어 (SET 제목 · 스타일링 · 프롬프트 · 지시사항)",
+        key="package_query",
+        placeholder="camel coat",
     )
-
-    return model.start_chat(history=history)
-
-
-def parse_response(text):
-    json_data = None
-    clean_text = text
-
-    for match in JSON_BLOCK_RE.finditer(text):
-        candidate = match.group(1).strip()
-        try:
-            json_data = json.loads(candidate)
-            clean_text = (text[:match.start()] + text[match.end():]).strip()
-            break
-        except json.JSONDecodeError:
+    filters = {
+        field: st.selectbox(label, ["", *options], format_func=lambda x: x or "전체", key=f"package_filter_{field}")
+        for field, (label, options) in PACKAGE_FILTERS.items()
+    }
+    if not query.strip() and not any(filters.values()):
+        st.caption(f"저장된 패키지 {package_store.stats(scope)['packages']}개")
+        return
+    started = time.perf_counter()
+    hits = package_store.search(query, scope, PACKAGE_SEARCH_LIMIT, **filters)
+    st.caption(f"SET {len(hits)}개 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+    packages = {}
+    for hit in hits:
+        packages.setdefault(hit["package_id"], []).append(hit)
+    for package_id, package_hits in packages.items():
+        first = package_hits[0]
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(first["created_at"]))
+        st.markdown(f"**#{package_id}** {first['city']} · {first['season']} · {first['cast_mode']} · {created}")
+        st.caption(" · ".join(f"SET {hit['set_no']:02d} {hit['title']}" for hit in package_hits))
+        if st.button("📂 불러오기", key=f"load_package_{package_id}"):
+            st.session_state["load_package"] = package_id
+
+
+def restore_conversation(jobs):
+    """세션 작업 기록 → (messages, model_messages, 진행 중인 작업 id)"""
+    messages = [{"role": "assistant", "content": SYSTEM_GREETING}]
+    model_messages = []
+    pending = None
+    for job in jobs:
+        messages.append({"role": "user", "content": job.user_content})
+        if not job.model_content:
+            # 입력 차단 등 API를 부르지 않은 턴
+            messages.append({"role": "assistant", "content": job.response})
             continue
+        model_messages.append({"role": "user", "content": job.model_content})
+        if job.finished:
+            deliver_job(job, messages, model_messages)
+        else:
+            pending = job.id
+    return messages, model_messages, pending
+
+
+def render_history_message(artifact, expanded, regenerate_key=None, regenerate_disabled=False):
+    if not expanded:
+        if artifact.preview:
+            st.markdown(artifact.preview)
+        if artifact.headings:
+            st.caption(" · ".join(artifact.headings))
+        return
+
+    if artifact.json_data:
+        with st.expander("📦 STEP 2 데이터 핸드오프(JSON)", expanded=False):
+            st.json(artifact.json_data)
+            if artifact.schema_errors:
+                st.warning("⚠️ 스키마 검증 실패:\n" + format_errors(artifact.schema_errors))
+            st.caption("이 JSON 데이터를 복사하여 이미지 생성 파이프라인에 전달하세요.")
+            if artifact.doc is not None:
+                st.download_button(
+                    "📥 SET별 프롬프트(JSON)",
+                    json.dumps(artifact.doc.to_dict(), ensure_ascii=False, indent=2),
+                    file_name=f"sets_{artifact.id}.json",
+                    mime="application/json",
+                    key=f"download_sets_{artifact.id}",
+                )
+
+    if artifact.doc is not None:
+        render_document(artifact.doc, regenerate_key, regenerate_disabled)
+    elif artifact.text:
+        st.markdown(artifact.text)
+
+
+def render_document(doc, regenerate_key=None, disabled=False):
+    """SET 문서 본문 - 세트마다 따로 그리고 아래에 'SET n 다시 생성' (regenerate_key는 원래 턴의 작업 id)"""
+    intro = ("\n".join(doc.before) + "\n".join(doc.lead)).strip()
+    if intro:
+        st.markdown(intro)
+    for index, entry in enumerate(doc.sets):
+        if index:
+            st.divider()
+        st.markdown("\n".join(entry.content_lines()))
+        if regenerate_key is None:
+            continue
+        with st.popover(f"🔄 SET {entry.number:02d} 다시 생성", disabled=disabled):
+            note = st.text_input(
+                "수정 메모 (선택)",
+                key=f"regenerate_note_{regenerate_key}_{entry.number}",
+                placeholder="예: 조명을 더 밝게, 소품 없이",
+            )
+            if st.button("다시 생성", key=f"regenerate_{regenerate_key}_{entry.number}"):
+                st.session_state["regenerate_request"] = (regenerate_key, entry.number, note)
+    tail = "\n".join(doc.tail).strip()
+    if tail:
+        st.markdown(tail)
 
-    return json_data, clean_text
-
-
-def format_target_date(value):
-    if hasattr(value, "strftime"):
-        return value.strftime("%Y-%m-%d")
-    return str(value)
-
-
-def build_combined_prompt(settings, user_input, model_name, translate_enabled):
-    ethnicity_value = settings["ethnicity"].strip() if settings["ethnicity"] else "Auto"
-    target_date = format_target_date(settings["target_date"])
-
-    lines = [
-        "[SYSTEM_OVERRIDE_DATA]",
-        f"Project_ID: {settings['project_id']}",
-        f"Region: {settings['region']}",
-        f"City: {settings['city']}",
-        f"Target_Date: {target_date}",
-        f"Fixed_Age: {settings['age']}",
-        f"Fixed_Gender: {settings['gender']}",
-        f"Fixed_Occupation: {settings['occupation']}",
-        f"Fixed_Ethnicity: {ethnicity_value}",
-        f"Cast_Mode: {settings['cast_mode']}",
-        f"Diversity_Mode: {settings['diversity_mode']}",
-        f"Aspect_Ratio: {settings['aspect_ratio']}",
-        f"Model_Version: {model_name}",
-    ]
-
-    if settings.get("cast_mode") == "MULTI":
-        lines.append(f"Family_Count: {settings.get('family_count', 3)}")
-
-    if translate_enabled:
-        lines.extend(
-            [
-                "",
-                "[OUTPUT_TRANSLATION]",
-                "응답에 영어가 포함되면 마지막에 한국어 번역 섹션을 추가하세요.",
-                "한국어 원문은 그대로 유지하고, JSON 블록은 번역하지 마세요.",
-            ]
-        )
 
-    lines.extend(["", "[USER_CREATIVE_DIRECTION]", user_input])
-    return "\n".join(lines).strip()
+def record_rerun_time(started):
+    timings = st.session_state.setdefault("rerun_timings", [])
+    timings.append((time.perf_counter() - started) * 1000)
+    del timings[:-RERUN_SAMPLES]
+
 
 def mark_family_touched():
     st.session_state["family_count_touched"] = True
 
 
+rerun_started = time.perf_counter()
+
 st.set_page_config(
     page_title=APP_TITLE,
     page_icon="🎨",
@@ -437,15 +461,51 @@ st.markdown(
 translate_enabled = st.checkbox("한글 번역 함께 출력", value=False, key="translate_enabled")
 if translate_enabled:
     st.caption("AI 응답에 영어가 있으면 하단에 한글 번역 섹션이 추가됩니다.")
+streaming_enabled = st.checkbox("스트리밍 출력", value=True, key="streaming_enabled")
+fanout_enabled = st.checkbox(
+    "SET 병렬 생성",
+    value=False,
+    key="fanout_enabled",
+    help="HEADER_JSON을 먼저 받은 뒤 SET 01~10을 동시에 따로 생성해 합칩니다 (프로즈+JSON 모드, 출력 토큰 한도로 잘리지 않음).",
+)
+anchor_repair_enabled = st.checkbox(
+    "§2.1 앵커 자동 수정",
+    value=True,
+    key="anchor_repair_enabled",
+    help="세트 간 같은 Biometric Anchor, 이미지 프롬프트에 빠진 앵커 등 위반 세트만 새 앵커로 다시 생성합니다 (프로즈+JSON 모드).",
+)
+output_mode = st.radio(
+    "출력 모드",
+    OUTPUT_MODES,
+    format_func=lambda x: OUTPUT_MODE_LABELS[x],
+    horizontal=True,
+    key="output_mode",
+    help="구조화 JSON은 response_schema로 JSON만 받아 출력 토큰과 파싱 실패를 줄입니다.",
+)
+use_fake_backend = fake_backend_enabled()
 
 if "applied_settings" not in st.session_state:
     st.session_state["applied_settings"] = default_settings()
+if "session_id" not in st.session_state:
+    # URL(?sid=)에 고정해서 새로고침/재접속해도 같은 세션의 작업과 대화를 이어감
+    st.session_state["session_id"] = st.query_params.get("sid") or uuid.uuid4().hex[:12]
+    st.query_params["sid"] = st.session_state["session_id"]
 
 api_key = ""
 api_source = ""
 model_option = MODEL_OPTIONS[0]
+history_budget = resolve_token_budget()
+reuse_cached = False
+cache_variants = DEFAULT_VARIANTS
 flash_context = False
 
+# 세션은 시작할 때의 프롬프트 버전을 유지하고, 새 세션만 최신 md 파일을 사용
+latest_prompt = current_prompt()
+if "prompt_version" not in st.session_state:
+    st.session_state["prompt_version"] = latest_prompt.version_id
+session_prompt = get_prompt_version(st.session_state["prompt_version"]) or latest_prompt
+st.session_state["prompt_version"] = session_prompt.version_id
+
 with st.sidebar:
     st.markdown(
         """
@@ -498,6 +558,8 @@ with st.sidebar:
             st.info("입력된 API 키를 사용합니다.")
         elif api_source == "env":
             st.info("환경변수에서 API 키를 찾았습니다.")
+        elif use_fake_backend:
+            st.info("오프라인 가짜 백엔드로 동작합니다.")
         elif not api_key:
             st.warning("⚠️ API 키가 필요합니다. 설정 메뉴에서 입력하거나 Secrets를 설정하세요.")
 
@@ -509,6 +571,35 @@ with st.sidebar:
             model_options,
             key="model_option",
         )
+        history_budget = st.number_input(
+            "히스토리 토큰 예산",
+            min_value=1000,
+            max_value=200000,
+            value=history_budget,
+            step=1000,
+            key="history_budget",
+            help="이전 대화는 이 예산 안으로 요약/정리되어 모델에 전달됩니다.",
+        )
+        reuse_cached = st.checkbox(
+            "캐시된 결과 재사용",
+            value=False,
+            key="reuse_cached",
+            help="같은 설정/지시사항/모델로 생성된 응답이 있으면 API 호출 없이 재사용합니다.",
+        )
+        cache_variants = st.number_input(
+            "캐시 변형 수",
+            min_value=1,
+            max_value=MAX_VARIANTS,
+            value=DEFAULT_VARIANTS,
+            key="cache_variants",
+            disabled=not reuse_cached,
+            help="요청마다 이 개수만큼 응답을 모은 뒤 번갈아 재사용합니다.",
+        )
+        cache_stats = get_response_cache().stats()
+        st.caption(
+            f"응답 캐시: 적중 {cache_stats['hits']} / 미스 {cache_stats['misses']} · "
+            f"{cache_stats['entries']}건"
+        )
 
     st.markdown("---")
     st.markdown('<p class="sidebar-label">🎛️ Control Tower</p>', unsafe_allow_html=True)
@@ -700,11 +791,82 @@ with st.sidebar:
     st.session_state["applied_settings"] = new_settings
 
     st.markdown("---")
-    st.caption(f"시스템: LG Step1 Schema v5.8\n모델: {model_option}")
+    st.caption(
+        f"시스템: LG Step1 Schema v5.8\n모델: {model_option}\n"
+        f"프롬프트 캐시: {st.session_state.get('prompt_cache_status', '-')}\n"
+        f"프롬프트 버전: {session_prompt.version_id}"
+    )
+    if session_prompt.version_id != latest_prompt.version_id:
+        st.info(f"새 프롬프트 버전이 있습니다: {latest_prompt.version_id}")
+        if st.button("최신 프롬프트 적용", key="apply_latest_prompt"):
+            st.session_state["prompt_version"] = latest_prompt.version_id
+            st.rerun()
+
+    with st.expander("🛠️ 디버그", expanded=False):
+        rerun_timings = st.session_state.get("rerun_timings", [])
+        if rerun_timings:
+            st.caption(
+                f"직전 rerun {rerun_timings[-1]:.0f}ms · p50 {percentile(rerun_timings, 50):.0f}ms · "
+                f"p95 {percentile(rerun_timings, 95):.0f}ms (최근 {len(rerun_timings)}회)"
+            )
+        st.caption(
+            f"히스토리 렌더링 {st.session_state.get('history_render_ms', 0):.0f}ms · "
+            f"캐시된 메시지 {len(st.session_state.get('render_cache', {}))}개"
+        )
+        catalog_status = get_model_catalog().status(api_key)
+        if catalog_status:
+            catalog_age = (
+                f"{catalog_status['age'] // 60}분 전" if catalog_status["age"] is not None else "기본 목록"
+            )
+            st.caption(
+                f"모델 카탈로그 {catalog_status['models']}개 · {catalog_age}"
+                + (f" · 갱신 실패: {catalog_status['error']}" if catalog_status["error"] else "")
+            )
+        limiter_stats = get_request_limiter().stats()
+        job_stats = get_job_queue().stats()
+        st.caption(
+            f"요청 슬롯 {limiter_stats['active']}/{limiter_stats['max_concurrency']} 사용 중 · "
+            f"대기 {limiter_stats['waiting']}건 · 평균 점유 {limiter_stats['avg_hold']:.1f}s · "
+            f"생성 작업 실행 {job_stats['running']} / 대기 {job_stats['queued']}"
+        )
+
+    if telemetry_enabled():
+        with st.expander("📈 사용량 · 비용", expanded=False):
+            ledger = get_ledger()
+            project_rows = ledger.summary(project_id=new_settings["project_id"], by=("model",))
+            if project_rows:
+                for row in project_rows:
+                    st.caption(f"**{row['model']}** · {format_summary(row)}")
+            else:
+                st.caption("이 프로젝트의 기록이 아직 없습니다.")
+            st.download_button(
+                "원장 내보내기 (CSV, 전체 프로젝트)",
+                data=export_csv(ledger.entries()),
+                file_name="lgad_telemetry.csv",
+                mime="text/csv",
+                key="telemetry_export",
+            )
+
+    if store_enabled():
+        with st.expander("🗂️ 저장된 패키지", expanded=False):
+            render_package_search(new_settings["project_id"])
 
     if st.button("🗑️ 대화 초기화", type="secondary"):
-        for key in ("messages", "model_messages", "chat_session"):
+        if st.session_state.get("pending_job"):
+            get_job_queue().cancel(st.session_state["pending_job"])
+        for key in (
+            "messages",
+            "model_messages",
+            "chat_session",
+            "render_cache",
+            "visible_messages",
+            "prompt_version",
+            "pending_job",
+        ):
             st.session_state.pop(key, None)
+        # 새 세션 id - 이전 대화는 작업 기록에 남지만 복원하지 않음
+        st.session_state["session_id"] = uuid.uuid4().hex[:12]
+        st.query_params["sid"] = st.session_state["session_id"]
         st.rerun()
 
 st.title(APP_TITLE)
@@ -743,45 +905,139 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# 새 세션(새로고침/재접속 포함)은 같은 세션 id의 작업 기록으로 대화를 복원하고 진행 중인 작업을 이어서 표시
 if "messages" not in st.session_state:
-    st.session_state["messages"] = [{"role": "assistant", "content": SYSTEM_GREETING}]
+    restored_messages, restored_model_messages, restored_pending = restore_conversation(
+        get_job_queue().session_jobs(st.session_state["session_id"])
+    )
+    st.session_state["messages"] = restored_messages
+    st.session_state["model_messages"] = restored_model_messages
+    if restored_pending:
+        st.session_state["pending_job"] = restored_pending
 
-if "model_messages" not in st.session_state:
-    st.session_state["model_messages"] = []
+# 설정 + 지금까지의 지시사항에 필요한 섹션만 담은 시스템 프롬프트 (조합이 바뀌면 채팅 세션을 다시 만듦)
+user_texts = [msg["content"] for msg in st.session_state["messages"] if msg["role"] == "user"]
+model_prompt, _ = slice_prompt(session_prompt, applied_settings, user_texts)
 
 api_key_fingerprint = fingerprint_key(api_key)
 if (
     st.session_state.get("active_model") != model_option
     or st.session_state.get("api_key_fingerprint") != api_key_fingerprint
+    or st.session_state.get("active_prompt_version") != model_prompt.version_id
 ):
     st.session_state["chat_session"] = None
     st.session_state["active_model"] = model_option
     st.session_state["api_key_fingerprint"] = api_key_fingerprint
+    st.session_state["active_prompt_version"] = model_prompt.version_id
 
-if st.session_state.get("chat_session") is None and api_key:
+if st.session_state.get("chat_session") is None and (api_key or use_fake_backend):
     try:
-        history = build_chat_history(st.session_state["model_messages"])
-        st.session_state["chat_session"] = get_chat_session(api_key, model_option, history)
+        compacted, _ = compact_history(st.session_state["model_messages"], budget=history_budget)
+        history = build_chat_history(compacted)
+        chat_session, cache_status = get_chat_session(api_key, model_option, history, model_prompt)
+        st.session_state["chat_session"] = chat_session
+        st.session_state["prompt_cache_status"] = cache_status
     except Exception as e:
         st.error(f"모델 연결 실패: {e}")
 
-for msg in st.session_state["messages"]:
+history_started = time.perf_counter()
+render_cache = st.session_state.setdefault("render_cache", {})
+messages = st.session_state["messages"]
+visible_count = st.session_state.get("visible_messages", VISIBLE_MESSAGES)
+hidden_count = max(0, len(messages) - visible_count)
+if hidden_count and st.button(f"⬆️ 이전 메시지 {hidden_count}개 더 보기", key="show_more_messages"):
+    st.session_state["visible_messages"] = visible_count + SHOW_MORE_STEP
+    st.rerun()
+
+pending_job_id = st.session_state.get("pending_job")
+regenerate_notice = st.session_state.pop("regenerate_notice", None)
+if regenerate_notice:
+    st.toast(regenerate_notice)
+
+latest_assistant = max((i for i, msg in enumerate(messages) if msg["role"] == "assistant"), default=-1)
+for index in range(hidden_count, len(messages)):
+    msg = messages[index]
     if msg["role"] == "user":
         st.chat_message("user").write(msg["content"])
-    else:
-        with st.chat_message("assistant"):
-            json_data, text_content = parse_response(msg["content"])
-
-            if json_data:
-                with st.expander("📦 STEP 2 데이터 핸드오프(JSON)", expanded=False):
-                    st.json(json_data)
-                    st.caption("이 JSON 데이터를 복사하여 이미지 생성 파이프라인에 전달하세요.")
-
-            if text_content:
-                st.markdown(text_content)
+        continue
+
+    artifact = get_artifact(render_cache, msg)
+    with st.chat_message("assistant"):
+        # 최신 응답만 전체 렌더링, 이전 응답은 요약만 보여주고 필요할 때 펼침
+        expanded = index == latest_assistant or artifact.compact
+        if not expanded:
+            expanded = st.checkbox("전체 보기", key=f"expand_message_{index}")
+        # SET 문서 응답은 세트마다 재생성 버튼 (생성 중에는 비활성화)
+        render_history_message(artifact, expanded, msg.get("job_id"), bool(pending_job_id))
+
+        if msg.get("metrics"):
+            st.caption(format_metrics(msg["metrics"]))
+st.session_state["history_render_ms"] = (time.perf_counter() - history_started) * 1000
+
+# SET 하나만 다시 생성 - 원래 턴의 조립된 요청 + HEADER_JSON + 이 세트의 슬롯 제약 + 메모만 보내고 결과를 문서에 제자리 교체
+regenerate_request = st.session_state.pop("regenerate_request", None)
+if regenerate_request is not None and not pending_job_id and (api_key or use_fake_backend):
+    source_job_id, regenerate_set_no, regenerate_note = regenerate_request
+    source_msg = next((msg for msg in messages if msg.get("job_id") == source_job_id and msg.get("doc")), None)
+    source_job = get_job_queue().get(source_job_id)
+    if source_msg is not None and source_job is not None and source_job.model_content:
+        regenerate_label = f"SET {regenerate_set_no:02d} 다시 생성" + (f": {regenerate_note}" if regenerate_note else "")
+        job = get_job_queue().submit(
+            st.session_state["session_id"],
+            applied_settings["project_id"],
+            regenerate_label,
+            source_job_id,
+            partial(
+                run_set_regeneration,
+                doc=source_msg["doc"],
+                set_no=regenerate_set_no,
+                combined_prompt=source_job.model_content,
+                settings=applied_settings,
+                generate=fanout_generator(get_backend(api_key), model_option, model_prompt),
+                model_name=model_option,
+                prompt_version_id=model_prompt.version_id,
+                note=regenerate_note,
+                on_update=partial(update_turn_response, source_job_id),
+                telemetry={
+                    "project_id": applied_settings["project_id"],
+                    "session_id": st.session_state["session_id"],
+                    "output_mode": OUTPUT_MODE_PROSE,
+                },
+            ),
+            kind=KIND_REGENERATE,
+        )
+        st.session_state["pending_job"] = job.id
+        pending_job_id = job.id
+
+# 저장된 패키지 불러오기 - 생성 없이 대화에 추가 (조립된 요청도 모델 히스토리에 넣어 이어서 지시/SET 재생성 가능)
+load_package_id = st.session_state.pop("load_package", None)
+if load_package_id is not None and not pending_job_id:
+    package = get_package_store().get(load_package_id)
+    if package is not None:
+        load_label = f"📂 저장된 패키지 #{package['id']} 불러오기" + (
+            f": {package['direction']}" if package["direction"] else ""
+        )
+        job = get_job_queue().record(
+            st.session_state["session_id"],
+            applied_settings["project_id"],
+            load_label,
+            package["response"],
+            model_content=package["request"],
+            metrics={"reused_package": package["id"]},
+        )
+        messages.append({"role": "user", "content": load_label})
+        if package["request"]:
+            st.session_state["model_messages"].append({"role": "user", "content": package["request"]})
+            deliver_job(job, messages, st.session_state["model_messages"])
+        else:
+            messages.append({"role": "assistant", "content": package["response"]})
+        st.rerun()
 
-if user_input := st.chat_input("추가적인 컨셉이나 지시사항을 입력하세요..."):
-    if not api_key:
+if user_input := st.chat_input(
+    "추가적인 컨셉이나 지시사항을 입력하세요...",
+    disabled=bool(pending_job_id),
+):
+    if not api_key and not use_fake_backend:
         st.error("API 키를 사이드바에서 설정해주세요.")
         st.stop()
 
@@ -789,39 +1045,124 @@ if user_input := st.chat_input("추가적인 컨셉이나 지시사항을 입력
         st.error("채팅 세션이 초기화되지 않았습니다. 새로고침 해주세요.")
         st.stop()
 
+    telemetry_context = {
+        "project_id": applied_settings["project_id"],
+        "session_id": st.session_state["session_id"],
+        "output_mode": output_mode,
+    }
+
+    # §0.1/§0.2 로컬 판정 - 차단되면 API 호출 없이 고정 응답
+    gate = gate_input(user_input)
+    if gate.action == ACTION_BLOCK:
+        st.chat_message("user").write(user_input)
+        st.chat_message("assistant").write(gate.message)
+        st.session_state["messages"].append({"role": "user", "content": user_input})
+        st.session_state["messages"].append({"role": "assistant", "content": gate.message})
+        get_job_queue().record(
+            st.session_state["session_id"], applied_settings["project_id"], user_input, gate.message
+        )
+        record_turn(
+            make_entry(
+                SOURCE_APP,
+                model_option,
+                st.session_state.get("active_prompt_version", ""),
+                status=STATUS_BLOCKED,
+                **telemetry_context,
+            )
+        )
+        st.stop()
+
     combined_prompt = build_combined_prompt(
         st.session_state["applied_settings"],
-        user_input,
+        gate.text,
         model_option,
         translate_enabled,
+        output_mode,
+    )
+
+    # 이번 지시사항이 새 섹션(MULTI/룩북 등)을 필요로 하면 그 조합으로 세션 교체 (히스토리는 아래에서 다시 채움)
+    model_prompt, prompt_slice = slice_prompt(session_prompt, applied_settings, [*user_texts, user_input])
+    if model_prompt.version_id != st.session_state.get("active_prompt_version"):
+        try:
+            chat_session, cache_status = get_chat_session(api_key, model_option, [], model_prompt)
+        except Exception as e:
+            st.error(f"모델 연결 실패: {e}")
+            st.stop()
+        st.session_state["chat_session"] = chat_session
+        st.session_state["prompt_cache_status"] = cache_status
+        st.session_state["active_prompt_version"] = model_prompt.version_id
+
+    compacted, history_stats = compact_history(
+        st.session_state["model_messages"],
+        budget=history_budget,
+        pending=combined_prompt,
     )
 
     st.chat_message("user").write(user_input)
+    if gate.action == ACTION_SANITIZE:
+        st.caption(f"🛡️ 입력에서 인코딩/숨김 문자 구간을 정리했습니다 ({', '.join(gate.rules)})")
     st.session_state["messages"].append({"role": "user", "content": user_input})
     st.session_state["model_messages"].append({"role": "user", "content": combined_prompt})
 
-    with st.spinner("Art Director가 설정값과 지시사항을 분석 중입니다..."):
-        try:
-            chat = st.session_state["chat_session"]
-            response = chat.send_message(combined_prompt)
-            full_response = response.text or ""
-
-            with st.chat_message("assistant"):
-                json_data, text_content = parse_response(full_response)
-
-                if json_data:
-                    with st.expander("📦 STEP 2 데이터 핸드오프(JSON)", expanded=True):
-                        st.json(json_data)
-                        st.info("✅ 데이터가 성공적으로 생성되었습니다.")
-
-                if text_content:
-                    st.markdown(text_content)
+    chat = st.session_state["chat_session"]
+    chat.history = build_chat_history(compacted)
+    # SET 병렬 생성과 §2.1 앵커 수정은 SET 본문이 있는 프로즈+JSON 모드에서만
+    fanout = None
+    if fanout_enabled and output_mode == OUTPUT_MODE_PROSE:
+        fanout = fanout_generator(get_backend(api_key), model_option, model_prompt)
+    anchor_repair = None
+    if anchor_repair_enabled and output_mode == OUTPUT_MODE_PROSE:
+        anchor_repair = fanout_generator(get_backend(api_key), model_option, model_prompt)
+    turn = ChatTurn(
+        chat,
+        combined_prompt,
+        applied_settings,
+        model_option,
+        model_prompt.version_id,
+        output_mode=output_mode,
+        overrides=generation_overrides(output_mode) or None,
+        streaming=streaming_enabled,
+        cache_key=response_key(
+            model_prompt.hash,
+            "fake" if use_fake_backend else model_option,
+            generation_config_for(output_mode),
+            combined_prompt,
+            compacted,
+        ),
+        reuse_cached=reuse_cached,
+        cache_variants=cache_variants,
+        history_stats=history_stats,
+        prompt_tokens_saved=prompt_slice.saved_tokens if prompt_slice is not None else None,
+        telemetry=telemetry_context,
+        fanout=fanout,
+        fanout_sets=requested_sets(gate.text),
+        anchor_repair=anchor_repair,
+        direction=gate.text,
+    )
+    job = get_job_queue().submit(
+        st.session_state["session_id"],
+        applied_settings["project_id"],
+        user_input,
+        combined_prompt,
+        partial(run_chat_turn, turn=turn),
+    )
+    st.session_state["pending_job"] = job.id
+    pending_job_id = job.id
 
-            st.session_state["messages"].append(
-                {"role": "assistant", "content": full_response}
-            )
-            st.session_state["model_messages"].append(
-                {"role": "assistant", "content": full_response}
-            )
-        except Exception as e:
-            st.error(f"생성 중 오류 발생: {e}")
+# 생성은 작업 큐 워커에서 진행 - 스크립트는 진행 상황만 폴링 (rerun/새로고침되어도 작업은 계속)
+if pending_job_id:
+    job = get_job_queue().get(pending_job_id)
+    if job is not None and not job.finished:
+        with st.chat_message("assistant"):
+            if st.button("⏹️ 생성 취소", key=f"cancel_job_{job.id}"):
+                get_job_queue().cancel(job.id)
+            follow_job(job)
+    st.session_state.pop("pending_job", None)
+    if job is not None and job.kind == KIND_REGENERATE:
+        deliver_regeneration(job, st.session_state["messages"])
+    elif job is not None:
+        deliver_job(job, st.session_state["messages"], st.session_state["model_messages"])
+    st.rerun()
+
+if not user_input:
+    record_rerun_time(rerun_started)
@@ -0,0 +1,519 @@
+"""
+LG Art Director System v5.9.0 - Model Backend
+모델 호출 인터페이스 - Gemini 구현과 오프라인 가짜 구현 (LGAD_BACKEND 또는 LGAD_FAKE_BACKEND로 선택)
+
+앱/배치/벤치마크는 get_backend()가 돌려주는 ModelBackend만 사용한다.
+가짜 백엔드는 같은 요청에 항상 같은 응답을 돌려주며, 지연/토큰 속도/오류 주입을 환경변수로 조절한다.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from cast_planner import ANCHORS_PER_SET, BIOMETRIC_IDS, CAST_MODE_LOOKBOOK
+from client_pool import LimitedChatSession, fingerprint_key, get_client_pool, get_request_limiter
+from fanout import ANCHOR_KEY, OUTPUT_SETS_KEY, OUTPUT_SETS_NONE, REGENERATE_NOTE_HEADER, STORY_KEY
+from history import estimate_tokens
+from request_builder import GENERATION_CONFIG, OUTPUT_MODE_JSON, OUTPUT_MODE_JSON_PROSE
+from structured_output import PROSE_FIELD, structured_fake_response
+
+# 백엔드 선택 환경변수 ("gemini" | "fake") / 예전 가짜 백엔드 스위치
+BACKEND_ENV = "LGAD_BACKEND"
+FAKE_BACKEND_ENV = "LGAD_FAKE_BACKEND"
+
+BACKEND_GEMINI = "gemini"
+BACKEND_FAKE = "fake"
+BACKENDS = (BACKEND_GEMINI, BACKEND_FAKE)
+
+# 가짜 백엔드 설정 - 첫 토큰 전 지연(초), 초당 출력 토큰(0 = 지연 없음), 호출당 오류 확률, 난수 시드
+FAKE_LATENCY_ENV = "LGAD_FAKE_LATENCY"
+FAKE_TOKEN_RATE_ENV = "LGAD_FAKE_TOKEN_RATE"
+FAKE_ERROR_RATE_ENV = "LGAD_FAKE_ERROR_RATE"
+FAKE_SEED_ENV = "LGAD_FAKE_SEED"
+
+# 가짜 백엔드의 분당 요청 수 제한 (기본 0 = 제한 없음, 대기열 동작을 오프라인으로 확인할 때 지정)
+FAKE_RPM_ENV = "LGAD_FAKE_RPM"
+
+# 녹화된 응답 JSONL (batch.py 결과의 raw 또는 text 필드) - 지정하면 합성 대신 재생
+FAKE_REPLAY_ENV = "LGAD_FAKE_REPLAY"
+
+DEFAULT_FAKE_TOKEN_RATE = 400.0
+
+# 스트리밍 청크 크기(문자)
+FAKE_CHUNK_SIZE = 32
+
+# 가짜 백엔드가 목록으로 돌려주는 모델
+FAKE_MODELS = ("gemini-2.5-flash", "gemini-2.5-pro", "gemini-2.0-flash")
+
+# 오류 주입 시 순서대로 돌아가며 쓰는 메시지 (실제 API 오류 문구 형태)
+FAKE_ERRORS = (
+    "429 Resource has been exhausted (e.g. check quota).",
+    "503 The model is overloaded. Please try again later.",
+    "500 An internal error has occurred.",
+    "504 Deadline Exceeded",
+)
+
+# 가짜 백엔드가 돌려주는 §9.2 형식 샘플 응답 (요청에 [SYSTEM_OVERRIDE_DATA]가 없을 때)
+FAKE_RESPONSE_TEXT = """[1️⃣ HEADER_JSON - Step 2/3 전달용]
+━━━ COPY THIS FOR STEP 2 ━━━
+```json
+{
+  "schema_version": "5.9.0",
+  "project_id": "LG_AD_2026_CAMPAIGN_01",
+  "region": "EU",
+  "batch_n": 1,
+  "fixed": {
+    "ethnicity": "Auto",
+    "age": 35,
+    "gender": "FEMALE",
+    "occupation": "Gallery Curator"
+  },
+  "city": "Paris",
+  "interior_style": "PARIS_STYLE",
+  "climate_type": "NORMAL",
+  "season": "WINTER",
+  "campaign_target": "2026-12",
+  "fashion_color": "#C19A6B",
+  "fashion_color_name": "Camel",
+  "fashion_texture": "Cashmere wool coat",
+  "biometric_ids": ["mole_under_left_eye", "high_cheekbones"],
+  "ratio": "4:5",
+  "aspect_ratio": "4:5",
+  "aspect_ratio_value": "--ar 4:5",
+  "diversity_mode": "SAFE"
+}
+```
+
+## SET 01 [TYPICAL] - Baseline
+Model: Parisian gallery curator with softly waved chestnut hair
+Age: 35 | Body: Standard
+Styling: Camel cashmere coat, cream turtleneck, wide-leg trousers
+Props: None
+Lighting: Warm tungsten from tall windows
+Gaze: TYPE B (Camera Direct)
+Primary Biometric Anchor: mole_under_left_eye, high_cheekbones
+Story Position: 01 - Arrival
+
+이미지1 [마크다운]
+```markdown
+[Image 1 - Profile]
+Editorial profile portrait of a 35-year-old gallery curator in a camel cashmere coat, Paris apartment, warm tungsten window light, --ar 4:5
+```
+"""
+
+# 요청 프롬프트의 [SYSTEM_OVERRIDE_DATA] "Key: value" 줄
+OVERRIDE_LINE_RE = re.compile(r"^([A-Z][A-Za-z_0-9]*): (.*)$", re.MULTILINE)
+
+# 합성 SET의 스토리 위치 (§5.3)
+FAKE_STORY = (
+    "Arrival", "Morning Ritual", "Work in Progress", "Pause", "Connection",
+    "Focus", "Reflection", "Golden Hour", "Evening", "Departure",
+)
+
+# 계획 헤어 값 → 묘사 (cast_planner.HAIR_KEYWORDS로 다시 읽히는 표현)
+FAKE_HAIR = {
+    "STRAIGHT": "straight",
+    "WAVY": "wavy",
+    "CURLY": "curly",
+    "COILY": "coily",
+    "PROTECTIVE": "protective style braided",
+}
+
+
+def _fake_anchor(set_no) -> str:
+    """Biometric_Anchor 줄이 없을 때 세트별 앵커 (§2.1 풀에서 세트마다 다른 조합)"""
+    start = (set_no - 1) * ANCHORS_PER_SET
+    return ", ".join(BIOMETRIC_IDS[(start + offset) % len(BIOMETRIC_IDS)] for offset in range(ANCHORS_PER_SET))
+
+
+_SAMPLE_HEADER = json.loads(FAKE_RESPONSE_TEXT.split("```json", 1)[1].split("```", 1)[0])
+
+
+class BackendError(Exception):
+    """가짜 백엔드가 주입한 API 오류"""
+
+
+class ModelBackend:
+    """모델 호출 인터페이스
+
+    system은 text/hash 속성을 가진 시스템 프롬프트 버전(prompt.PromptVersion).
+    응답은 .text 속성, 스트리밍은 .text 속성을 가진 청크 이터레이터.
+    채팅 세션은 history 속성과 send_message(content, stream=False, generation_config=None, on_wait=None)를 가진다.
+    limiter(client_pool.RequestLimiter)가 있으면 모든 요청이 그 대기열을 거치고,
+    on_wait(순번, 예상 대기 초)로 대기 상황을 알린다.
+    """
+
+    name = ""
+    limiter = None
+    limiter_key = ""
+
+    def _wrap_chat(self, session):
+        if self.limiter is None:
+            return session
+        return LimitedChatSession(session, self.limiter, self.limiter_key)
+
+    def _call(self, fn, *args, on_wait=None, **kwargs):
+        """제한기 슬롯을 잡고 비스트리밍 요청 한 번"""
+        if self.limiter is None:
+            return fn(*args, **kwargs)
+        started = self.limiter.acquire(self.limiter_key, on_wait)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.limiter.release(started)
+
+    def list_models(self) -> list:
+        """generateContent를 지원하는 모델 이름 ("models/" 접두사 제외)"""
+        raise NotImplementedError
+
+    def start_chat(self, model_name, system, history=(), generation_config=GENERATION_CONFIG):
+        """채팅 세션 시작 - (세션, 프롬프트 캐시 상태)"""
+        raise NotImplementedError
+
+    def generate(self, model_name, system, prompt, generation_config=None, on_wait=None):
+        """단발 생성 - 응답 객체 (generation_config는 기본 생성 설정 위에 덮어씀)"""
+        raise NotImplementedError
+
+
+class GeminiBackend(ModelBackend):
+    """google.generativeai 구현 - 키별 공유 클라이언트(client_pool), 시스템 프롬프트는 prompt_cache 컨텍스트 캐시
+
+    genai.configure()는 호출하지 않는다 (프로세스 전역 상태라 키가 여러 개면 섞임).
+    """
+
+    name = BACKEND_GEMINI
+
+    def __init__(self, api_key, limiter=None):
+        import google.generativeai as genai
+
+        self._genai = genai
+        self.clients = get_client_pool().get(api_key)
+        self.key_fingerprint = self.clients.fingerprint
+        # 실제 API는 항상 대기열을 거침 (채팅 세션 send_message의 on_wait도 래퍼가 받음)
+        self.limiter = limiter or get_request_limiter()
+        self.limiter_key = f"{self.name}:{self.key_fingerprint}"
+
+    def list_models(self) -> list:
+        names = []
+        for model in self._call(lambda: list(self._genai.list_models(client=self.clients.models))):
+            name = getattr(model, "name", "")
+            methods = getattr(model, "supported_generation_methods", []) or []
+            if "generateContent" not in methods:
+                continue
+            names.append(name.split("/", 1)[1] if name.startswith("models/") else name)
+        return names
+
+    def _model(self, model_name, system, generation_config):
+        from prompt_cache import get_cached_model
+
+        return get_cached_model(
+            self.clients,
+            model_name,
+            generation_config,
+            system.text,
+            prompt_id=system.hash,
+        )
+
+    def start_chat(self, model_name, system, history=(), generation_config=GENERATION_CONFIG):
+        model, cache_status = self._model(model_name, system, generation_config)
+        return self._wrap_chat(model.start_chat(history=list(history))), cache_status
+
+    def generate(self, model_name, system, prompt, generation_config=None, on_wait=None):
+        model, _ = self._model(model_name, system, GENERATION_CONFIG)
+        return self._call(model.generate_content, prompt, generation_config=generation_config, on_wait=on_wait)
+
+
+def parse_override(prompt) -> dict:
+    """요청 프롬프트의 [SYSTEM_OVERRIDE_DATA] 값 (없으면 빈 dict)"""
+    if "[SYSTEM_OVERRIDE_DATA]" not in (prompt or ""):
+        return {}
+    block = prompt.split("[SYSTEM_OVERRIDE_DATA]", 1)[1].split("\n\n", 1)[0]
+    return dict(OVERRIDE_LINE_RE.findall(block))
+
+
+def _fake_set(set_no, plan_line, values, note=""):
+    """Cast_NN 계획 줄 → §9.2 형식 SET 블록 (cast_planner.extract_cast가 그대로 읽을 수 있는 값, 재생성 메모는 Styling 끝에)
+
+    앵커는 Biometric_Anchor 값(없으면 세트별 기본 조합)을 Anchor 줄과 Image 1 프롬프트에 묘사.
+    """
+    parts = plan_line.split(" | ")
+    batch = parts[0].split("[", 1)[1].split("]", 1)[0] if "[" in parts[0] else "TYPICAL"
+    # 표현형 이름("Afro-Caribbean" 등)은 헤어 키워드와 겹치므로 ID만 사용
+    phenotype = parts[1].split(" ", 1)[0] if len(parts) > 1 else "EU_TYP_01"
+    fields = dict(part.split(" ", 1) for part in parts[2:] if " " in part)
+    hair = FAKE_HAIR.get(fields.get("Hair"), "straight")
+    features = [name.lower().replace("_", " ") for name in fields.get("Feature", "").split(", ") if name]
+    age = fields.get("Age", values.get("Fixed_Age", "35"))
+    body = fields.get("Body", "STANDARD").title()
+    occupation = values.get("Fixed_Occupation", "")
+    city = values.get("City", "Paris").split(" (", 1)[0]
+    ratio = values.get("Aspect_Ratio", "4:5")
+    extra = f", {', '.join(features)}" if features else ""
+    anchor_ids = values.get(ANCHOR_KEY) or _fake_anchor(set_no)
+    anchor_text = ", ".join(anchor.replace("_", " ") for anchor in anchor_ids.split(", "))
+    story = values.get(STORY_KEY) or f"{set_no:02d} - {FAKE_STORY[(set_no - 1) % len(FAKE_STORY)]}"
+    styling = "Camel cashmere coat, cream knit, tailored trousers" + (f" ({note})" if note else "")
+    return (
+        f"## SET {set_no:02d} [{batch}] - {FAKE_STORY[(set_no - 1) % len(FAKE_STORY)]}\n"
+        f"Model: {phenotype} model with {hair} hair{extra}\n"
+        f"Age: {age} | Body: {body}\n"
+        f"Skin: {fields.get('Skin', 'III')}\n"
+        f"Styling: {styling}\n"
+        f"Props: None\n"
+        f"Lighting: {values.get('Lighting_Light', 'Soft window light')}\n"
+        f"Gaze: TYPE B (Camera Direct)\n"
+        f"Primary Biometric Anchor: {anchor_ids}\n"
+        f"Story Position: {story}\n"
+        f"\n이미지1 [마크다운]\n```markdown\n[Image 1 - Profile]\n"
+        f"Editorial profile portrait of a {age}-year-old {occupation or 'woman'}, {city}, "
+        f"{hair} hair{extra}, {anchor_text}, --ar {ratio}\n```\n"
+    )
+
+
+def synthesize_response(prompt) -> str:
+    """[SYSTEM_OVERRIDE_DATA] 값으로 스키마를 통과하는 헤더 JSON + Cast_01~10 계획대로의 SET 본문 합성
+
+    fanout.py의 Output_Sets(출력할 세트만 본문으로, NONE이면 헤더만), Biometric_Anchor, Story_Position 값과
+    세트 재생성 메모를 따른다. 룩북(§1.1B)은 헤더에 cast_mode를 넣고 모든 세트가 SET 01 앵커를 공유.
+    """
+    values = parse_override(prompt)
+    if not values:
+        return FAKE_RESPONSE_TEXT
+    lookbook = values.get("Cast_Mode") == CAST_MODE_LOOKBOOK
+    if lookbook and not values.get(ANCHOR_KEY):
+        values[ANCHOR_KEY] = _fake_anchor(1)
+
+    header = dict(_SAMPLE_HEADER)
+    ratio = values.get("Aspect_Ratio", header["aspect_ratio"])
+    header.update(
+        project_id=values.get("Project_ID", header["project_id"]),
+        region=values.get("Region", header["region"]),
+        city=values.get("City", header["city"]).split(" (", 1)[0],
+        climate_type=values.get("Climate_Type", header["climate_type"]),
+        season=values.get("Season", header["season"]),
+        campaign_target=values.get("Campaign_Target", header["campaign_target"]),
+        ratio=ratio,
+        aspect_ratio=ratio,
+        aspect_ratio_value=f"--ar {ratio}",
+        diversity_mode=values.get("Diversity_Mode", header["diversity_mode"]),
+        fixed={
+            "ethnicity": values.get("Fixed_Ethnicity", "Auto"),
+            "age": int(values["Fixed_Age"]) if values.get("Fixed_Age", "").isdigit() else 35,
+            "gender": values.get("Fixed_Gender", "FEMALE"),
+            "occupation": values.get("Fixed_Occupation", ""),
+        },
+    )
+    header["biometric_ids"] = (values.get(ANCHOR_KEY) or _fake_anchor(1)).split(", ")
+    if lookbook:
+        # MULTI는 스키마상 cast 배열이 필요하므로 룩북만 표시
+        header["cast_mode"] = CAST_MODE_LOOKBOOK
+    head = FAKE_RESPONSE_TEXT.split("```json", 1)[0]
+    output_sets = values.get(OUTPUT_SETS_KEY, "")
+    if output_sets == OUTPUT_SETS_NONE:
+        return f"{head}```json\n{json.dumps(header, ensure_ascii=False, indent=2)}\n```\n"
+    wanted = {int(value) for value in output_sets.split(",") if value.strip().isdigit()}
+    note = prompt.split(REGENERATE_NOTE_HEADER, 1)[1].strip().split("\n")[-1] if REGENERATE_NOTE_HEADER in prompt else ""
+    sets = [
+        _fake_set(set_no, values[f"Cast_{set_no:02d}"], values, note)
+        for set_no in range(1, 11)
+        if f"Cast_{set_no:02d}" in values and (not wanted or set_no in wanted)
+    ]
+    if not sets:
+        sets = [FAKE_RESPONSE_TEXT.split("```\n\n", 1)[1]]
+    body = "\n---\n\n".join(sets)
+    if wanted:
+        # 세트별 요청은 SET 본문만
+        return body
+    return f"{head}```json\n{json.dumps(header, ensure_ascii=False, indent=2)}\n```\n\n{body}"
+
+
+def load_replay(path) -> list:
+    """녹화 응답 JSONL → 응답 텍스트 목록 (raw > response > text 순으로 사용)"""
+    responses = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get("raw") or record.get("response") or record.get("text")
+            if text:
+                responses.append(text)
+    return responses
+
+
+def fake_usage(system, history, prompt, text):
+    """Gemini usage_metadata 모양의 추정 사용량 - 시스템 프롬프트는 컨텍스트 캐시에서 읽은 것으로 계산"""
+    system_tokens = estimate_tokens(getattr(system, "text", ""))
+    history_tokens = sum(estimate_tokens(part) for msg in history for part in msg.get("parts", ()))
+    return SimpleNamespace(
+        prompt_token_count=system_tokens + history_tokens + estimate_tokens(prompt),
+        cached_content_token_count=system_tokens,
+        candidates_token_count=estimate_tokens(text),
+    )
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class FakeBackend(ModelBackend):
+    """오프라인 가짜 백엔드 - 녹화 응답 재생 또는 요청 값으로 응답 합성
+
+    같은 요청 프롬프트에는 항상 같은 응답. latency는 첫 청크 전 지연, token_rate는 초당 출력 토큰,
+    error_rate는 호출마다 BackendError를 낼 확률 (seed로 순서 고정).
+    """
+
+    name = BACKEND_FAKE
+
+    def __init__(self, latency=0.0, token_rate=DEFAULT_FAKE_TOKEN_RATE, error_rate=0.0, seed=0,
+                 replay=(), chunk_size=FAKE_CHUNK_SIZE, sleep=time.sleep, limiter=None):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.replay = list(replay)
+        self.chunk_size = chunk_size
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.limiter = limiter
+        self.limiter_key = self.name
+
+    @classmethod
+    def from_env(cls, limiter=None):
+        replay_path = os.getenv(FAKE_REPLAY_ENV, "").strip()
+        if limiter is not None:
+            limiter.set_key_rpm(cls.name, _env_float(FAKE_RPM_ENV, 0.0))
+        return cls(
+            latency=_env_float(FAKE_LATENCY_ENV, 0.0),
+            token_rate=_env_float(FAKE_TOKEN_RATE_ENV, DEFAULT_FAKE_TOKEN_RATE),
+            error_rate=_env_float(FAKE_ERROR_RATE_ENV, 0.0),
+            seed=int(_env_float(FAKE_SEED_ENV, 0)),
+            replay=load_replay(replay_path) if replay_path else (),
+            limiter=limiter,
+        )
+
+    def list_models(self) -> list:
+        return list(FAKE_MODELS)
+
+    def start_chat(self, model_name, system, history=(), generation_config=GENERATION_CONFIG):
+        return self._wrap_chat(FakeChatSession(self, history=history, system=system)), "fake"
+
+    def generate(self, model_name, system, prompt, generation_config=None, on_wait=None):
+        return self._call(self._generate, system, prompt, generation_config, on_wait=on_wait)
+
+    def _generate(self, system, prompt, generation_config):
+        text = self.reply(prompt, generation_config)
+        return self.deliver(text, usage=fake_usage(system, (), prompt, text))
+
+    def _check_error(self):
+        with self._lock:
+            self.calls += 1
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+                message = FAKE_ERRORS[(self.errors - 1) % len(FAKE_ERRORS)]
+        if failed:
+            raise BackendError(message)
+
+    def reply_text(self, prompt, generation_config=None) -> str:
+        """요청 → 응답 텍스트 (response_schema가 지정되면 구조화 출력 형태)"""
+        if self.replay:
+            digest = hashlib.sha256((prompt or "").encode("utf-8")).digest()
+            text = self.replay[int.from_bytes(digest[:4], "big") % len(self.replay)]
+        else:
+            text = synthesize_response(prompt)
+        schema = (generation_config or {}).get("response_schema")
+        if schema is None:
+            return text
+        with_prose = PROSE_FIELD in schema.get("properties", {})
+        return structured_fake_response(text, OUTPUT_MODE_JSON_PROSE if with_prose else OUTPUT_MODE_JSON)
+
+    def _pace(self, text):
+        if self.token_rate > 0:
+            self._sleep(estimate_tokens(text) / self.token_rate)
+
+    def _chunks(self, text, usage=None):
+        if self.latency:
+            self._sleep(self.latency)
+        for offset in range(0, len(text), self.chunk_size):
+            chunk = text[offset:offset + self.chunk_size]
+            self._pace(chunk)
+            last = offset + self.chunk_size >= len(text)
+            yield SimpleNamespace(text=chunk, usage_metadata=usage if last else None)
+
+    def reply(self, prompt, generation_config=None) -> str:
+        """오류 주입 판정 후 응답 텍스트"""
+        self._check_error()
+        return self.reply_text(prompt, generation_config)
+
+    def deliver(self, text, stream=False, usage=None):
+        """응답 텍스트 → 응답 객체 또는 청크 이터레이터 (지연/토큰 속도 적용, usage는 마지막 청크에)"""
+        if stream:
+            return self._chunks(text, usage)
+        if self.latency:
+            self._sleep(self.latency)
+        self._pace(text)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def respond(self, prompt, generation_config=None, stream=False):
+        return self.deliver(self.reply(prompt, generation_config), stream)
+
+
+class FakeChatSession:
+    """가짜 백엔드 채팅 세션 - 응답은 FakeBackend가 만들고 히스토리만 누적"""
+
+    def __init__(self, backend, history=None, system=None):
+        self.backend = backend
+        self.history = list(history or [])
+        self.system = system
+
+    def send_message(self, content, stream=False, generation_config=None, on_wait=None):
+        text = self.backend.reply(content, generation_config)
+        usage = fake_usage(self.system, self.history, content, text)
+        self.history.append({"role": "user", "parts": [content]})
+        self.history.append({"role": "model", "parts": [text]})
+        return self.backend.deliver(text, stream, usage)
+
+
+def selected_backend() -> str:
+    """환경변수로 고른 백엔드 이름 (LGAD_BACKEND 우선, LGAD_FAKE_BACKEND=1이면 fake)"""
+    name = os.getenv(BACKEND_ENV, "").strip().lower()
+    if name in BACKENDS:
+        return name
+    if os.getenv(FAKE_BACKEND_ENV, "").strip().lower() in ("1", "true", "yes"):
+        return BACKEND_FAKE
+    return BACKEND_GEMINI
+
+
+def fake_backend_enabled() -> bool:
+    return selected_backend() == BACKEND_FAKE
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(api_key="") -> ModelBackend:
+    """선택된 백엔드 (가짜는 프로세스 공용 하나, Gemini는 API 키별 하나) - 요청은 공용 제한기 대기열을 거침"""
+    name = selected_backend()
+    key = (name, fingerprint_key(api_key) if name == BACKEND_GEMINI else "")
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            limiter = get_request_limiter()
+            if name == BACKEND_FAKE:
+                backend = FakeBackend.from_env(limiter)
+            else:
+                backend = GeminiBackend(api_key, limiter)
+            _backends[key] = backend
+        return backend
@@ -0,0 +1,680 @@
+"""
+LG Art Director System v5.9.0 - Batch Runner
+CSV/JSONL 설정 행 × 크리에이티브 지시사항을 Streamlit 없이 병렬로 생성해 JSONL로 저장
+
+사용 예:
+    python batch.py rows.csv --direction "카멜 코트, 모던한 분위기" --out results.jsonl
+    LGAD_FAKE_BACKEND=1 python batch.py rows.jsonl --direction "테스트" --workers 8
+    python batch.py results.jsonl --regenerate 3 --row r1 --note "조명을 더 밝게"   # 결과의 SET 03만 다시 생성
+    python batch.py rows.csv --direction "카멜 코트" --reuse-packages   # 같은 설정·지시사항의 저장된 패키지는 생성 생략
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from functools import partial
+
+from anchor_check import AnchorIndex, anchor_id, check_document, repair_anchors
+from backend import fake_backend_enabled, get_backend
+from cast_planner import CAST_MODE_LOOKBOOK, check_response, plan_for_settings
+from fanout import fan_out, regenerate_set, requested_sets
+from input_gate import ACTION_BLOCK, gate_input
+from package_store import (
+    SOURCE_BATCH as PACKAGE_SOURCE_BATCH,
+    get_package_store,
+    package_key,
+    store_enabled,
+    store_package,
+    update_package,
+)
+from prompt import current_prompt, slice_prompt
+from request_builder import (
+    OUTPUT_MODE_PROSE,
+    OUTPUT_MODES,
+    SETTINGS_FIELDS,
+    build_combined_prompt,
+    default_settings,
+    format_target_date,
+)
+from response_parser import parse_result
+from schema_validator import repair_response, validate_step1
+from set_document import parse_document
+from structured_output import generation_overrides, to_response_text
+from telemetry import SOURCE_BATCH, add_usage, batch_entry, make_entry, read_usage, record_turn
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_WORKERS = 4
+DEFAULT_RPM = 30
+DEFAULT_RETRIES = 3
+
+# 재시도 대기 시간 (지수 백오프 + 지터)
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# 행별 지시사항 컬럼 (없으면 --direction 사용)
+DIRECTION_FIELD = "direction"
+ROW_ID_FIELD = "row_id"
+
+INT_FIELDS = ("age", "family_count", "cast_seed")
+
+
+class RateLimiter:
+    """분당 요청 수 제한 - 워커 스레드 간 요청 시작 간격을 고르게 유지"""
+
+    def __init__(self, rpm, clock=time.monotonic, sleep=time.sleep):
+        self._interval = 60.0 / rpm if rpm and rpm > 0 else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = self._clock()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self._interval
+        delay = start_at - now
+        if delay > 0:
+            self._sleep(delay)
+
+
+def load_rows(path):
+    """CSV(헤더 필수) 또는 JSONL 설정 행 로드"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            return [dict(row) for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def normalize_row(row, index, direction=""):
+    """입력 행 → (row_id, settings, 지시사항) - 빠진 필드는 default_settings() 값 사용"""
+    settings = default_settings()
+    for field in SETTINGS_FIELDS:
+        value = row.get(field)
+        if value is None or value == "":
+            continue
+        if field in INT_FIELDS:
+            value = int(value)
+        elif field == "target_date" and isinstance(value, str):
+            value = date.fromisoformat(value.strip())
+        elif isinstance(value, str):
+            value = value.strip()
+        settings[field] = value
+
+    row_id = str(row.get(ROW_ID_FIELD) or index)
+    row_direction = (row.get(DIRECTION_FIELD) or direction or "").strip()
+    return row_id, settings, row_direction
+
+
+def load_anchor_index(output_path, index=None):
+    """이미 생성한 결과의 세트 앵커 조합을 project_id별 색인에 등록 (재실행해도 패키지 사이 재사용 점검 유지)"""
+    index = index or AnchorIndex()
+    if not os.path.exists(output_path):
+        return index
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            sets = record.get("sets") or []
+            if record.get("status") != "ok" or not sets:
+                continue
+            settings = record.get("settings") or {}
+            if settings.get("cast_mode") == CAST_MODE_LOOKBOOK:
+                sets = sets[:1]
+            index.add(
+                settings.get("project_id", ""),
+                [frozenset(anchor_id(anchor) for anchor in entry.get("anchors") or ()) for entry in sets],
+            )
+    return index
+
+
+def load_completed(output_path):
+    """이미 성공(또는 입력 차단)한 row_id 집합 (재실행 시 이어서 진행)"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") in ("ok", "blocked"):
+                completed.add(record.get("row_id"))
+    return completed
+
+
+def make_generator(api_key, model_name, prompt_version, output_mode=OUTPUT_MODE_PROSE):
+    """(프롬프트, 시스템 프롬프트 버전) → 응답 텍스트 함수 생성
+
+    스레드 간 공유하며 버전을 생략하면 prompt_version 사용, 구조화 출력은 기존 응답 형식으로 변환.
+    usage(dict)를 주면 응답의 토큰 사용량을 누적
+    """
+    overrides = generation_overrides(output_mode) or None
+    backend = get_backend(api_key)
+
+    def generate(prompt, system=None, usage=None):
+        response = backend.generate(model_name, system or prompt_version, prompt, generation_config=overrides)
+        if usage is not None:
+            add_usage(usage, read_usage(response))
+        return to_response_text(response.text or "", output_mode)
+
+    return generate
+
+
+def backoff_delay(attempt) -> float:
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _fanout_row(generate, limiter, usage, record, plan, sets, prompt):
+    """SET 병렬 생성 한 번 - 합친 응답 텍스트 (세트별 결과는 record["fanout"])"""
+    usage_lock = threading.Lock()
+
+    def generate_part(part_prompt, wait=True):
+        if wait:
+            limiter.wait()
+        part_usage = {}
+        text = generate(part_prompt, usage=part_usage)
+        with usage_lock:
+            add_usage(usage, part_usage)
+        return text
+
+    result = fan_out(partial(generate_part, wait=False), generate_part, prompt, plan, sets)
+    record["fanout"] = {
+        "sets": sorted(result.sets),
+        "failed": {f"{set_no:02d}": error for set_no, error in sorted(result.failed.items())},
+        "timings": {f"{set_no:02d}": seconds for set_no, seconds in sorted(result.timings.items())},
+    }
+    return result.text
+
+
+def run_row(
+    generate,
+    limiter,
+    row_id,
+    settings,
+    direction,
+    model_name,
+    retries,
+    translate=False,
+    output_mode=OUTPUT_MODE_PROSE,
+    prompt_version=None,
+    slicing=None,
+    fanout=False,
+    anchor_index=None,
+    anchor_repair=True,
+    package_store=None,
+    reuse_packages=False,
+):
+    """한 행 생성 - 결과 레코드 반환 (실패해도 예외 대신 status=error 레코드)
+
+    prompt_version이 있으면 행 설정에 맞게 슬라이싱한 시스템 프롬프트로 생성 (slicing=False면 전체)
+    fanout이면 HEADER_JSON 1회 + SET별 요청을 동시에 보내 합침
+    §2.1 앵커는 anchor_index(같은 project_id의 다른 패키지)까지 점검하고, anchor_repair면 위반 세트만 다시 생성
+    (fanout과 앵커 수정은 프로즈+JSON 모드만, SET 요청도 rpm 제한을 받음)
+    package_store가 있으면 SET 문서 결과를 저장하고, reuse_packages면 같은 키(설정+지시사항+모델+프롬프트 버전)의
+    저장된 패키지를 API 호출·수정 없이 그대로 결과로 씀
+    """
+    started = time.perf_counter()
+    record = {
+        "row_id": row_id,
+        "settings": {**settings, "target_date": format_target_date(settings["target_date"])},
+        "model": model_name,
+        "output_mode": output_mode,
+        "prompt_version": prompt_version.version_id if prompt_version else "",
+        "direction": direction,
+        "translate": translate,
+        "status": "error",
+        "attempts": 0,
+    }
+
+    # §0.1/§0.2 로컬 판정 - 차단된 행은 API를 호출하지 않음
+    gate = gate_input(direction)
+    if gate.rules:
+        record["gate"] = list(gate.rules)
+    if gate.action == ACTION_BLOCK:
+        record.update(status="blocked", text=gate.message)
+        record["timings"] = {"total": round(time.perf_counter() - started, 4)}
+        return record
+
+    prompt = build_combined_prompt(settings, gate.text, model_name, translate, output_mode)
+    if prompt_version is not None:
+        system, prompt_slice = slice_prompt(prompt_version, settings, (direction,), enabled=slicing)
+        record["prompt_slice"] = {
+            "version": prompt_slice.version_id,
+            "tokens_saved": prompt_slice.saved_tokens,
+            "dropped": list(prompt_slice.dropped),
+        }
+        generate = partial(generate, system=system)
+    usage = {}
+    generate_row = generate = partial(generate, usage=usage)
+    if fanout and output_mode == OUTPUT_MODE_PROSE:
+        generate_row = partial(_fanout_row, generate, limiter, usage, record, plan_for_settings(settings),
+                               requested_sets(gate.text))
+    build_time = time.perf_counter() - started
+
+    raw = None
+    generate_time = 0.0
+    stored = None
+    key = ""
+    if package_store is not None:
+        key = package_key(settings, direction, model_name, record["prompt_version"], output_mode, translate)
+        record["package_key"] = key
+        if reuse_packages:
+            stored = package_store.find(key)
+    if stored is not None:
+        raw = stored["response"]
+        record["reused_package"] = stored["id"]
+    for attempt in range(1, retries + 2):
+        if stored is not None:
+            break
+        record["attempts"] = attempt
+        limiter.wait()
+        call_started = time.perf_counter()
+        try:
+            raw = generate_row(prompt)
+            generate_time = time.perf_counter() - call_started
+            break
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            if attempt <= retries:
+                time.sleep(backoff_delay(attempt))
+
+    parse_time = 0.0
+    if raw is not None:
+        parse_started = time.perf_counter()
+        parsed, _ = parse_result(raw)
+        parse_time = time.perf_counter() - parse_started
+        errors = validate_step1(parsed.data) if isinstance(parsed.data, dict) else []
+        if errors and stored is None:
+            repairs = []
+
+            def send_repair(repair_prompt):
+                repairs.append(repair_prompt)
+                return generate(repair_prompt)
+
+            try:
+                raw, parsed, errors = repair_response(send_repair, raw, parsed, errors)
+            except Exception as e:
+                record["repair_error"] = f"{type(e).__name__}: {e}"
+            record["repairs"] = len(repairs)
+        doc = parse_document(raw)
+        if doc is not None:
+            project_id = settings.get("project_id", "")
+            # 룩북 여부는 행 설정으로 판단 (HEADER_JSON cast_mode는 선택 키)
+            lookbook = settings.get("cast_mode") == CAST_MODE_LOOKBOOK
+            report = check_document(doc, lookbook=lookbook, index=anchor_index, project_id=project_id)
+            anchors = {"issues": [str(issue) for issue in report.issues]}
+            if not report.ok and anchor_repair and stored is None and output_mode == OUTPUT_MODE_PROSE:
+                usage_lock = threading.Lock()
+
+                def generate_set(set_prompt):
+                    limiter.wait()
+                    set_usage = {}
+                    text = generate(set_prompt, usage=set_usage)
+                    with usage_lock:
+                        add_usage(usage, set_usage)
+                    return text
+
+                anchors["repaired"], failed_sets = repair_anchors(
+                    doc, report, generate_set, prompt, plan_for_settings(settings), anchor_index, project_id
+                )
+                if failed_sets:
+                    anchors["failed"] = {f"{set_no:02d}": error for set_no, error in sorted(failed_sets.items())}
+                raw = doc.markdown()
+                parsed, _ = parse_result(raw)
+                report = check_document(doc, lookbook=lookbook, index=anchor_index, project_id=project_id)
+                anchors["remaining"] = [str(issue) for issue in report.issues]
+            if anchor_index is not None:
+                anchor_index.add_report(project_id, report)
+            record["anchors"] = anchors
+        _, text = parse_result(raw)
+        record.pop("error", None)
+        record.update(
+            status="ok",
+            json=parsed.data,
+            text=text,
+            raw=raw,
+            schema_errors=[f"{error.path}: {error.message}" for error in errors],
+        )
+        if doc is not None:
+            # Step 2가 SET별 필드/프롬프트를 다시 파싱하지 않고 읽도록
+            record["sets"] = doc.to_dict()["sets"]
+            if package_store is not None and stored is None:
+                try:
+                    record["package_id"] = package_store.save(
+                        key,
+                        settings,
+                        raw,
+                        request=prompt,
+                        direction=direction,
+                        model=model_name,
+                        prompt_version=record["prompt_version"],
+                        source=PACKAGE_SOURCE_BATCH,
+                        session_id=str(row_id),
+                    )
+                except sqlite3.Error as e:
+                    record["package_error"] = f"{type(e).__name__}: {e}"
+        diversity, plan_mismatches = check_response(plan_for_settings(settings), text)
+        if diversity is not None:
+            record["diversity"] = {
+                "score": diversity.total,
+                "warnings": list(diversity.warnings),
+                "plan_mismatches": plan_mismatches,
+            }
+
+    if usage:
+        record["usage"] = usage
+    record["timings"] = {
+        "build": round(build_time, 4),
+        "generate": round(generate_time, 3),
+        "parse": round(parse_time, 4),
+        "total": round(time.perf_counter() - started, 3),
+    }
+    return record
+
+
+def regenerate_record(generate, record, set_no, note="", prompt_version=None, slicing=None):
+    """성공한 결과 레코드의 SET 하나만 다시 생성해 raw/text/json/sets를 제자리 갱신 - 같은 레코드 반환
+
+    generate는 make_generator(..., OUTPUT_MODE_PROSE) 함수. 요청은 행 설정으로 다시 조립한 요청 +
+    HEADER_JSON + 이 세트의 슬롯 제약 + 메모만 담고, 다른 세트와 헤더는 그대로 둔다.
+    레코드에 package_key가 있으면 패키지 저장소의 응답과 SET 색인도 갱신 (--reuse-packages가 옛 세트를 쓰지 않도록).
+    prompt_version이 레코드의 버전과 다르면 레코드의 prompt_version/package_key를 새 버전으로 바꾸고 새 키로 저장
+    (기존 키의 패키지는 원래 버전으로 만든 10세트 그대로 남음).
+    """
+    doc = parse_document(record.get("raw"))
+    if record.get("status") != "ok" or doc is None:
+        raise ValueError(f"{record.get('row_id')}: SET 문서가 있는 성공 레코드만 다시 생성할 수 있습니다.")
+    started = time.perf_counter()
+    _, settings, direction = normalize_row(record["settings"], record["row_id"], record.get("direction", ""))
+    gate = gate_input(direction)
+    prompt = build_combined_prompt(settings, gate.text, record["model"], record.get("translate", False), OUTPUT_MODE_PROSE)
+    if prompt_version is not None:
+        system, _ = slice_prompt(prompt_version, settings, (direction,), enabled=slicing)
+        generate = partial(generate, system=system)
+    usage = {}
+    regenerate_set(partial(generate, usage=usage), doc, set_no, prompt, plan_for_settings(settings), note)
+
+    raw = doc.markdown()
+    parsed, text = parse_result(raw)
+    record.update(json=parsed.data, text=text, raw=raw, sets=doc.to_dict()["sets"])
+    version_id = prompt_version.version_id if prompt_version else record.get("prompt_version", "")
+    previous_version = record.get("prompt_version", "")
+    if version_id != previous_version:
+        record["prompt_version"] = version_id
+        if record.get("package_key"):
+            record["package_key"] = package_key(
+                settings,
+                direction,
+                record["model"],
+                version_id,
+                record.get("output_mode", OUTPUT_MODE_PROSE),
+                record.get("translate", False),
+            )
+            record["package_id"] = store_package(
+                record["package_key"],
+                settings,
+                raw,
+                request=prompt,
+                direction=direction,
+                model=record["model"],
+                prompt_version=version_id,
+                source=PACKAGE_SOURCE_BATCH,
+                session_id=str(record["row_id"]),
+            )
+    elif record.get("package_key"):
+        update_package(record["package_key"], raw)
+    diversity, plan_mismatches = check_response(plan_for_settings(settings), text)
+    if diversity is not None:
+        record["diversity"] = {
+            "score": diversity.total,
+            "warnings": list(diversity.warnings),
+            "plan_mismatches": plan_mismatches,
+        }
+    seconds = round(time.perf_counter() - started, 3)
+    record.setdefault("regenerated", []).append(
+        {"set": set_no, "note": note, "usage": usage, "seconds": seconds, "prompt_version": version_id}
+    )
+    if version_id != previous_version:
+        record["regenerated"][-1]["previous_prompt_version"] = previous_version
+    record_turn(
+        make_entry(
+            SOURCE_BATCH,
+            record["model"],
+            prompt_version=version_id,
+            project_id=settings.get("project_id", ""),
+            session_id=str(record["row_id"]),
+            output_mode=OUTPUT_MODE_PROSE,
+            usage=usage,
+            latency=seconds,
+            json_parsed=isinstance(parsed.data, dict),
+        )
+    )
+    return record
+
+
+def regenerate_results(output_path, set_no, row_ids=None, note="", api_key="", allow_prompt_change=False, log=print):
+    """결과 JSONL에서 고른 행(없으면 성공한 모든 행)의 SET 하나만 다시 생성하고 파일을 원자적으로 교체 - (갱신 수, 실패 수)
+
+    시스템 프롬프트(prompts/*.md)가 결과를 만든 버전과 다르면 한 세트만 다른 프롬프트로 섞이므로 그 행은 실패로 건너뜀
+    (allow_prompt_change면 진행하고 레코드/저장소를 새 버전으로 표시)
+    """
+    with open(output_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    prompt_version = current_prompt()
+    generators = {}
+    updated = failed = 0
+    for record in records:
+        if record.get("status") != "ok" or (row_ids and str(record.get("row_id")) not in row_ids):
+            continue
+        pinned = record.get("prompt_version", "")
+        if pinned and pinned != prompt_version.version_id:
+            if not allow_prompt_change:
+                failed += 1
+                log(
+                    f"{record.get('row_id')} SET {set_no:02d} 건너뜀: 결과는 프롬프트 {pinned}, "
+                    f"현재 {prompt_version.version_id} (--allow-prompt-change로 진행 가능)"
+                )
+                continue
+            log(f"{record.get('row_id')} 경고: 프롬프트 {pinned} → {prompt_version.version_id}로 SET {set_no:02d} 생성")
+        model_name = record.get("model") or DEFAULT_MODEL
+        if model_name not in generators:
+            generators[model_name] = make_generator(api_key, model_name, prompt_version, OUTPUT_MODE_PROSE)
+        try:
+            regenerate_record(generators[model_name], record, set_no, note, prompt_version)
+        except Exception as e:
+            failed += 1
+            log(f"{record.get('row_id')} SET {set_no:02d} 실패: {type(e).__name__}: {e}")
+            continue
+        updated += 1
+        log(f"{record.get('row_id')} SET {set_no:02d} 교체 ({record['regenerated'][-1]['seconds']:.1f}s)")
+
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as out:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(temp_path, output_path)
+    return updated, failed
+
+
+def run_batch(
+    rows,
+    direction,
+    output_path,
+    model_name=DEFAULT_MODEL,
+    api_key="",
+    workers=DEFAULT_WORKERS,
+    rpm=DEFAULT_RPM,
+    retries=DEFAULT_RETRIES,
+    translate=False,
+    output_mode=OUTPUT_MODE_PROSE,
+    fanout=False,
+    anchor_repair=True,
+    reuse_packages=False,
+    log=print,
+):
+    """행 목록을 병렬 생성해 output_path(JSONL)에 한 줄씩 추가 - (성공 수, 실패 수, 건너뜀 수) 반환
+
+    §2.1 앵커 조합 색인은 배치 전체(이미 있는 결과 포함)가 공유해 같은 project_id 안에서 조합 재사용을 막음
+    성공한 패키지는 패키지 저장소(package_store.py)에 저장하고, reuse_packages면 저장된 패키지를 생성 없이 재사용
+    """
+    completed = load_completed(output_path)
+    jobs = []
+    for index, row in enumerate(rows, start=1):
+        row_id, settings, row_direction = normalize_row(row, index, direction)
+        if row_id in completed:
+            continue
+        jobs.append((row_id, settings, row_direction))
+
+    skipped = len(rows) - len(jobs)
+    if not jobs:
+        return 0, 0, skipped
+
+    # 배치 전체가 시작 시점의 프롬프트 버전을 사용 (도중에 md가 바뀌어도 섞이지 않음)
+    prompt_version = current_prompt()
+    generate = make_generator(api_key, model_name, prompt_version, output_mode)
+    limiter = RateLimiter(rpm)
+    anchor_index = load_anchor_index(output_path)
+    package_store = get_package_store() if store_enabled() else None
+    if reuse_packages and package_store is None:
+        log("패키지 저장소가 꺼져 있어 재사용하지 않습니다.")
+    write_lock = threading.Lock()
+    ok = failed = 0
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                run_row,
+                generate,
+                limiter,
+                row_id,
+                settings,
+                row_direction,
+                model_name,
+                retries,
+                translate,
+                output_mode,
+                prompt_version,
+                fanout=fanout,
+                anchor_index=anchor_index,
+                anchor_repair=anchor_repair,
+                package_store=package_store,
+                reuse_packages=reuse_packages,
+            )
+            for row_id, settings, row_direction in jobs
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            record_turn(batch_entry(record))
+            if record["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+            log(
+                f"[{ok + failed}/{len(jobs)}] {record['row_id']} {record['status']} "
+                f"({record['timings']['total']:.1f}s, 시도 {record['attempts']})"
+                + (f" - 저장된 패키지 #{record['reused_package']} 재사용" if "reused_package" in record else "")
+            )
+
+    return ok, failed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LG Art Director Step 1 배치 생성")
+    parser.add_argument("rows", help="설정 행 파일 (.csv 또는 .jsonl), --regenerate면 결과 JSONL")
+    parser.add_argument("--direction", default="", help="공통 크리에이티브 지시사항 (행의 direction 컬럼이 우선)")
+    parser.add_argument("--out", default="batch_results.jsonl", help="결과 JSONL 경로 (이미 있으면 이어서 진행)")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM, help="분당 최대 요청 수 (0 = 제한 없음)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--translate", action="store_true", help="한국어 번역 섹션 요청")
+    parser.add_argument(
+        "--output-mode",
+        choices=OUTPUT_MODES,
+        default=OUTPUT_MODE_PROSE,
+        help="JSON/JSON_PROSE는 response_schema 구조화 출력 사용",
+    )
+    parser.add_argument(
+        "--fanout",
+        action="store_true",
+        help="HEADER_JSON 후 SET 01~10을 세트별 요청으로 동시에 생성 (출력 토큰 한도로 잘리지 않음)",
+    )
+    parser.add_argument(
+        "--no-anchor-repair",
+        action="store_true",
+        help="§2.1 앵커 위반(세트/패키지 간 중복, 프롬프트 누락)을 기록만 하고 세트를 다시 생성하지 않음",
+    )
+    parser.add_argument(
+        "--reuse-packages",
+        action="store_true",
+        help="같은 설정+지시사항+모델+프롬프트 버전으로 저장된 패키지가 있으면 API를 호출하지 않고 그대로 사용",
+    )
+    parser.add_argument(
+        "--regenerate",
+        type=int,
+        metavar="SET",
+        help="결과 JSONL(rows 위치)에서 이 SET 번호만 다시 생성해 제자리 갱신 (다른 세트는 그대로)",
+    )
+    parser.add_argument("--row", action="append", help="--regenerate 대상 row_id (반복 가능, 없으면 성공한 모든 행)")
+    parser.add_argument("--note", default="", help="--regenerate 수정 메모")
+    parser.add_argument(
+        "--allow-prompt-change",
+        action="store_true",
+        help="--regenerate 때 시스템 프롬프트 버전이 결과와 달라도 진행 (레코드/저장소의 버전을 새 버전으로 갱신)",
+    )
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("GOOGLE_API_KEY", "").strip()
+    if not api_key and not fake_backend_enabled():
+        raise SystemExit("GOOGLE_API_KEY 환경변수가 필요합니다.")
+
+    if args.regenerate is not None:
+        updated, failed = regenerate_results(
+            args.rows,
+            args.regenerate,
+            args.row,
+            args.note,
+            api_key=api_key,
+            allow_prompt_change=args.allow_prompt_change,
+        )
+        print(f"완료: SET {args.regenerate:02d} 교체 {updated} / 실패 {failed} → {args.rows}")
+        return
+
+    rows = load_rows(args.rows)
+    ok, failed, skipped = run_batch(
+        rows,
+        args.direction,
+        args.out,
+        model_name=args.model,
+        api_key=api_key,
+        workers=args.workers,
+        rpm=args.rpm,
+        retries=args.retries,
+        translate=args.translate,
+        output_mode=args.output_mode,
+        fanout=args.fanout,
+        anchor_repair=not args.no_anchor_repair,
+        reuse_packages=args.reuse_packages,
+    )
+    print(f"완료: 성공 {ok} / 실패 {failed} / 건너뜀 {skipped} → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
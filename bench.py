@@ -0,0 +1,364 @@
+"""
+LG Art Director System v5.9.0 - Benchmark Suite
+프롬프트 조립 → 생성(가짜 백엔드) → 파싱 → 검증 → 히스토리 렌더링 구간별 지연(p50/p95/p99)과 메모리 할당 측정
+
+사용 예:
+    python bench.py --out bench.json
+    python bench.py --corpus results.jsonl --runs 200 --out bench.json --compare bench_prev.json
+    python bench.py --sessions 8 --turns 5 --latency 0.5 --token-rate 400
+    python bench.py --rerun    # Streamlit AppTest로 앱 전체 rerun 시간까지 측정
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from backend import FakeBackend, load_replay, synthesize_response
+from cast_planner import check_response, plan_for_settings
+from history import build_chat_history, compact_history
+from input_gate import gate_input
+from prompt import SYSTEM_VERSION, current_prompt, load_system_prompt, slice_prompt
+from render_cache import get_artifact, percentile
+from request_builder import CITY_OPTIONS, build_combined_prompt, default_settings
+from response_parser import parse_result
+from schema_validator import validate_step1
+from streaming import StreamAccumulator
+
+DEFAULT_RUNS = 100
+WARMUP_RUNS = 3
+
+# 할당량은 tracemalloc 오버헤드 때문에 지연 측정과 따로 몇 번만 측정
+ALLOC_RUNS = 5
+
+# 히스토리 길이(턴 수) 케이스
+HISTORY_TURNS = (1, 10, 50)
+
+# 앱 전체 rerun 측정 횟수 (AppTest 한 번에 수백 ms)
+RERUN_RUNS = 5
+
+# 파싱 케이스 - 잘린 응답은 JSON의 이 비율까지만, 거대 응답은 SET 본문을 이만큼 반복
+TRUNCATE_RATIO = 0.6
+HUGE_REPEAT = 20
+
+# 동시 세션 모드 기본값
+DEFAULT_SESSIONS = 4
+DEFAULT_TURNS = 3
+
+# 이전 결과 대비 p95가 이 비율 넘게 늘면 회귀로 표시
+REGRESSION_THRESHOLD = 0.2
+
+DIRECTION = "카멜 코트, 모던한 분위기, 미술관 프리오프닝 데이"
+
+
+def summarize_times(times_ms) -> dict:
+    """밀리초 목록 → 지연 통계"""
+    return {
+        "runs": len(times_ms),
+        "p50_ms": round(percentile(times_ms, 50), 4),
+        "p95_ms": round(percentile(times_ms, 95), 4),
+        "p99_ms": round(percentile(times_ms, 99), 4),
+        "mean_ms": round(sum(times_ms) / len(times_ms), 4),
+        "max_ms": round(max(times_ms), 4),
+    }
+
+
+def measure_allocations(fn, runs=ALLOC_RUNS) -> dict:
+    """호출당 평균 최대 할당량/남은 할당량 (KB)"""
+    peaks, nets = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(runs):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            nets.append(current - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kb": round(sum(peaks) / len(peaks) / 1024, 1),
+        "alloc_net_kb": round(sum(nets) / len(nets) / 1024, 1),
+    }
+
+
+def bench_case(fn, runs=DEFAULT_RUNS, warmup=WARMUP_RUNS) -> dict:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return {**summarize_times(times), **measure_allocations(fn, min(runs, ALLOC_RUNS))}
+
+
+def sample_settings():
+    """지역/캐스트 모드/다양성 모드를 돌려가며 만든 설정 목록"""
+    variants = []
+    for index, (region, cast_mode, diversity_mode) in enumerate(
+        (("EU", "SINGLE", "SAFE"), ("LATAM", "SINGLE", "FULL"), ("EU", "MULTI", "FULL"), ("LATAM", "MULTI", "SAFE"))
+    ):
+        settings = default_settings()
+        settings.update(
+            region=region,
+            city=CITY_OPTIONS[region][index],
+            cast_mode=cast_mode,
+            diversity_mode=diversity_mode,
+            cast_seed=index,
+        )
+        variants.append(settings)
+    return variants
+
+
+def synthetic_corpus() -> list:
+    """가짜 백엔드 합성 응답 (녹화 응답이 없을 때)"""
+    return [
+        synthesize_response(build_combined_prompt(settings, DIRECTION, "gemini-2.5-flash", False))
+        for settings in sample_settings()
+    ]
+
+
+def parse_variants(text) -> dict:
+    """응답 한 개 → 파싱 케이스별 입력 (clean: 펜스 없는 JSON, fenced: 원본, truncated, huge)"""
+    variants = {"fenced": text}
+    head, fence, rest = text.partition("```json\n")
+    if fence:
+        body, _, tail = rest.partition("\n```")
+        variants["clean"] = head + body + tail
+        variants["truncated"] = head + fence + body[: int(len(body) * TRUNCATE_RATIO)]
+        sets = tail.split("## SET ", 1)
+        variants["huge"] = text + ("\n\n## SET " + sets[1]) * HUGE_REPEAT if len(sets) > 1 else text * HUGE_REPEAT
+    return variants
+
+
+def make_conversation(turns, corpus, settings=None) -> list:
+    """model_messages 형식의 대화 (user: 조립된 요청, assistant: 코퍼스 응답)"""
+    settings = settings or default_settings()
+    messages = []
+    for turn in range(turns):
+        messages.append(
+            {"role": "user", "content": build_combined_prompt(settings, f"{DIRECTION} {turn}", "gemini-2.5-flash", False)}
+        )
+        messages.append({"role": "assistant", "content": corpus[turn % len(corpus)]})
+    return messages
+
+
+def run_turn(backend, settings, direction, chat=None):
+    """한 턴 전체 (입력 판정 → 슬라이스 → 요청 조립 → 생성 → 파싱 → 검증 → 캐스트 채점)"""
+    gate = gate_input(direction, log=False)
+    system, _ = slice_prompt(current_prompt(), settings, (direction,))
+    prompt = build_combined_prompt(settings, gate.text, "gemini-2.5-flash", False)
+    if chat is None:
+        text = backend.generate("gemini-2.5-flash", system, prompt).text
+    else:
+        accumulator = StreamAccumulator()
+        for chunk in chat.send_message(prompt, stream=True):
+            accumulator.feed(chunk.text)
+        accumulator.finish()
+        text = accumulator.text
+    parsed, prose = parse_result.__wrapped__(text)
+    errors = validate_step1(parsed.data) if isinstance(parsed.data, dict) else []
+    check_response(plan_for_settings(settings), prose)
+    return prompt, text, errors
+
+
+def run_suite(corpus, runs=DEFAULT_RUNS, log=print) -> dict:
+    """구간별 벤치마크 - {케이스 이름: 통계}"""
+    cases = {}
+    settings = default_settings()
+    version = current_prompt()
+    parse_uncached = parse_result.__wrapped__
+
+    def add(name, fn, case_runs=runs):
+        cases[name] = bench_case(fn, case_runs)
+        log(f"{name:<34} p50 {cases[name]['p50_ms']:>9.3f}ms  p95 {cases[name]['p95_ms']:>9.3f}ms  "
+            f"peak {cases[name]['alloc_peak_kb']:>8.1f}KB")
+
+    add("load_system_prompt", load_system_prompt, max(10, runs // 10))
+    add("slice_prompt", lambda: slice_prompt(version, settings, (DIRECTION,)))
+    add("gate_input", lambda: gate_input(DIRECTION, log=False))
+    add("build_combined_prompt", lambda: build_combined_prompt(settings, DIRECTION, "gemini-2.5-flash", False))
+
+    for turns in HISTORY_TURNS:
+        conversation = make_conversation(turns, corpus)
+        add(f"build_chat_history[{turns}]", lambda messages=conversation: build_chat_history(messages))
+        add(f"compact_history[{turns}]", lambda messages=conversation: compact_history(messages))
+
+    for kind, text in parse_variants(corpus[0]).items():
+        add(f"parse_response[{kind}]", lambda text=text: parse_uncached(text))
+    add("parse_response[memoized]", lambda: parse_result(corpus[0]))
+
+    parsed, prose = parse_uncached(corpus[0])
+    add("validate_step1", lambda: validate_step1(parsed.data))
+    add("check_response", lambda: check_response(plan_for_settings(settings), prose))
+
+    for turns in HISTORY_TURNS:
+        conversation = make_conversation(turns, corpus)
+        add(f"render_artifacts[{turns}]", lambda messages=conversation: [get_artifact({}, msg) for msg in messages])
+
+    backend = FakeBackend(token_rate=0)
+    add("turn_e2e", lambda: run_turn(backend, settings, DIRECTION))
+    return cases
+
+
+def run_rerun(turns_list=HISTORY_TURNS, corpus=(), runs=RERUN_RUNS, log=print) -> dict:
+    """Streamlit AppTest로 대화 길이별 앱 전체 rerun 시간 측정 (streamlit 없으면 빈 결과)"""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        log("streamlit.testing 없음 - rerun 측정 생략")
+        return {}
+
+    os.environ.setdefault("LGAD_FAKE_BACKEND", "1")
+    cases = {}
+    for turns in turns_list:
+        conversation = make_conversation(turns, corpus)
+        messages = [{"role": msg["role"], "content": msg["content"] if msg["role"] == "assistant" else DIRECTION}
+                    for msg in conversation]
+        app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), default_timeout=120)
+        app.session_state["messages"] = messages
+        app.session_state["model_messages"] = conversation
+        app.run()
+        if app.exception:
+            cases[f"app_rerun[{turns}]"] = {"error": str(app.exception[0].value)}
+            continue
+        times = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            app.run()
+            times.append((time.perf_counter() - started) * 1000)
+        cases[f"app_rerun[{turns}]"] = summarize_times(times)
+        log(f"app_rerun[{turns}]".ljust(34) + f" p50 {cases[f'app_rerun[{turns}]']['p50_ms']:>9.3f}ms")
+    return cases
+
+
+def run_sessions(backend, sessions=DEFAULT_SESSIONS, turns=DEFAULT_TURNS) -> dict:
+    """동시 Streamlit 세션 시뮬레이션 - 세션마다 스레드 하나가 스트리밍 턴을 반복 (히스토리 렌더링 포함)"""
+    turn_times, ttfts = [], []
+    lock = threading.Lock()
+    variants = sample_settings()
+
+    def session(index):
+        settings = variants[index % len(variants)]
+        chat, _ = backend.start_chat("gemini-2.5-flash", current_prompt(), [])
+        messages, model_messages, render_cache = [], [], {}
+        for turn in range(turns):
+            direction = f"{DIRECTION} {index}-{turn}"
+            started = time.perf_counter()
+            compacted, _ = compact_history(model_messages)
+            chat.history = build_chat_history(compacted)
+            system, _ = slice_prompt(current_prompt(), settings, (direction,))
+            prompt = build_combined_prompt(settings, direction, "gemini-2.5-flash", False)
+            accumulator = StreamAccumulator()
+            for chunk in chat.send_message(prompt, stream=True):
+                accumulator.feed(chunk.text)
+            accumulator.finish()
+            parsed, prose = parse_result(accumulator.text)
+            if isinstance(parsed.data, dict):
+                validate_step1(parsed.data)
+            check_response(plan_for_settings(settings), prose)
+            messages += [{"role": "user", "content": direction}, {"role": "assistant", "content": accumulator.text}]
+            model_messages += [{"role": "user", "content": prompt}, {"role": "assistant", "content": accumulator.text}]
+            for msg in messages:
+                get_artifact(render_cache, msg)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                turn_times.append(elapsed)
+                if accumulator.ttft is not None:
+                    ttfts.append(accumulator.ttft * 1000)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(index,)) for index in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "latency": backend.latency,
+        "token_rate": backend.token_rate,
+        "turn": summarize_times(turn_times),
+        "ttft": summarize_times(ttfts) if ttfts else None,
+        "throughput_turns_per_s": round(len(turn_times) / wall, 2),
+    }
+
+
+def compare_results(previous, current, threshold=REGRESSION_THRESHOLD) -> list:
+    """이전 결과 대비 p95 변화 - [(케이스, 이전 p95, 현재 p95, 비율, 회귀 여부)]"""
+    rows = []
+    for name, stats in current.get("cases", {}).items():
+        before = previous.get("cases", {}).get(name)
+        if not before or "p95_ms" not in before or "p95_ms" not in stats:
+            continue
+        ratio = stats["p95_ms"] / before["p95_ms"] if before["p95_ms"] else 1.0
+        rows.append((name, before["p95_ms"], stats["p95_ms"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LG Art Director 구간별 벤치마크 (오프라인 가짜 백엔드)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="케이스당 반복 횟수")
+    parser.add_argument("--corpus", help="녹화 응답 JSONL (batch.py 결과) - 없으면 합성 응답 사용")
+    parser.add_argument("--out", help="결과 JSON 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="회귀로 보는 p95 증가율")
+    parser.add_argument("--rerun", action="store_true", help="Streamlit AppTest로 앱 전체 rerun 측정")
+    parser.add_argument("--sessions", type=int, default=0, help="동시 세션 시뮬레이션 세션 수 (0 = 생략)")
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help="세션당 턴 수")
+    parser.add_argument("--latency", type=float, help="가짜 백엔드 첫 토큰 지연(초), 기본은 LGAD_FAKE_LATENCY")
+    parser.add_argument("--token-rate", type=float, help="가짜 백엔드 초당 출력 토큰, 기본은 LGAD_FAKE_TOKEN_RATE")
+    args = parser.parse_args(argv)
+
+    corpus = load_replay(args.corpus) if args.corpus else synthetic_corpus()
+    result = {
+        "system_version": SYSTEM_VERSION,
+        "prompt_version": current_prompt().version_id,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "corpus": {"source": args.corpus or "synthetic", "size": len(corpus)},
+        "cases": run_suite(corpus, args.runs),
+    }
+    if args.rerun:
+        result["cases"].update(run_rerun(corpus=corpus))
+    if args.sessions:
+        backend = FakeBackend.from_env()
+        if args.latency is not None:
+            backend.latency = args.latency
+        if args.token_rate is not None:
+            backend.token_rate = args.token_rate
+        result["sessions"] = run_sessions(backend, args.sessions, args.turns)
+        sessions = result["sessions"]
+        print(
+            f"sessions {args.sessions} × {args.turns}턴: 턴 p50 {sessions['turn']['p50_ms']:.0f}ms "
+            f"p95 {sessions['turn']['p95_ms']:.0f}ms · {sessions['throughput_turns_per_s']} 턴/s"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장 → {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = 0
+        print(f"\n--- {previous.get('prompt_version', '?')} 대비 p95 ---")
+        for name, before, after, ratio, regressed in compare_results(previous, result, args.threshold):
+            regressions += regressed
+            print(f"{name:<34} {before:>9.3f} → {after:>9.3f}ms  ×{ratio:.2f}{'  ⚠️ 회귀' if regressed else ''}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
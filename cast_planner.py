@@ -0,0 +1,571 @@
+"""
+LG Art Director System v5.9.0 - Cast Planner
+§1.3 5+3+2 분배 / §4 모델 풀 / §5.4 AUTO-BALANCE / §5.5 체형 / §5.6 나이 규칙으로
+시드 고정 10인 캐스트 계획을 로컬에서 만들고, 모델 응답의 캐스트를 같은 표로 채점
+"""
+
+import hashlib
+import json
+import random
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# §1.3 세트 번호 → 배치
+BATCH_TYPICAL = "TYPICAL"
+BATCH_MIXED = "MIXED"
+BATCH_ATYPICAL = "ATYPICAL"
+SET_BATCHES = (BATCH_TYPICAL,) * 5 + (BATCH_MIXED,) * 3 + (BATCH_ATYPICAL,) * 2
+SET_COUNT = len(SET_BATCHES)
+
+CAST_MODE_LOOKBOOK = "SINGLE_MODEL_LOOKBOOK"
+
+# §5.4 DIMENSION 1 - 체형별 목표 인원 (10명 기준)
+BODY_TYPES = ("STANDARD", "ATHLETIC", "CURVY", "PLUS-SIZE", "PETITE", "TALL")
+BODY_TARGETS = {
+    "STANDARD": (3, 4),
+    "ATHLETIC": (1, 2),
+    "CURVY": (2, 3),
+    "PLUS-SIZE": (1, 2),
+    "PETITE": (1, 1),
+    "TALL": (1, 1),
+}
+
+# SAFE 모드는 같은 인상 안에서 체형만 미세 변화 (§1.3 TYPICAL 특징)
+SAFE_BODY_TYPES = ("STANDARD", "ATHLETIC", "CURVY", "PETITE", "TALL")
+
+# §5.4 DIMENSION 2 - Fitzpatrick 피부톤과 프롬프트 묘사어
+SKIN_TONES = ("I-II", "III", "IV", "V", "VI")
+SKIN_DESCRIPTORS = {
+    "I-II": "very fair, porcelain",
+    "III": "fair to medium, warm",
+    "IV": "olive, tan, golden",
+    "V": "medium brown, caramel",
+    "VI": "deep brown, rich dark",
+}
+
+# §5.4 DIMENSION 3 - 나이대
+AGE_BANDS = ("20-29", "30-39", "40-49", "50-59", "60+")
+
+# §5.6 나이 미지정 시 분배 - 20대(3) 30대(3) 40대(2) 50대+(2), 50대+는 50대/60대로 나눔
+UNSPECIFIED_AGE_BANDS = (
+    (25, 3),
+    (34, 3),
+    (44, 2),
+)
+MATURE_AGE_SPLITS = ((54, 58), (55, 63))
+
+# §5.6 Sets 09-10 나이 변화 폭 / 최소 나이
+ATYPICAL_AGE_SPREAD = 10
+MIN_AGE = 20
+
+# §5.4 DIMENSION 4 - 헤어 텍스처
+HAIR_TEXTURES = ("STRAIGHT", "WAVY", "CURLY", "COILY", "PROTECTIVE")
+NATURAL_TEXTURES = ("CURLY", "COILY")
+
+# §5.4 FEATURE VARIETY
+FEATURES = ("GLASSES", "FRECKLES", "VITILIGO", "VISIBLE_DISABILITY", "GREY_HAIR")
+
+# 회색/흰머리를 자연스럽게 배정할 최소 나이
+GREY_HAIR_MIN_AGE = 50
+
+# §2.1 BIOMETRIC IDENTIFIER POOL - HEADER_JSON biometric_ids 표기, 세트마다 2개
+BIOMETRIC_IDS = (
+    "mole_under_left_eye",
+    "scar_on_right_eyebrow",
+    "widows_peak_hairline",
+    "asymmetric_smile_left_higher",
+    "prominent_cupids_bow",
+    "freckle_pattern_on_nose_bridge",
+    "dimple_on_left_cheek",
+    "high_cheekbones",
+    "aquiline_nose_with_bump",
+    "full_lower_lip",
+    "naturally_arched_eyebrows",
+    "beauty_mark_on_right_cheek",
+    "cleft_chin",
+    "almond_shaped_eyes",
+    "wide_set_eyes",
+)
+ANCHORS_PER_SET = 2
+
+# 계획 후보 탐색 횟수 (점검을 모두 통과하면 조기 종료)
+MAX_PLAN_ATTEMPTS = 64
+
+Phenotype = namedtuple("Phenotype", ["id", "name", "tones", "hair"])
+
+# §4 모델 풀 - 피부 묘사를 Fitzpatrick 범위로, 헤어 묘사를 텍스처 범위로 환산
+POOLS = {
+    ("EU", BATCH_TYPICAL): (
+        Phenotype("EU_TYP_01", "Northern European", ("I-II",), ("STRAIGHT", "WAVY")),
+        Phenotype("EU_TYP_02", "Mediterranean European", ("III", "IV"), ("WAVY", "CURLY")),
+        Phenotype("EU_TYP_03", "Eastern European", ("I-II", "III"), ("STRAIGHT", "WAVY")),
+        Phenotype("EU_TYP_04", "Celtic/British Isles", ("I-II",), ("STRAIGHT", "WAVY", "CURLY")),
+        Phenotype("EU_TYP_05", "Central European", ("I-II", "III"), ("STRAIGHT", "WAVY")),
+    ),
+    ("EU", BATCH_MIXED): (
+        Phenotype("EU_MIX_01", "Euro-African Heritage", ("IV", "V"), ("CURLY", "COILY", "PROTECTIVE")),
+        Phenotype("EU_MIX_02", "Euro-Asian Heritage", ("III", "IV"), ("STRAIGHT", "WAVY")),
+        Phenotype("EU_MIX_03", "Euro-Middle Eastern Heritage", ("IV",), ("WAVY", "CURLY")),
+    ),
+    ("LATAM", BATCH_TYPICAL): (
+        Phenotype("LATAM_TYP_01", "Afro-Brazilian/Afro-Caribbean", ("V", "VI"), ("COILY", "PROTECTIVE")),
+        Phenotype("LATAM_TYP_02", "Indigenous Andean", ("IV", "V"), ("STRAIGHT",)),
+        Phenotype("LATAM_TYP_03", "Mestizo/Mixed Latin", ("IV", "V"), ("WAVY", "CURLY")),
+        Phenotype("LATAM_TYP_04", "Afro-Colombian", ("V", "VI"), ("CURLY", "COILY", "PROTECTIVE")),
+        Phenotype("LATAM_TYP_05", "Southern Cone", ("I-II", "III", "IV"), ("STRAIGHT", "WAVY", "CURLY")),
+    ),
+    ("LATAM", BATCH_MIXED): (
+        Phenotype("LATAM_MIX_01", "Afro-Indigenous Heritage", ("V",), ("CURLY",)),
+        Phenotype("LATAM_MIX_02", "Euro-Indigenous Heritage", ("III", "IV"), ("STRAIGHT", "WAVY")),
+        Phenotype("LATAM_MIX_03", "Asian-Latin Heritage", ("III", "IV"), ("STRAIGHT", "WAVY")),
+    ),
+}
+
+# ATYPICAL(09-10)은 다른 지역 TYPICAL 풀에서 선택 (§1.4 "완전 다른 인종 가능")
+OTHER_REGION = {"EU": "LATAM", "LATAM": "EU"}
+
+# 고정 인종 → 피부톤 범위 (키워드 매칭, 모르는 값은 전체 범위)
+ETHNICITY_TONES = (
+    ("caucasian", ("I-II", "III", "IV")),
+    ("white", ("I-II", "III", "IV")),
+    ("southeast asian", ("III", "IV", "V")),
+    ("east asian", ("III", "IV")),
+    ("south asian", ("IV", "V", "VI")),
+    ("african", ("V", "VI")),
+    ("black", ("V", "VI")),
+    ("hispanic", ("III", "IV", "V")),
+    ("latino", ("III", "IV", "V")),
+    ("middle eastern", ("III", "IV")),
+    ("native american", ("IV", "V")),
+    ("pacific islander", ("IV", "V")),
+    ("aboriginal", ("V", "VI")),
+)
+
+CastSlot = namedtuple("CastSlot", ["set_no", "batch", "phenotype", "age", "body", "skin", "hair", "features"])
+CastPlan = namedtuple("CastPlan", ["seed", "diversity_mode", "cast_mode", "checks", "slots", "score"])
+DiversityScore = namedtuple(
+    "DiversityScore", ["total", "body", "skin", "age", "hair", "features", "warnings"]
+)
+
+_BODY_INDEX = {name: index for index, name in enumerate(BODY_TYPES)}
+_SKIN_INDEX = {name: index for index, name in enumerate(SKIN_TONES)}
+_HAIR_INDEX = {name: index for index, name in enumerate(HAIR_TEXTURES)}
+_FEATURE_BITS = {name: 1 << index for index, name in enumerate(FEATURES)}
+_PLUS_SIZE = _BODY_INDEX["PLUS-SIZE"]
+_NATURAL_MASK = sum(1 << _HAIR_INDEX[name] for name in NATURAL_TEXTURES)
+
+
+def _body_distributions():
+    """§5.4 목표 범위 안에서 합이 10명이 되는 체형 분배 전체"""
+    results = [[]]
+    for name in BODY_TYPES:
+        low, high = BODY_TARGETS[name]
+        results = [counts + [count] for counts in results for count in range(low, high + 1)]
+    return tuple(tuple(counts) for counts in results if sum(counts) == SET_COUNT)
+
+
+BODY_DISTRIBUTIONS = _body_distributions()
+
+
+def age_band(age) -> int:
+    """나이 → AGE_BANDS 인덱스 (20세 미만은 20대로 취급)"""
+    return min(max(int(age) // 10 - 2, 0), len(AGE_BANDS) - 1)
+
+
+def active_checks(diversity_mode, fixed_ethnicity, fixed_age, cast_mode="SINGLE") -> frozenset:
+    """균형 점검을 적용할 차원 - FULL 모드에서만, 사용자 고정값(§1.2 우선순위 2)은 제외"""
+    if diversity_mode != "FULL" or cast_mode == CAST_MODE_LOOKBOOK:
+        return frozenset()
+    checks = {"body", "hair"}
+    if not fixed_ethnicity:
+        checks.add("skin")
+    if fixed_age is None:
+        checks.add("age")
+    return frozenset(checks)
+
+
+def score_cast(slots, checks=frozenset()) -> DiversityScore:
+    """§5.4 COMPOSITE DIVERSITY SCORE + BALANCE CHECK (checks에 든 차원만 경고)
+
+    슬롯을 인덱스/비트마스크로 바꿔 고정 크기 카운트 배열 하나로 모든 차원을 계산한다.
+    값이 없는(None) 항목은 집계에서 빠진다.
+    """
+    body_counts = [0] * len(BODY_TYPES)
+    skin_counts = [0] * len(SKIN_TONES)
+    age_counts = [0] * len(AGE_BANDS)
+    hair_counts = [0] * len(HAIR_TEXTURES)
+    feature_mask = hair_mask = 0
+    ages = []
+    for slot in slots:
+        if slot.body in _BODY_INDEX:
+            body_counts[_BODY_INDEX[slot.body]] += 1
+        if slot.skin in _SKIN_INDEX:
+            skin_counts[_SKIN_INDEX[slot.skin]] += 1
+        if slot.hair in _HAIR_INDEX:
+            hair_counts[_HAIR_INDEX[slot.hair]] += 1
+            hair_mask |= 1 << _HAIR_INDEX[slot.hair]
+        if slot.age is not None:
+            ages.append(slot.age)
+            age_counts[age_band(slot.age)] += 1
+        for feature in slot.features:
+            feature_mask |= _FEATURE_BITS.get(feature, 0)
+
+    warnings = []
+    total_body = sum(body_counts) or 1
+    total_skin = sum(skin_counts) or 1
+
+    # BODY TYPE (25) - 표의 "1 point per type"은 합계가 25점이 되지 않아 유형당 2.5점으로 환산
+    body_types = sum(1 for count in body_counts if count)
+    body = 2.5 * body_types
+    body += 5 if body_counts[_PLUS_SIZE] else 0
+    body += 5 if body_types >= 4 else 0
+    body -= 10 if max(body_counts) > total_body / 2 else 0
+    if "body" in checks:
+        for name, count in zip(BODY_TYPES, body_counts):
+            if count > 5:
+                warnings.append(f"⚠️ OVER-REPRESENTED: {name} {count}명")
+            elif count == 0:
+                warnings.append(f"⚠️ MISSING: {name}")
+        if not body_counts[_PLUS_SIZE]:
+            warnings.append("🔴 CRITICAL: Plus-size 없음 (FULL 모드)")
+
+    # SKIN TONE (25)
+    skin_types = sum(1 for count in skin_counts if count)
+    skin = 5 * skin_types
+    concentrated = max(skin_counts) > total_skin * 0.6
+    skin -= 15 if concentrated else 0
+    if "skin" in checks:
+        if concentrated:
+            warnings.append("⚠️ CONCENTRATED: 한 피부톤이 60% 초과")
+        if skin_counts[3] + skin_counts[4] < 2:
+            warnings.append("⚠️ DARK TONES UNDER-REP: V-VI 2명 미만")
+        if skin_types <= 2:
+            warnings.append("🔴 SPECTRUM TOO NARROW: 피부톤 2종 이하")
+
+    # AGE RANGE (20)
+    age_bands = sum(1 for count in age_counts if count)
+    same_decade = age_bands == 1
+    age = 4 * age_bands - (10 if same_decade else 0)
+    if "age" in checks and ages:
+        if same_decade:
+            warnings.append("⚠️ AGE MONOTONY: 모두 같은 나이대")
+        if not (age_counts[3] or age_counts[4]):
+            warnings.append("⚠️ MISSING MATURE REP: 50+ 없음")
+        if max(ages) - min(ages) < 15:
+            warnings.append("⚠️ TOO NARROW: 나이 범위 15년 미만")
+
+    # HAIR VARIETY (15)
+    hair_styles = bin(hair_mask).count("1")
+    hair = 3 * hair_styles
+    if "hair" in checks:
+        if max(hair_counts) > 4:
+            warnings.append("⚠️ REPETITIVE: 같은 헤어 텍스처 5명 이상")
+        if not hair_mask & _NATURAL_MASK:
+            warnings.append("⚠️ TEXTURE BIAS: Curly/Coily 없음")
+        if hair_styles < 5:
+            warnings.append(f"⚠️ HAIR VARIETY: {hair_styles}종 (목표 5종)")
+
+    # FEATURE VARIETY (15)
+    features = 3 * bin(feature_mask).count("1")
+
+    body, skin, age = max(0, body), max(0, skin), max(0, age)
+    return DiversityScore(
+        total=round(body + skin + age + hair + features),
+        body=body,
+        skin=skin,
+        age=age,
+        hair=hair,
+        features=features,
+        warnings=tuple(warnings),
+    )
+
+
+def _fixed_phenotype(ethnicity) -> Phenotype:
+    lowered = ethnicity.lower()
+    for keyword, tones in ETHNICITY_TONES:
+        if keyword in lowered:
+            return Phenotype("FIXED", ethnicity, tones, HAIR_TEXTURES)
+    return Phenotype("FIXED", ethnicity, SKIN_TONES, HAIR_TEXTURES)
+
+
+def _phenotypes(rng, region, diversity_mode, ethnicity, cast_mode):
+    """세트별 표현형 - 인종 고정이면 전부 고정값, FULL이 아니면 TYPICAL 풀 안에서만"""
+    if ethnicity:
+        return [_fixed_phenotype(ethnicity)] * SET_COUNT
+
+    typical = list(POOLS[(region, BATCH_TYPICAL)])
+    rng.shuffle(typical)
+    if cast_mode == CAST_MODE_LOOKBOOK or diversity_mode == "OFF":
+        return [typical[0]] * SET_COUNT
+    if diversity_mode != "FULL":
+        # SAFE: Sets 06-10도 같은 TYPICAL 풀, 스타일만 변화
+        return typical + typical[:SET_COUNT - len(typical)]
+
+    mixed = list(POOLS[(region, BATCH_MIXED)])
+    rng.shuffle(mixed)
+    atypical = rng.sample(POOLS[(OTHER_REGION[region], BATCH_TYPICAL)], 2)
+    return typical + mixed + atypical
+
+
+def _ages(rng, fixed_age, diversity_mode, cast_mode):
+    """§5.6 - 고정 나이면 Sets 01-08 그대로, 09-10은 ±10년 (OFF/룩북은 전부 고정)"""
+    if fixed_age is not None:
+        ages = [fixed_age] * SET_COUNT
+        if diversity_mode != "OFF" and cast_mode != CAST_MODE_LOOKBOOK:
+            older = fixed_age + rng.randint(5, ATYPICAL_AGE_SPREAD)
+            younger = max(MIN_AGE, fixed_age - rng.randint(5, ATYPICAL_AGE_SPREAD))
+            ages[8:] = rng.sample([older, younger if younger != fixed_age else older + 1], 2)
+        return ages
+
+    ages = [age for age, count in UNSPECIFIED_AGE_BANDS for _ in range(count)]
+    ages.extend(rng.choice(MATURE_AGE_SPLITS))
+    rng.shuffle(ages)
+    return [age + rng.randint(0, 4) for age in ages]
+
+
+def _bodies(rng, diversity_mode, cast_mode):
+    if diversity_mode == "OFF" or cast_mode == CAST_MODE_LOOKBOOK:
+        return ["STANDARD"] * SET_COUNT
+    if diversity_mode != "FULL":
+        # SET 01 Baseline은 STANDARD, 나머지는 SAFE 체형을 고르게
+        bodies = list(SAFE_BODY_TYPES) * 2
+        bodies.remove("STANDARD")
+        rng.shuffle(bodies)
+        return ["STANDARD"] + bodies[:SET_COUNT - 1]
+    counts = rng.choice(BODY_DISTRIBUTIONS)
+    bodies = [name for name, count in zip(BODY_TYPES, counts) for _ in range(count)]
+    rng.shuffle(bodies)
+    return bodies
+
+
+def _features(rng, slots, diversity_mode):
+    """FULL은 §5.4 특징 5종을 조건에 맞는 세트에, SAFE는 안경(액세서리 로테이션)만"""
+    assigned = [[] for _ in slots]
+    if diversity_mode == "OFF":
+        return assigned
+    if diversity_mode != "FULL":
+        assigned[rng.randrange(1, SET_COUNT)].append("GLASSES")
+        return assigned
+
+    def pick(feature, candidates):
+        candidates = [index for index in candidates if not assigned[index]]
+        if candidates:
+            assigned[rng.choice(candidates)].append(feature)
+
+    indexes = range(SET_COUNT)
+    pick("GREY_HAIR", [i for i in indexes if slots[i].age >= GREY_HAIR_MIN_AGE])
+    pick("FRECKLES", [i for i in indexes if slots[i].skin in ("I-II", "III")])
+    pick("VITILIGO", [i for i in indexes if slots[i].batch != BATCH_TYPICAL])
+    pick("VISIBLE_DISABILITY", [i for i in indexes if slots[i].batch == BATCH_ATYPICAL])
+    pick("GLASSES", list(indexes))
+    return assigned
+
+
+def plan_cast(region, diversity_mode, cast_mode, fixed_age=None, fixed_ethnicity="", seed=0) -> CastPlan:
+    """시드 고정 10인 계획 - FULL 모드는 점검을 모두 통과하는 후보를 찾을 때까지 재추첨"""
+    region = region if region in OTHER_REGION else "EU"
+    ethnicity = (fixed_ethnicity or "").strip()
+    checks = active_checks(diversity_mode, ethnicity, fixed_age, cast_mode)
+    rng = random.Random(seed)
+
+    best = None
+    for _ in range(MAX_PLAN_ATTEMPTS):
+        phenotypes = _phenotypes(rng, region, diversity_mode, ethnicity, cast_mode)
+        ages = _ages(rng, fixed_age, diversity_mode, cast_mode)
+        bodies = _bodies(rng, diversity_mode, cast_mode)
+        if cast_mode == CAST_MODE_LOOKBOOK or diversity_mode == "OFF":
+            skin, hair = rng.choice(phenotypes[0].tones), rng.choice(phenotypes[0].hair)
+            tones, hairs = [skin] * SET_COUNT, [hair] * SET_COUNT
+        else:
+            tones = [rng.choice(phenotype.tones) for phenotype in phenotypes]
+            hairs = [rng.choice(phenotype.hair) for phenotype in phenotypes]
+
+        slots = [
+            CastSlot(index + 1, SET_BATCHES[index], phenotypes[index], ages[index],
+                     bodies[index], tones[index], hairs[index], ())
+            for index in range(SET_COUNT)
+        ]
+        features = _features(rng, slots, diversity_mode)
+        slots = tuple(slot._replace(features=tuple(extra)) for slot, extra in zip(slots, features))
+
+        score = score_cast(slots, checks)
+        if best is None or (len(score.warnings), -score.total) < (len(best.warnings), -best.total):
+            best, best_slots = score, slots
+        if not score.warnings:
+            break
+
+    return CastPlan(seed, diversity_mode, cast_mode, checks, best_slots, best)
+
+
+def plan_seed(settings) -> int:
+    """설정값에서 재현 가능한 시드 (cast_seed가 있으면 그 값)"""
+    if settings.get("cast_seed") not in (None, ""):
+        return int(settings["cast_seed"])
+    payload = json.dumps(
+        [settings.get(field) for field in (
+            "project_id", "region", "city", "age", "gender", "occupation",
+            "ethnicity", "cast_mode", "diversity_mode",
+        )],
+        ensure_ascii=False,
+        default=str,
+    )
+    return int(hashlib.sha256(payload.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def plan_for_settings(settings) -> CastPlan:
+    """요청 설정 → 캐스트 계획 (같은 설정이면 같은 계획)"""
+    age = settings.get("age")
+    return _cached_plan(
+        settings.get("region"),
+        settings.get("diversity_mode", "SAFE"),
+        settings.get("cast_mode", "SINGLE"),
+        int(age) if age not in (None, "") else None,
+        (settings.get("ethnicity") or "").strip(),
+        plan_seed(settings),
+    )
+
+
+@lru_cache(maxsize=256)
+def _cached_plan(region, diversity_mode, cast_mode, fixed_age, fixed_ethnicity, seed):
+    return plan_cast(region, diversity_mode, cast_mode, fixed_age, fixed_ethnicity, seed)
+
+
+def plan_anchors(plan) -> tuple:
+    """세트별 Primary Biometric Anchor (시드 고정) - 세트마다 다른 조합, 룩북(§1.1B)은 SET 01 앵커 공유
+
+    풀이 15개라 20칸을 모두 다르게 채울 수 없으므로 식별자는 최대 두 세트에서 쓰되 같은 조합은 한 세트에만 배정
+    """
+    pool = list(BIOMETRIC_IDS)
+    random.Random(f"anchors:{plan.seed}").shuffle(pool)
+    anchors = tuple(
+        tuple(pool[(index * ANCHORS_PER_SET + offset) % len(pool)] for offset in range(ANCHORS_PER_SET))
+        for index in range(SET_COUNT)
+    )
+    if plan.cast_mode == CAST_MODE_LOOKBOOK:
+        return (anchors[0],) * SET_COUNT
+    return anchors
+
+
+def format_slot(slot) -> str:
+    """계획 한 줄 - Model/Age/Body는 그대로, 나머지는 묘사에 반영할 값"""
+    parts = [
+        f"SET {slot.set_no:02d} [{slot.batch}]",
+        f"{slot.phenotype.id} {slot.phenotype.name}",
+        f"Age {slot.age}",
+        f"Body {slot.body}",
+        f"Skin {slot.skin} ({SKIN_DESCRIPTORS[slot.skin]})",
+        f"Hair {slot.hair}",
+    ]
+    if slot.features:
+        parts.append("Feature " + ", ".join(slot.features))
+    return " | ".join(parts)
+
+
+def override_lines(plan) -> list:
+    """CastPlan → [SYSTEM_OVERRIDE_DATA] 고정값 줄"""
+    lines = [
+        f"Cast_Plan: LOCAL seed={plan.seed} (§1.3/§4/§5.4~§5.6 계산 완료 - 세트별 인물 속성을 그대로 사용하고 묘사만 작성)",
+    ]
+    lines.extend(f"Cast_{slot.set_no:02d}: {format_slot(slot)}" for slot in plan.slots)
+    return lines
+
+
+# 응답에서 캐스트 속성을 읽어 오는 패턴
+SET_HEADING_RE = re.compile(r"^## SET (\d{2})\b.*$", re.MULTILINE)
+AGE_RE = re.compile(r"\bAge:\s*(\d{2})")
+BODY_RE = re.compile(r"\bBody:\s*([A-Za-z][A-Za-z-]*(?: [A-Za-z]+)?)")
+EXPLICIT_SKIN_RE = re.compile(r"\b(?:Skin|Fitzpatrick)[:\s]+(?:type\s+)?(VI|V|IV|III|I-II|II|I)\b", re.IGNORECASE)
+
+# 묘사어 → 값 (앞쪽 항목이 우선)
+SKIN_KEYWORDS = (
+    ("I-II", ("very fair", "porcelain", "pale skin")),
+    ("VI", ("deep brown", "rich dark", "dark skin", "ebony", "deep skin")),
+    ("III", ("fair to medium", "fair-medium", "light-medium")),
+    ("V", ("medium brown", "caramel", "bronze", "copper", "brown skin")),
+    ("IV", ("olive", "tan skin", "golden skin", "golden tan", "tanned")),
+)
+HAIR_KEYWORDS = (
+    ("PROTECTIVE", ("braid", "locs", "twists", "cornrow", "protective style")),
+    ("COILY", ("coily", "coil", "afro", "4a", "4b", "4c")),
+    ("CURLY", ("curly", "curls", "ringlet")),
+    ("WAVY", ("wavy", "waved", "waves")),
+    ("STRAIGHT", ("straight",)),
+)
+FEATURE_KEYWORDS = (
+    ("GLASSES", ("glasses", "spectacles", "eyewear")),
+    ("FRECKLES", ("freckle",)),
+    ("VITILIGO", ("vitiligo",)),
+    ("VISIBLE_DISABILITY", ("wheelchair", "prosthetic", "hearing aid", "limb difference", "disabilit")),
+    ("GREY_HAIR", ("grey hair", "gray hair", "white hair", "silver hair", "salt-and-pepper", "grey-haired", "silver-haired")),
+)
+BODY_ALIASES = {"PLUS": "PLUS-SIZE", "PLUS SIZE": "PLUS-SIZE", "PLUS-SIZED": "PLUS-SIZE", "STANDARD BUILD": "STANDARD"}
+
+
+def _first_keyword(text, table):
+    for value, keywords in table:
+        if any(keyword in text for keyword in keywords):
+            return value
+    return None
+
+
+def extract_cast(text) -> list:
+    """응답 SET 본문 → CastSlot 목록 (세트 머리말 우선, 없으면 이미지 프롬프트까지 검색)"""
+    headings = list(SET_HEADING_RE.finditer(text or ""))
+    slots = []
+    for index, heading in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(text)
+        block = text[heading.end():end]
+        meta = block.split("```", 1)[0]
+        meta_lower, block_lower = meta.lower(), block.lower()
+
+        age = AGE_RE.search(meta)
+        body = BODY_RE.search(meta)
+        body_name = body.group(1).upper() if body else None
+        body_name = BODY_ALIASES.get(body_name, body_name)
+        explicit_skin = EXPLICIT_SKIN_RE.search(block)
+        skin = explicit_skin.group(1).upper() if explicit_skin else None
+        if skin in ("I", "II"):
+            skin = "I-II"
+
+        slots.append(
+            CastSlot(
+                set_no=int(heading.group(1)),
+                batch=SET_BATCHES[int(heading.group(1)) - 1] if 0 < int(heading.group(1)) <= SET_COUNT else None,
+                phenotype=None,
+                age=int(age.group(1)) if age else None,
+                body=body_name if body_name in _BODY_INDEX else None,
+                skin=skin or _first_keyword(meta_lower, SKIN_KEYWORDS) or _first_keyword(block_lower, SKIN_KEYWORDS),
+                hair=_first_keyword(meta_lower, HAIR_KEYWORDS) or _first_keyword(block_lower, HAIR_KEYWORDS),
+                features=tuple(value for value, keywords in FEATURE_KEYWORDS
+                               if any(keyword in block_lower for keyword in keywords)),
+            )
+        )
+    return slots
+
+
+def compare_to_plan(plan, slots) -> list:
+    """계획과 다른 세트 속성 목록 (응답에서 읽지 못한 값은 비교하지 않음)"""
+    planned = {slot.set_no: slot for slot in plan.slots}
+    mismatches = []
+    for slot in slots:
+        expected = planned.get(slot.set_no)
+        if expected is None:
+            continue
+        for field in ("age", "body", "skin", "hair"):
+            actual = getattr(slot, field)
+            if actual is not None and actual != getattr(expected, field):
+                mismatches.append(f"SET {slot.set_no:02d} {field}: {actual} (계획 {getattr(expected, field)})")
+    return mismatches
+
+
+def check_response(plan, text):
+    """응답 캐스트 채점 - (DiversityScore, 계획 불일치 목록), SET이 없으면 (None, [])
+
+    10개 세트가 모두 있을 때만 균형 점검 경고를 낸다 (일부 세트만 재생성한 응답 등).
+    """
+    slots = extract_cast(text)
+    if not slots:
+        return None, []
+    checks = plan.checks if len(slots) >= SET_COUNT else frozenset()
+    return score_cast(slots, checks), compare_to_plan(plan, slots)
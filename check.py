@@ -1,17 +1,17 @@
 import os
-import google.generativeai as genai
+
+from backend import fake_backend_enabled
+from model_catalog import get_model_catalog
 
 MY_API_KEY = os.getenv("GOOGLE_API_KEY", "").strip()
-if not MY_API_KEY:
+if not MY_API_KEY and not fake_backend_enabled():
     raise SystemExit("GOOGLE_API_KEY 환경변수가 필요합니다.")
 
-genai.configure(api_key=MY_API_KEY)
-
-print("--- 사용 가능한 모델 목록 ---")
-try:
-    for m in genai.list_models():
-        if 'generateContent' in m.supported_generation_methods:
-            print(m.name)
-except Exception as e:
-    print(f"에러 발생: {e}")
+# 앱 사이드바와 같은 카탈로그를 API에서 새로 받아 저장 (다음 앱 시작 시 바로 사용)
+print("--- 사용 가능한 모델 목록 ---")
+try:
+    for name in get_model_catalog().refresh(MY_API_KEY):
+        print(name)
+except Exception as e:
+    print(f"에러 발생: {e}")
 print("---------------------------")
@@ -0,0 +1,318 @@
+"""
+LG Art Director System v5.9.0 - Shared Client Pool
+API 키(지문)별 Gemini 서비스 클라이언트를 프로세스 전체에서 공유하고,
+전역 동시 요청 수 제한 + 키별 토큰 버킷으로 요청을 대기열에 세움 (429 대신 순번 대기)
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+
+# 프로세스 전체 동시 요청 수 / 키별 분당 요청 수(0 = 제한 없음) / 키별 순간 허용량
+MAX_CONCURRENCY_ENV = "LGAD_MAX_CONCURRENCY"
+KEY_RPM_ENV = "LGAD_KEY_RPM"
+KEY_BURST_ENV = "LGAD_KEY_BURST"
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_KEY_RPM = 60
+DEFAULT_KEY_BURST = 5
+
+# 대기열에서 기다리는 최대 시간(초)
+QUEUE_TIMEOUT_ENV = "LGAD_QUEUE_TIMEOUT"
+DEFAULT_QUEUE_TIMEOUT = 120.0
+
+# 대기 중 순번 안내를 다시 알리는 간격(초)
+WAIT_POLL = 0.5
+
+# 예상 대기 시간 계산용 요청 1건 점유 시간 초기값(초) / 이동 평균 가중치
+DEFAULT_HOLD_ESTIMATE = 10.0
+HOLD_SMOOTHING = 0.2
+
+
+class QueueTimeout(Exception):
+    """대기열에서 제한 시간 안에 차례가 오지 않음"""
+
+
+def fingerprint_key(api_key) -> str:
+    """API 키 식별용 짧은 해시 (키 원문은 캐시 키에 남기지 않음)"""
+    if not api_key:
+        return ""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def _env_number(name, default, cast=float):
+    try:
+        return cast(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """키별 토큰 버킷 - 초당 rate개씩 capacity까지 채워지고 요청마다 1개 소비 (rate 0이면 무제한)"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = now
+
+    def wait_time(self, now) -> float:
+        """토큰 1개가 생길 때까지 남은 시간(초)"""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        if self.rate > 0:
+            self.tokens -= 1
+
+
+class RequestLimiter:
+    """전역 동시 요청 수 + 키별 토큰 버킷 제한 - 도착 순서대로(FIFO) 차례를 줌
+
+    앞선 요청이 자기 키의 버킷 때문에 기다리는 동안에는 다른 키의 요청이 먼저 나갈 수 있다.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, rpm=DEFAULT_KEY_RPM, burst=DEFAULT_KEY_BURST,
+                 timeout=DEFAULT_QUEUE_TIMEOUT, clock=time.monotonic):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = rpm / 60.0 if rpm and rpm > 0 else 0.0
+        self.burst = burst
+        self.timeout = timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queue = []
+        self._buckets = {}
+        self._key_rates = {}
+        self._next_ticket = 0
+        self.active = 0
+        self.served = 0
+        self.avg_hold = DEFAULT_HOLD_ESTIMATE
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=_env_number(MAX_CONCURRENCY_ENV, DEFAULT_MAX_CONCURRENCY, int),
+            rpm=_env_number(KEY_RPM_ENV, DEFAULT_KEY_RPM),
+            burst=_env_number(KEY_BURST_ENV, DEFAULT_KEY_BURST, int),
+            timeout=_env_number(QUEUE_TIMEOUT_ENV, DEFAULT_QUEUE_TIMEOUT),
+        )
+
+    def set_key_rpm(self, key, rpm) -> None:
+        """이 키만 분당 요청 수를 따로 지정 (0 = 제한 없음)"""
+        with self._cond:
+            self._key_rates[key] = rpm / 60.0 if rpm and rpm > 0 else 0.0
+            self._buckets.pop(key, None)
+
+    def _bucket(self, key, now) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate = self._key_rates.get(key, self.rate)
+            bucket = self._buckets[key] = TokenBucket(rate, self.burst, now)
+        return bucket
+
+    def _blocked_for(self, ticket, key, now):
+        """차례가 아니면 (순번, 버킷 대기 초), 차례면 None"""
+        position = 1
+        for other, other_key in self._queue:
+            if other == ticket:
+                break
+            position += 1
+            if self._bucket(other_key, now).wait_time(now) == 0:
+                # 앞에 바로 나갈 수 있는 요청이 있음
+                return position, 0.0
+        bucket_wait = self._bucket(key, now).wait_time(now)
+        if self.active >= self.max_concurrency or bucket_wait > 0:
+            return position, bucket_wait
+        return None
+
+    def _estimate_wait(self, position, bucket_wait) -> float:
+        slots_ahead = max(0, position - (self.max_concurrency - self.active))
+        return max(bucket_wait, math.ceil(slots_ahead / self.max_concurrency) * self.avg_hold)
+
+    def acquire(self, key="", on_wait=None) -> float:
+        """차례가 올 때까지 대기 후 슬롯 점유 - 점유 시작 시각 반환 (release에 넘김)
+
+        on_wait(순번, 예상 대기 초)는 기다리는 동안 WAIT_POLL 간격으로 호출 (락 밖에서)
+        """
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._queue.append((ticket, key))
+            deadline = self._clock() + self.timeout
+            try:
+                while True:
+                    now = self._clock()
+                    blocked = self._blocked_for(ticket, key, now)
+                    if blocked is None:
+                        break
+                    if now >= deadline:
+                        raise QueueTimeout(f"요청 대기 시간 초과 ({self.timeout:g}초, 대기열 {blocked[0]}번째)")
+                    position, bucket_wait = blocked
+                    if on_wait is not None:
+                        eta = self._estimate_wait(position, bucket_wait)
+                        self._cond.release()
+                        try:
+                            on_wait(position, eta)
+                        finally:
+                            self._cond.acquire()
+                    self._cond.wait(min(WAIT_POLL, bucket_wait or WAIT_POLL, max(0.0, deadline - now)))
+            except BaseException:
+                self._queue.remove((ticket, key))
+                self._cond.notify_all()
+                raise
+            self._queue.remove((ticket, key))
+            self._bucket(key, now).take()
+            self.active += 1
+            return now
+
+    def release(self, started) -> None:
+        with self._cond:
+            self.active -= 1
+            self.served += 1
+            held = max(0.0, self._clock() - started)
+            self.avg_hold += HOLD_SMOOTHING * (held - self.avg_hold)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": len(self._queue),
+                "max_concurrency": self.max_concurrency,
+                "served": self.served,
+                "avg_hold": round(self.avg_hold, 2),
+            }
+
+
+class HeldStream:
+    """슬롯을 잡은 채 스트리밍 청크를 넘기고, 끝나거나 오류가 나거나 버려지면 슬롯 반납"""
+
+    def __init__(self, chunks, release):
+        self._chunks = iter(chunks)
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __del__(self):
+        self.close()
+
+
+class LimitedChatSession:
+    """채팅 세션 래퍼 - send_message마다 제한기 슬롯을 잡고 (스트리밍은 마지막 청크까지) 반납"""
+
+    def __init__(self, session, limiter, key=""):
+        self.session = session
+        self.limiter = limiter
+        self.key = key
+
+    @property
+    def history(self):
+        return self.session.history
+
+    @history.setter
+    def history(self, value):
+        self.session.history = value
+
+    def send_message(self, content, stream=False, generation_config=None, on_wait=None):
+        started = self.limiter.acquire(self.key, on_wait)
+        try:
+            response = self.session.send_message(content, stream=stream, generation_config=generation_config)
+        except BaseException:
+            self.limiter.release(started)
+            raise
+        if stream:
+            return HeldStream(response, lambda: self.limiter.release(started))
+        self.limiter.release(started)
+        return response
+
+
+class KeyClients:
+    """API 키 하나의 Gemini 서비스 클라이언트 묶음 (gRPC 채널을 세션/스레드 간 재사용)
+
+    genai.configure()의 프로세스 전역 기본 클라이언트를 쓰지 않으므로 키가 여러 개여도 섞이지 않는다.
+    """
+
+    def __init__(self, api_key):
+        from google.ai import generativelanguage as glm
+
+        self.fingerprint = fingerprint_key(api_key)
+        self._options = {"api_key": api_key}
+        self._glm = glm
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def _client(self, name):
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                client = getattr(self._glm, f"{name}ServiceClient")(client_options=self._options)
+                self._clients[name] = client
+            return client
+
+    @property
+    def generative(self):
+        return self._client("Generative")
+
+    @property
+    def models(self):
+        return self._client("Model")
+
+    @property
+    def cache(self):
+        return self._client("Cache")
+
+
+class ClientPool:
+    """키 지문 → KeyClients (프로세스 전체 공유)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def get(self, api_key) -> KeyClients:
+        fingerprint = fingerprint_key(api_key)
+        with self._lock:
+            clients = self._clients.get(fingerprint)
+            if clients is None:
+                clients = self._clients[fingerprint] = KeyClients(api_key)
+            return clients
+
+    def __len__(self):
+        return len(self._clients)
+
+
+_pool = ClientPool()
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    return _pool
+
+
+def get_request_limiter() -> RequestLimiter:
+    """프로세스 공용 요청 제한기 (모든 Streamlit 세션, 배치 워커가 공유)"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RequestLimiter.from_env()
+        return _limiter
@@ -0,0 +1,218 @@
+"""
+LG Art Director System v5.9.0 - Climate Resolver
+§3.2 반구 매핑 / §3.3 시즌 계산 / §3.3A 시즌 조명 / §3.4 기후 프로필 / §3.5 열대 예외를
+도시 인덱스와 Target Date로 로컬에서 미리 계산해 [SYSTEM_OVERRIDE_DATA]에 고정값으로 넣음
+"""
+
+import unicodedata
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+HEMISPHERE_NORTHERN = "NORTHERN"
+HEMISPHERE_SOUTHERN = "SOUTHERN"
+HEMISPHERE_TROPICAL = "TROPICAL"
+
+# HEADER_JSON climate_type 값 (§9 예시 기준)
+CLIMATE_NORMAL = "NORMAL"
+CLIMATE_TROPICAL = "TROPICAL"
+
+# 열대 도시는 시즌 계산을 무시하고 항상 이 값 사용 (§3.5)
+SEASON_TROPICAL = "TROPICAL_HOT"
+
+# §3.3 북반구 월 → 시즌 (남반구는 SEASON_FLIP으로 반전)
+NORTHERN_SEASONS = {
+    12: "WINTER", 1: "WINTER", 2: "WINTER",
+    3: "SPRING", 4: "SPRING", 5: "SPRING",
+    6: "SUMMER", 7: "SUMMER", 8: "SUMMER",
+    9: "AUTUMN", 10: "AUTUMN", 11: "AUTUMN",
+}
+SEASON_FLIP = {"WINTER": "SUMMER", "SUMMER": "WINTER", "SPRING": "AUTUMN", "AUTUMN": "SPRING"}
+
+Lighting = namedtuple("Lighting", ["sun_angle", "light", "interior"])
+
+# §3.3A 시즌 조명 메타데이터 (열대는 높은 태양 고도의 SUMMER 조명 사용)
+SEASON_LIGHTING = {
+    "WINTER": Lighting("Low", "Cool daylight, long shadows", "Warm fill to avoid cold clinical mood"),
+    "SUMMER": Lighting("High", "Strong direct sunlight, short shadows", "Bright ambient bounce, high clarity"),
+    "SPRING": Lighting("Mid", "Soft diffused daylight, gentle contrast", "Fresh natural greens, mild warmth"),
+    "AUTUMN": Lighting("Mid-low", "Warm amber daylight, elongated shadows", "Golden hour tone, cozy contrast"),
+}
+SEASON_LIGHTING[SEASON_TROPICAL] = SEASON_LIGHTING["SUMMER"]
+
+Profile = namedtuple("Profile", ["name", "temperature", "styling"])
+
+# §3.4 기후 프로필 (겨울 프로필은 도시별, 여름/열대는 공통)
+PROFILES = {
+    "COLD_WINTER": Profile("COLD WINTER", "-5°C ~ 5°C", "Heavy wool coat, thick scarf, gloves, boots"),
+    "MILD_WINTER": Profile("MILD WINTER", "5°C ~ 12°C", "Wool coat, light scarf, ankle boots"),
+    "WARM_WINTER": Profile("WARM WINTER", "12°C ~ 18°C", "Light jacket, blazer, cardigan"),
+    "SUMMER": Profile("SUMMER", "20°C ~ 30°C", "Light fabrics, flowy silhouettes, sandals"),
+    "TROPICAL_HOT": Profile(
+        "TROPICAL HOT",
+        "25°C ~ 35°C",
+        "Linen, cotton, silk, breathable / Light dress, linen shirt, wide trousers",
+    ),
+}
+
+# §3.5 열대 도시에서 금지하는 아이템
+TROPICAL_PREVENT = "Heavy wool coats, Thick scarves, Fur, Chunky knit turtlenecks, Winter boots"
+
+# §3.5 고도 예외 안내 (열대 고지대 도시)
+ALTITUDE_NOTE = "Light jacket/cardigan OK (cooler despite latitude)"
+
+CityClimate = namedtuple("CityClimate", ["hemisphere", "winter_profile", "altitude_m"])
+
+# 도시 → 반구/겨울 프로필/고도 (CITY_OPTIONS 전체 + §3.5 명시 도시)
+# 프롬프트 목록에 없는 도시(Quito, La Paz)는 위도/고도 기준으로 분류
+CITY_CLIMATE = {
+    # EU - 전부 북반구 (§3.2), 겨울 프로필은 §3.4 도시 예시 기준
+    "paris": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    "london": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    "rome": CityClimate(HEMISPHERE_NORTHERN, "WARM_WINTER", None),
+    "barcelona": CityClimate(HEMISPHERE_NORTHERN, "WARM_WINTER", None),
+    "amsterdam": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    "berlin": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "prague": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "vienna": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "madrid": CityClimate(HEMISPHERE_NORTHERN, "WARM_WINTER", None),
+    "florence": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    "venice": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    "lisbon": CityClimate(HEMISPHERE_NORTHERN, "WARM_WINTER", None),
+    "athens": CityClimate(HEMISPHERE_NORTHERN, "WARM_WINTER", None),
+    "munich": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "budapest": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "brussels": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    "zurich": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "copenhagen": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "lyon": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    "krakow": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "stockholm": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "helsinki": CityClimate(HEMISPHERE_NORTHERN, "COLD_WINTER", None),
+    "dublin": CityClimate(HEMISPHERE_NORTHERN, "MILD_WINTER", None),
+    # LATAM - 멕시코 내륙은 북반구, 남미 남부는 남반구
+    "mexico city": CityClimate(HEMISPHERE_NORTHERN, "WARM_WINTER", 2240),
+    "guadalajara": CityClimate(HEMISPHERE_NORTHERN, "WARM_WINTER", None),
+    "sao paulo": CityClimate(HEMISPHERE_SOUTHERN, "WARM_WINTER", None),
+    "rio de janeiro": CityClimate(HEMISPHERE_SOUTHERN, "WARM_WINTER", None),
+    "brasilia": CityClimate(HEMISPHERE_SOUTHERN, "WARM_WINTER", None),
+    "buenos aires": CityClimate(HEMISPHERE_SOUTHERN, "MILD_WINTER", None),
+    "montevideo": CityClimate(HEMISPHERE_SOUTHERN, "MILD_WINTER", None),
+    "santiago": CityClimate(HEMISPHERE_SOUTHERN, "MILD_WINTER", None),
+    "lima": CityClimate(HEMISPHERE_SOUTHERN, "WARM_WINTER", None),
+    "cusco": CityClimate(HEMISPHERE_SOUTHERN, "MILD_WINTER", 3400),
+    "la paz": CityClimate(HEMISPHERE_SOUTHERN, "COLD_WINTER", 3640),
+    # §3.5 열대 예외 - 시즌 계산 무시
+    "bogota": CityClimate(HEMISPHERE_TROPICAL, None, 2640),
+    "medellin": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "cartagena": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "quito": CityClimate(HEMISPHERE_TROPICAL, None, 2850),
+    "havana": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "san juan": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "panama city": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "san jose": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "cancun": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "tulum": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "acapulco": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "salvador": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "fortaleza": CityClimate(HEMISPHERE_TROPICAL, None, None),
+    "manaus": CityClimate(HEMISPHERE_TROPICAL, None, None),
+}
+
+ClimateFacts = namedtuple(
+    "ClimateFacts",
+    ["hemisphere", "climate_type", "season", "campaign_target", "profile", "lighting", "altitude_m"],
+)
+
+
+def city_key(city) -> str:
+    """'Bogotá (보고타)' → 'bogota' (괄호 안 한글 표기와 악센트 제거)"""
+    name = str(city or "").split("(", 1)[0].strip()
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(name.lower().split())
+
+
+def lookup_city(region, city):
+    """도시 인덱스 조회 - 목록에 없는 EU 도시는 북반구(프로필 미정), 그 외는 None"""
+    entry = CITY_CLIMATE.get(city_key(city))
+    if entry is None and region == "EU":
+        return CityClimate(HEMISPHERE_NORTHERN, None, None)
+    return entry
+
+
+def season_for(month, hemisphere) -> str:
+    """§3.3 시즌 계산 (열대는 항상 TROPICAL_HOT)"""
+    if hemisphere == HEMISPHERE_TROPICAL:
+        return SEASON_TROPICAL
+    season = NORTHERN_SEASONS[month]
+    return SEASON_FLIP[season] if hemisphere == HEMISPHERE_SOUTHERN else season
+
+
+def _year_month(target_date):
+    if isinstance(target_date, date):
+        return target_date.year, target_date.month
+    year, month = str(target_date).strip()[:7].split("-")
+    return int(year), int(month)
+
+
+@lru_cache(maxsize=512)
+def _resolve(region, city, year, month):
+    entry = lookup_city(region, city)
+    if entry is None:
+        return None
+
+    season = season_for(month, entry.hemisphere)
+    if entry.hemisphere == HEMISPHERE_TROPICAL:
+        profile = PROFILES["TROPICAL_HOT"]
+    elif season == "SUMMER":
+        profile = PROFILES["SUMMER"]
+    elif season == "WINTER" and entry.winter_profile:
+        profile = PROFILES[entry.winter_profile]
+    else:
+        # 봄/가을은 §3.4에 프로필이 없으므로 모델 판단에 맡김
+        profile = None
+
+    return ClimateFacts(
+        hemisphere=entry.hemisphere,
+        climate_type=CLIMATE_TROPICAL if entry.hemisphere == HEMISPHERE_TROPICAL else CLIMATE_NORMAL,
+        season=season,
+        campaign_target=f"{year:04d}-{month:02d}",
+        profile=profile,
+        lighting=SEASON_LIGHTING[season],
+        altitude_m=entry.altitude_m,
+    )
+
+
+def resolve_climate(region, city, target_date):
+    """(지역, 도시, Target Date) → ClimateFacts (도시를 분류할 수 없으면 None)"""
+    try:
+        year, month = _year_month(target_date)
+    except ValueError:
+        return None
+    return _resolve(region, city, year, month)
+
+
+def override_lines(facts) -> list:
+    """ClimateFacts → [SYSTEM_OVERRIDE_DATA] 고정값 줄"""
+    lines = [
+        "Climate_Resolution: LOCAL (§3.2/§3.3/§3.3A/§3.5 계산 완료 - 아래 값을 그대로 사용)",
+        f"Hemisphere: {facts.hemisphere}",
+        f"Climate_Type: {facts.climate_type}",
+        f"Season: {facts.season}",
+        f"Campaign_Target: {facts.campaign_target}",
+    ]
+    if facts.profile is not None:
+        lines.append(f"Climate_Profile: {facts.profile.name} ({facts.profile.temperature})")
+        lines.append(f"Climate_Styling: {facts.profile.styling}")
+    if facts.climate_type == CLIMATE_TROPICAL:
+        lines.append(f"Climate_Prevent: {TROPICAL_PREVENT}")
+        if facts.altitude_m:
+            lines.append(f"Altitude_Note: {facts.altitude_m:,}m → {ALTITUDE_NOTE}")
+    lines.extend(
+        [
+            f"Lighting_Sun_Angle: {facts.lighting.sun_angle}",
+            f"Lighting_Light: {facts.lighting.light}",
+            f"Lighting_Interior: {facts.lighting.interior}",
+        ]
+    )
+    return lines
@@ -0,0 +1,230 @@
+"""
+LG Art Director System v5.9.0 - Parallel Set Fan-out
+§9.1 전체 10세트를 한 응답에 몰아 쓰지 않고, 짧은 HEADER_JSON 호출 후 SET 01~10을 독립 요청으로 동시에 생성해
+§9.2 순서로 합침 (세트마다 출력 토큰 한도를 따로 쓰므로 SET 07 근처에서 잘리지 않음)
+"""
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cast_planner import SET_COUNT, SET_HEADING_RE, plan_anchors
+from response_parser import parse_result
+from set_document import parse_set
+
+# 요청 프롬프트 [SYSTEM_OVERRIDE_DATA]에 추가하는 키 - 출력할 세트 번호("NONE"이면 HEADER_JSON만), 세트 앵커
+OUTPUT_SETS_KEY = "Output_Sets"
+ANCHOR_KEY = "Biometric_Anchor"
+OUTPUT_SETS_NONE = "NONE"
+
+# 세트 재생성 때 기존 세트의 스토리 위치를 고정하는 키
+STORY_KEY = "Story_Position"
+
+# 세트 재생성 요청의 사용자 메모 블록
+REGENERATE_NOTE_HEADER = "[REGENERATE_NOTE]"
+
+# 세트 요청을 동시에 보내는 스레드 수 (실제 API 동시 요청은 client_pool 제한기가 따로 제한)
+FANOUT_WORKERS = SET_COUNT
+
+# 세트 요청 실패 시 다시 시도하는 횟수
+SET_RETRIES = 1
+
+# 세트 사이 구분선 (§9.2)
+SET_SEPARATOR = "\n---\n\n"
+
+# §9.1 PARTIAL MODE - "3세트만" / "세트 04-06만"
+PARTIAL_COUNT_RE = re.compile(r"(\d{1,2})\s*세트만")
+PARTIAL_RANGE_RE = re.compile(r"세트\s*(\d{1,2})\s*[-~]\s*(\d{1,2})\s*만")
+
+_CAST_LINE_RE = re.compile(r"^Cast_(\d{2}): .*\n?", re.MULTILINE)
+_OVERRIDE_END = "\n\n"
+
+
+class FanoutResult:
+    """병렬 생성 결과 - 합친 응답, 세트별 본문, 실패한 세트와 오류, 세트별 소요 시간"""
+
+    __slots__ = ("text", "header", "sets", "failed", "timings")
+
+    def __init__(self, text, header, sets, failed, timings):
+        self.text = text
+        self.header = header
+        self.sets = sets
+        self.failed = failed
+        self.timings = timings
+
+
+def requested_sets(user_input) -> list:
+    """§9.1 - 지시사항의 PARTIAL MODE 범위 (지정이 없으면 01~10 전체)"""
+    text = user_input or ""
+    match = PARTIAL_RANGE_RE.search(text)
+    if match:
+        first, last = sorted(int(value) for value in match.groups())
+        return [set_no for set_no in range(max(1, first), min(SET_COUNT, last) + 1)]
+    match = PARTIAL_COUNT_RE.search(text)
+    if match:
+        return list(range(1, min(SET_COUNT, max(1, int(match.group(1)))) + 1))
+    return list(range(1, SET_COUNT + 1))
+
+
+def _with_override_lines(prompt, lines, keep_cast=None):
+    """[SYSTEM_OVERRIDE_DATA] 블록 끝에 줄 추가 (keep_cast를 주면 그 세트의 Cast_NN 줄만 남김)"""
+    head, sep, rest = prompt.partition(_OVERRIDE_END)
+    if keep_cast is not None:
+        head = _CAST_LINE_RE.sub(
+            lambda match: match.group(0) if int(match.group(1)) == keep_cast else "",
+            head,
+        ).rstrip("\n")
+    return "\n".join([head, *lines]) + sep + rest
+
+
+def header_prompt(combined_prompt, anchors) -> str:
+    """HEADER_JSON만 요청 - 캐스트 계획은 로컬 값이라 헤더(시즌/색상/스타일)만 모델이 정함"""
+    prompt = _with_override_lines(
+        combined_prompt,
+        [f"{OUTPUT_SETS_KEY}: {OUTPUT_SETS_NONE}", f"{ANCHOR_KEY}: {', '.join(anchors)}"],
+    )
+    return "\n".join(
+        [
+            prompt,
+            "",
+            "[FANOUT_HEADER]",
+            "§9.2 1️⃣ HEADER_JSON 블록만 출력하세요. SET 본문은 세트별로 따로 요청합니다.",
+            f"biometric_ids에는 {ANCHOR_KEY} 값(SET 01 기준)을 사용하세요.",
+        ]
+    )
+
+
+def set_prompt(combined_prompt, set_no, header, anchors, story="", note="") -> str:
+    """SET 하나만 요청 - 공유 HEADER_JSON + 이 세트의 Cast_NN 계획 + 다른 세트와 겹치지 않는 앵커
+
+    재생성이면 story(기존 Story Position)와 note(사용자 메모)를 함께 보냄
+    """
+    lines = [f"{OUTPUT_SETS_KEY}: {set_no:02d}", f"{ANCHOR_KEY}: {', '.join(anchors)}"]
+    if story:
+        lines.append(f"{STORY_KEY}: {story}")
+    prompt = _with_override_lines(combined_prompt, lines, keep_cast=set_no)
+    parts = [
+        prompt,
+        "",
+        "[FANOUT_SET]",
+        f"§9.2 SET FORMAT으로 SET {set_no:02d} 하나만 출력하세요. HEADER_JSON과 다른 세트는 출력하지 않습니다.",
+        f"Primary Biometric Anchor는 {ANCHOR_KEY} 값을 그대로 사용하세요.",
+    ]
+    if story:
+        parts.append(f"Story Position은 {STORY_KEY} 값을 그대로 사용하세요.")
+    parts += [
+        "아래 HEADER_JSON 값(도시/시즌/색상/텍스처/비율)을 그대로 따르세요.",
+        "```json",
+        json.dumps(header, ensure_ascii=False, indent=2),
+        "```",
+    ]
+    if note:
+        parts += ["", REGENERATE_NOTE_HEADER, "이 세트만 아래 메모를 반영해 다시 작성하세요. 위 슬롯 제약은 바꾸지 않습니다.", note]
+    return "\n".join(parts)
+
+
+def extract_set(text, set_no) -> str:
+    """세트 응답에서 '## SET NN' 블록만 (머리말이 없으면 응답 전체)"""
+    text = (text or "").strip()
+    headings = list(SET_HEADING_RE.finditer(text))
+    for index, heading in enumerate(headings):
+        if int(heading.group(1)) != set_no:
+            continue
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(text)
+        return text[heading.start():end].strip().removesuffix("---").strip() + "\n"
+    return text + "\n" if text else ""
+
+
+def regenerate_set(generate_set, doc, set_no, combined_prompt, plan=None, note="", anchors=None):
+    """저장된 SetDocument의 SET 하나만 다시 생성해 제자리 교체 - 새 SetEntry (헤더와 다른 세트는 그대로)
+
+    요청은 HEADER_JSON + 이 세트의 슬롯 제약(Cast_NN, 앵커, 스토리 위치) + 메모만 담고 대화 히스토리는 보내지 않는다.
+    앵커는 anchors(§2.1 위반 수정 등) → 기존 세트 값 → plan의 앵커 배정 순으로 사용.
+    """
+    entry = doc.get(set_no)
+    if entry is None:
+        raise ValueError(f"SET {set_no:02d}가 문서에 없습니다.")
+    anchors = anchors or entry.anchors or (plan_anchors(plan)[set_no - 1] if plan is not None else ())
+    prompt = set_prompt(combined_prompt, set_no, doc.header, anchors, story=entry.field("story"), note=(note or "").strip())
+    new_entry = parse_set(extract_set(generate_set(prompt), set_no), set_no)
+    if new_entry is None:
+        raise ValueError(f"응답에서 SET {set_no:02d}를 읽지 못했습니다.")
+    doc.replace_set(new_entry)
+    return new_entry
+
+
+def header_block(text) -> str:
+    """헤더 응답에서 첫 SET 머리말 앞부분 (HEADER_JSON 블록)"""
+    heading = SET_HEADING_RE.search(text or "")
+    return (text[:heading.start()] if heading else text or "").rstrip() + "\n"
+
+
+def fan_out(send_header, generate_set, combined_prompt, plan, sets=None, on_text=None, check_cancelled=None,
+            workers=FANOUT_WORKERS, retries=SET_RETRIES):
+    """헤더 1회 + 세트 병렬 생성 → FanoutResult
+
+    send_header(prompt)/generate_set(prompt)는 응답 텍스트를 돌려주는 함수 (사용량 누적은 호출 쪽에서).
+    on_text(text)는 합친 응답을 §9.2 순서대로 이어 붙일 수 있을 때마다 호출 (앞 세트가 끝나야 다음 세트 전달).
+    check_cancelled()는 세트 요청 전후로 호출 - 예외를 내면 남은 세트를 취소하고 그대로 전파.
+    """
+    sets = list(sets or range(1, SET_COUNT + 1))
+    anchors = plan_anchors(plan)
+    emit = on_text or (lambda text: None)
+
+    header_text = header_block(send_header(header_prompt(combined_prompt, anchors[0])))
+    parsed, _ = parse_result(header_text)
+    header = parsed.data if isinstance(parsed.data, dict) else {}
+    emit(header_text)
+
+    blocks = {}
+    failed = {}
+    timings = {}
+    lock = threading.Lock()
+    state = {"next": 0}
+
+    def flush():
+        # 앞에서부터 끝난 세트만 순서대로 전달
+        while state["next"] < len(sets) and sets[state["next"]] in blocks.keys() | failed.keys():
+            set_no = sets[state["next"]]
+            if set_no in blocks:
+                emit(("\n" if state["next"] == 0 else SET_SEPARATOR) + blocks[set_no])
+            state["next"] += 1
+
+    def run(set_no):
+        started = time.perf_counter()
+        prompt = set_prompt(combined_prompt, set_no, header, anchors[set_no - 1])
+        error = None
+        for _ in range(retries + 1):
+            if check_cancelled is not None:
+                check_cancelled()
+            try:
+                block = extract_set(generate_set(prompt), set_no)
+                break
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        else:
+            with lock:
+                failed[set_no] = error
+                timings[set_no] = round(time.perf_counter() - started, 3)
+                flush()
+            return
+        with lock:
+            blocks[set_no] = block
+            timings[set_no] = round(time.perf_counter() - started, 3)
+            flush()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sets))), thread_name_prefix="lgad-set") as pool:
+        futures = [pool.submit(run, set_no) for set_no in sets]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    body = SET_SEPARATOR.join(blocks[set_no] for set_no in sets if set_no in blocks)
+    text = f"{header_text}\n{body}" if body else header_text
+    return FanoutResult(text, header, blocks, failed, timings)
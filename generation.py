@@ -0,0 +1,340 @@
+"""
+LG Art Director System v5.9.0 - Chat Turn Generation
+채팅 한 턴 생성 (응답 캐시 → 스트리밍 → 구조화 출력 변환 → 스키마 검증/수정 → 캐스트 채점 → 원장 기록 → 패키지 저장)을
+Streamlit 없이 실행 - 작업 큐(jobs.py) 워커에서 job에 진행 상황을 기록
+"""
+
+import threading
+import time
+from functools import partial
+
+from anchor_check import check_document, repair_anchors
+from cast_planner import CAST_MODE_LOOKBOOK, check_response, plan_for_settings
+from fanout import fan_out, regenerate_set
+from package_store import job_package_key, store_package
+from request_builder import OUTPUT_MODE_PROSE
+from response_cache import get_response_cache
+from response_parser import parse_result
+from schema_validator import repair_response, validate_step1
+from set_document import parse_document
+from streaming import StreamAccumulator, iter_chunk_text
+from structured_output import to_response_text
+from telemetry import SOURCE_APP, STATUS_ERROR, add_usage, make_entry, read_usage, record_turn
+
+STAGE_GENERATING = "Art Director가 설정값과 지시사항을 분석 중입니다..."
+STAGE_REPAIRING = "스키마 검증에 실패한 필드만 수정 요청 중입니다..."
+STAGE_FANOUT = "HEADER_JSON을 정한 뒤 SET별로 동시에 생성 중입니다..."
+STAGE_ANCHORS = "§2.1 앵커 위반 세트만 새 앵커로 다시 생성 중입니다..."
+STAGE_REGENERATE = "SET {set_no:02d}만 다시 생성 중입니다 (다른 세트는 그대로)..."
+
+
+class ChatTurn:
+    """한 턴 생성에 필요한 값 (스크립트가 조립해서 작업으로 넘김)"""
+
+    __slots__ = (
+        "chat",
+        "combined_prompt",
+        "settings",
+        "model_name",
+        "prompt_version_id",
+        "output_mode",
+        "overrides",
+        "streaming",
+        "cache_key",
+        "reuse_cached",
+        "cache_variants",
+        "history_stats",
+        "prompt_tokens_saved",
+        "telemetry",
+        "fanout",
+        "fanout_sets",
+        "anchor_repair",
+        "direction",
+    )
+
+    def __init__(self, chat, combined_prompt, settings, model_name, prompt_version_id, output_mode=OUTPUT_MODE_PROSE,
+                 overrides=None, streaming=True, cache_key="", reuse_cached=False, cache_variants=1,
+                 history_stats=None, prompt_tokens_saved=None, telemetry=None, fanout=None, fanout_sets=None,
+                 anchor_repair=None, direction=""):
+        self.chat = chat
+        self.combined_prompt = combined_prompt
+        self.settings = dict(settings)
+        self.model_name = model_name
+        self.prompt_version_id = prompt_version_id
+        self.output_mode = output_mode
+        self.overrides = overrides
+        self.streaming = streaming
+        self.cache_key = cache_key
+        self.reuse_cached = reuse_cached
+        self.cache_variants = cache_variants
+        self.history_stats = history_stats or {}
+        self.prompt_tokens_saved = prompt_tokens_saved
+        self.telemetry = telemetry or {}
+        # 단발 생성 함수 (prompt, on_wait=None) → 응답 - 있으면 SET 병렬 생성 (fanout.py)
+        self.fanout = fanout
+        self.fanout_sets = fanout_sets
+        # 단발 생성 함수 - 있으면 §2.1 앵커 위반 세트만 다시 생성 (anchor_check.py)
+        self.anchor_repair = anchor_repair
+        # 화면에 보이는 지시사항 (패키지 저장소 검색용)
+        self.direction = direction
+
+
+def queue_stage(job):
+    """client_pool 대기열 on_wait → 작업 단계 문구"""
+
+    def notify(position, wait):
+        job.set_stage(f"⏳ 요청 대기열 {position}번째 · 예상 대기 ~{wait:.0f}초")
+
+    return notify
+
+
+def _fanout_turn(job, turn, usage, on_wait):
+    """헤더는 채팅 세션으로, SET은 단발 요청으로 동시에 - FanoutResult (사용량은 usage에 누적)"""
+    usage_lock = threading.Lock()
+
+    def read_text(response):
+        with usage_lock:
+            add_usage(usage, read_usage(response))
+        return response.text or ""
+
+    def send_header(prompt):
+        return read_text(turn.chat.send_message(prompt, generation_config=turn.overrides, on_wait=on_wait))
+
+    job.set_stage(STAGE_FANOUT)
+    return fan_out(
+        send_header,
+        lambda prompt: read_text(turn.fanout(prompt, on_wait=on_wait)),
+        turn.combined_prompt,
+        plan_for_settings(turn.settings),
+        turn.fanout_sets,
+        on_text=job.feed,
+        check_cancelled=job.check_cancelled,
+    )
+
+
+def _anchor_turn(job, turn, full_response, usage, on_wait, metrics):
+    """§2.1 앵커 점검 - 위반 세트만 새 앵커로 다시 생성한 응답 (지표에 처음 위반, 수정한 세트, 남은 위반)"""
+    doc = parse_document(full_response)
+    if doc is None:
+        return full_response
+    # 룩북 여부는 요청 설정으로 판단 (HEADER_JSON cast_mode는 선택 키)
+    lookbook = turn.settings.get("cast_mode") == CAST_MODE_LOOKBOOK
+    report = check_document(doc, lookbook=lookbook)
+    if report.ok:
+        return full_response
+    metrics["anchor_issues"] = [str(issue) for issue in report.issues]
+    usage_lock = threading.Lock()
+
+    def generate_set(prompt):
+        job.check_cancelled()
+        response = turn.anchor_repair(prompt, on_wait=on_wait)
+        with usage_lock:
+            add_usage(usage, read_usage(response))
+        return response.text or ""
+
+    job.set_stage(STAGE_ANCHORS)
+    repaired, _ = repair_anchors(doc, report, generate_set, turn.combined_prompt, plan_for_settings(turn.settings))
+    job.check_cancelled()
+    metrics["anchor_repaired"] = repaired
+    remaining = check_document(doc, lookbook=lookbook).issues
+    if remaining:
+        metrics["anchor_remaining"] = [str(issue) for issue in remaining]
+    return doc.markdown()
+
+
+def fanout_generator(backend, model_name, system, overrides=None):
+    """ChatTurn.fanout용 단발 생성 함수"""
+    return partial(backend.generate, model_name, system, generation_config=overrides)
+
+
+def run_chat_turn(job, turn):
+    """작업 워커에서 한 턴 생성 - (응답 텍스트, 지표 dict) 반환, 취소되면 jobs.JobCancelled"""
+    started = time.perf_counter()
+    usage = {}
+    repair_prompts = []
+    accumulator = job.accumulator = StreamAccumulator()
+    on_wait = queue_stage(job)
+    try:
+        response_cache = get_response_cache()
+        cached_response = (
+            response_cache.lookup(turn.cache_key, turn.cache_variants) if turn.reuse_cached and turn.cache_key else None
+        )
+        chat = turn.chat
+        job.set_stage(STAGE_GENERATING)
+        fanout = None
+        if cached_response is not None:
+            job.feed(cached_response)
+        elif turn.fanout is not None:
+            fanout = _fanout_turn(job, turn, usage, on_wait)
+        elif turn.streaming:
+            stream_usage = {}
+            response = chat.send_message(
+                turn.combined_prompt, stream=True, generation_config=turn.overrides, on_wait=on_wait
+            )
+            job.set_stage(STAGE_GENERATING)
+            chunks = iter_chunk_text(response, on_usage=lambda chunk: stream_usage.update(read_usage(chunk)))
+            try:
+                for chunk_text in chunks:
+                    job.check_cancelled()
+                    job.feed(chunk_text)
+            finally:
+                close = getattr(response, "close", None)
+                if close is not None:
+                    close()
+            add_usage(usage, stream_usage)
+        else:
+            response = chat.send_message(turn.combined_prompt, generation_config=turn.overrides, on_wait=on_wait)
+            add_usage(usage, read_usage(response))
+            job.feed(response.text or "")
+        accumulator.finish()
+        job.check_cancelled()
+
+        full_response = accumulator.text
+        if cached_response is None and turn.output_mode != OUTPUT_MODE_PROSE:
+            full_response = to_response_text(full_response, turn.output_mode)
+        metrics = accumulator.metrics()
+        metrics["input_tokens_before"] = turn.history_stats.get("before")
+        metrics["input_tokens_after"] = turn.history_stats.get("after")
+        metrics["cached"] = cached_response is not None
+        if turn.prompt_tokens_saved is not None:
+            metrics["prompt_tokens_saved"] = turn.prompt_tokens_saved
+        if fanout is not None:
+            metrics["fanout_sets"] = len(fanout.sets)
+            metrics["fanout_failed"] = sorted(fanout.failed)
+            metrics["fanout_slowest"] = max(fanout.timings.values(), default=0.0)
+
+        parsed, text_content = parse_result(full_response)
+        schema_errors = validate_step1(parsed.data) if isinstance(parsed.data, dict) else []
+        if schema_errors and cached_response is None:
+
+            def send_repair(repair_prompt):
+                job.check_cancelled()
+                repair_prompts.append(repair_prompt)
+                response = chat.send_message(repair_prompt, on_wait=on_wait)
+                job.set_stage(STAGE_REPAIRING)
+                add_usage(usage, read_usage(response))
+                return response.text
+
+            job.set_stage(STAGE_REPAIRING)
+            full_response, parsed, remaining_errors = repair_response(
+                send_repair,
+                full_response,
+                parsed,
+                schema_errors,
+            )
+            metrics["schema_repaired"] = len(remaining_errors) < len(schema_errors)
+            schema_errors = remaining_errors
+            _, text_content = parse_result(full_response)
+        metrics["schema_errors"] = len(schema_errors)
+        metrics["json_repairs"] = list(parsed.repairs)
+
+        if cached_response is None and turn.anchor_repair is not None:
+            full_response = _anchor_turn(job, turn, full_response, usage, on_wait, metrics)
+            _, text_content = parse_result(full_response)
+
+        diversity, plan_mismatches = check_response(plan_for_settings(turn.settings), text_content)
+        if diversity is not None:
+            metrics["diversity_score"] = diversity.total
+            metrics["plan_mismatches"] = len(plan_mismatches)
+            metrics["cast_notes"] = [*diversity.warnings, *plan_mismatches]
+
+        entry = make_entry(
+            SOURCE_APP,
+            turn.model_name,
+            turn.prompt_version_id,
+            usage=usage,
+            ttft=metrics["ttft"],
+            latency=time.perf_counter() - started,
+            repairs=len(repair_prompts),
+            response_cached=cached_response is not None,
+            json_parsed=isinstance(parsed.data, dict),
+            schema_errors=len(schema_errors),
+            **turn.telemetry,
+        )
+        record_turn(entry)
+        if usage:
+            metrics["output_tokens"] = usage["output_tokens"]
+            metrics["cost_usd"] = entry["cost_usd"]
+
+        if cached_response is None and parsed.data and not schema_errors and turn.cache_key:
+            response_cache.put(turn.cache_key, full_response, turn.cache_variants)
+        if cached_response is None:
+            # 캐시 응답은 처음 생성한 턴이 이미 저장함
+            store_package(
+                job_package_key(job.id),
+                turn.settings,
+                full_response,
+                request=turn.combined_prompt,
+                direction=turn.direction,
+                model=turn.model_name,
+                prompt_version=turn.prompt_version_id,
+                session_id=job.session_id,
+            )
+        return full_response, metrics
+    except Exception as e:
+        # 취소도 원장에는 오류 턴으로 남김 (이미 받은 토큰은 과금됨)
+        record_turn(
+            make_entry(
+                SOURCE_APP,
+                turn.model_name,
+                turn.prompt_version_id,
+                status=STATUS_ERROR,
+                usage=usage,
+                latency=time.perf_counter() - started,
+                repairs=len(repair_prompts),
+                error=f"{type(e).__name__}: {e}",
+                **turn.telemetry,
+            )
+        )
+        raise
+
+
+def run_set_regeneration(job, doc, set_no, combined_prompt, settings, generate, model_name, prompt_version_id,
+                         note="", on_update=None, telemetry=None):
+    """작업 워커에서 SET 하나만 다시 생성해 doc에 제자리 교체 - (새 SET 본문, 지표 dict)
+
+    generate는 ChatTurn.fanout과 같은 단발 생성 함수 (대화 히스토리 없이 보냄).
+    교체 후 on_update(문서 원문)로 원래 턴의 저장된 응답을 갱신.
+    """
+    started = time.perf_counter()
+    usage = {}
+    on_wait = queue_stage(job)
+
+    def generate_set(prompt):
+        job.check_cancelled()
+        response = generate(prompt, on_wait=on_wait)
+        add_usage(usage, read_usage(response))
+        job.check_cancelled()
+        return response.text or ""
+
+    job.set_stage(STAGE_REGENERATE.format(set_no=set_no))
+    try:
+        entry = regenerate_set(generate_set, doc, set_no, combined_prompt, plan_for_settings(settings), note)
+    except Exception as e:
+        record_turn(
+            make_entry(
+                SOURCE_APP,
+                model_name,
+                prompt_version_id,
+                status=STATUS_ERROR,
+                usage=usage,
+                latency=time.perf_counter() - started,
+                error=f"{type(e).__name__}: {e}",
+                **(telemetry or {}),
+            )
+        )
+        raise
+    text = "\n".join(entry.markdown_lines()).strip() + "\n"
+    job.feed(text)
+    if on_update is not None:
+        on_update(doc.markdown())
+
+    latency = time.perf_counter() - started
+    entry_record = make_entry(SOURCE_APP, model_name, prompt_version_id, usage=usage, latency=latency,
+                              json_parsed=True, **(telemetry or {}))
+    record_turn(entry_record)
+    metrics = {"regenerated_set": set_no, "total": round(latency, 3)}
+    if usage:
+        metrics["output_tokens"] = usage["output_tokens"]
+        metrics["cost_usd"] = entry_record["cost_usd"]
+    return text, metrics
@@ -0,0 +1,176 @@
+"""
+LG Art Director System v5.9.0 - Golden Output Harness
+전체 시스템 프롬프트로 만든 기준 출력(golden)과 슬라이싱한 시스템 프롬프트 출력을 구조 지표로 비교
+
+사용 예:
+    python golden.py record rows.csv --direction "카멜 코트, 모던한 분위기" --golden golden.jsonl
+    python golden.py compare rows.csv --direction "카멜 코트, 모던한 분위기" --golden golden.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import fake_backend_enabled
+from batch import (
+    DEFAULT_MODEL,
+    DEFAULT_RPM,
+    DEFAULT_WORKERS,
+    RateLimiter,
+    load_rows,
+    make_generator,
+    normalize_row,
+    run_row,
+)
+from cast_planner import extract_cast
+from prompt import current_prompt
+
+DEFAULT_GOLDEN = "golden.jsonl"
+
+# 재시도 횟수 (비교 대상이 같은 조건이 되도록 배치보다 적게)
+DEFAULT_RETRIES = 1
+
+# 다양성 점수가 기준보다 이만큼 넘게 떨어지면 회귀 (temperature > 0이라 약간의 흔들림은 허용)
+DEFAULT_SCORE_TOLERANCE = 10
+
+
+def summarize(record) -> dict:
+    """배치 결과 레코드 → 비교용 구조 지표"""
+    data = record.get("json")
+    diversity = record.get("diversity") or {}
+    return {
+        "status": record.get("status"),
+        "sets": len(extract_cast(record.get("text") or "")),
+        "json_keys": sorted(data) if isinstance(data, dict) else [],
+        "schema_errors": len(record.get("schema_errors") or []),
+        "diversity_score": diversity.get("score"),
+        "plan_mismatches": len(diversity.get("plan_mismatches") or []),
+    }
+
+
+def compare_summaries(golden, current, score_tolerance=DEFAULT_SCORE_TOLERANCE) -> list:
+    """기준 대비 나빠진 항목 목록 (비어 있으면 통과)"""
+    problems = []
+    if golden["status"] == "ok" and current["status"] != "ok":
+        problems.append(f"status {golden['status']} → {current['status']}")
+    if current["sets"] < golden["sets"]:
+        problems.append(f"SET 수 {golden['sets']} → {current['sets']}")
+    missing = sorted(set(golden["json_keys"]) - set(current["json_keys"]))
+    if missing:
+        problems.append(f"JSON 키 누락: {', '.join(missing)}")
+    if current["schema_errors"] > golden["schema_errors"]:
+        problems.append(f"스키마 오류 {golden['schema_errors']} → {current['schema_errors']}")
+    if golden["diversity_score"] is not None:
+        score = current["diversity_score"]
+        if score is None or score < golden["diversity_score"] - score_tolerance:
+            problems.append(f"다양성 점수 {golden['diversity_score']} → {score}")
+    if current["plan_mismatches"] > golden["plan_mismatches"]:
+        problems.append(f"계획 불일치 {golden['plan_mismatches']} → {current['plan_mismatches']}")
+    return problems
+
+
+def run_rows(rows, direction, slicing, model_name=DEFAULT_MODEL, api_key="", workers=DEFAULT_WORKERS,
+             rpm=DEFAULT_RPM, retries=DEFAULT_RETRIES):
+    """행마다 생성 - slicing=False면 전체 시스템 프롬프트, True면 행 설정에 맞춘 슬라이스"""
+    prompt_version = current_prompt()
+    generate = make_generator(api_key, model_name, prompt_version)
+    limiter = RateLimiter(rpm)
+    jobs = [normalize_row(row, index, direction) for index, row in enumerate(rows, start=1)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                run_row,
+                generate,
+                limiter,
+                row_id,
+                settings,
+                row_direction,
+                model_name,
+                retries,
+                prompt_version=prompt_version,
+                slicing=slicing,
+            )
+            for row_id, settings, row_direction in jobs
+        ]
+        return [future.result() for future in futures]
+
+
+def record_golden(records, path) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            entry = {
+                "row_id": record["row_id"],
+                "prompt_version": record.get("prompt_version", ""),
+                "summary": summarize(record),
+                "text": record.get("text", ""),
+            }
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def load_golden(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return {entry["row_id"]: entry for entry in entries}
+
+
+def compare_golden(records, golden, score_tolerance=DEFAULT_SCORE_TOLERANCE, log=print) -> int:
+    """슬라이스 출력 vs 기준 출력 - 회귀한 행 수 반환"""
+    regressions = saved = 0
+    for record in records:
+        entry = golden.get(record["row_id"])
+        saved += (record.get("prompt_slice") or {}).get("tokens_saved", 0)
+        if entry is None:
+            log(f"{record['row_id']}: 기준 없음 (record로 먼저 생성)")
+            continue
+        if entry.get("prompt_version") != record.get("prompt_version"):
+            log(f"{record['row_id']}: 기준 프롬프트 버전 {entry.get('prompt_version')} ≠ {record.get('prompt_version')}")
+        problems = compare_summaries(entry["summary"], summarize(record), score_tolerance)
+        if problems:
+            regressions += 1
+            log(f"{record['row_id']}: 회귀 - {'; '.join(problems)}")
+        else:
+            log(f"{record['row_id']}: 통과")
+    if records:
+        log(f"시스템 프롬프트 절감: 행당 평균 ~{saved // len(records):,} 토큰")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="시스템 프롬프트 슬라이싱 golden 출력 비교")
+    parser.add_argument(
+        "command",
+        choices=("record", "compare"),
+        help="record: 전체 프롬프트로 기준 저장 / compare: 슬라이스 출력 비교",
+    )
+    parser.add_argument("rows", help="설정 행 파일 (.csv 또는 .jsonl)")
+    parser.add_argument("--direction", default="", help="공통 크리에이티브 지시사항 (행의 direction 컬럼이 우선)")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN, help="기준 출력 JSONL 경로")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM, help="분당 최대 요청 수 (0 = 제한 없음)")
+    parser.add_argument("--tolerance", type=int, default=DEFAULT_SCORE_TOLERANCE, help="허용하는 다양성 점수 하락폭")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("GOOGLE_API_KEY", "").strip()
+    if not api_key and not fake_backend_enabled():
+        raise SystemExit("GOOGLE_API_KEY 환경변수가 필요합니다.")
+
+    rows = load_rows(args.rows)
+    slicing = args.command == "compare"
+    records = run_rows(rows, args.direction, slicing, args.model, api_key, args.workers, args.rpm)
+
+    if args.command == "record":
+        record_golden(records, args.golden)
+        print(f"기준 출력 {len(records)}행 저장 → {args.golden}")
+        return
+
+    regressions = compare_golden(records, load_golden(args.golden), args.tolerance)
+    print(f"완료: {len(records) - regressions}/{len(records)} 통과")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
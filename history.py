@@ -0,0 +1,162 @@
+"""
+LG Art Director System v5.9.0 - History Compaction
+model_messages를 토큰 예산 안으로 압축해서 채팅 히스토리로 전달
+"""
+
+import json
+import math
+import os
+
+from response_parser import parse_response
+from set_document import message_content
+
+OVERRIDE_HEADER = "[SYSTEM_OVERRIDE_DATA]"
+OVERRIDE_REPEAT_NOTE = "[SYSTEM_OVERRIDE_DATA] (직전 턴과 동일한 설정)"
+SUMMARY_HEADER = "[이전 응답 요약]"
+
+# 히스토리 토큰 예산 (환경변수로 기본값 변경 가능)
+DEFAULT_TOKEN_BUDGET = 12000
+TOKEN_BUDGET_ENV = "LGAD_HISTORY_TOKEN_BUDGET"
+
+# 원문 그대로 유지할 최근 어시스턴트 응답 수
+KEEP_RECENT_TURNS = 1
+
+# 대략적인 토큰 추정치 (UTF-8 바이트 기준, 한글 1자 ≈ 0.75토큰)
+BYTES_PER_TOKEN = 4
+
+# 요약에 남길 SET 제목 줄 최대 개수
+SUMMARY_MAX_LINES = 12
+
+
+def resolve_token_budget() -> int:
+    """환경변수 또는 기본 히스토리 토큰 예산"""
+    try:
+        budget = int(os.getenv(TOKEN_BUDGET_ENV, "").strip())
+    except ValueError:
+        return DEFAULT_TOKEN_BUDGET
+    return budget if budget > 0 else DEFAULT_TOKEN_BUDGET
+
+
+def estimate_tokens(text) -> int:
+    """텍스트 토큰 수 추정"""
+    if not text:
+        return 0
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def count_message_tokens(messages) -> int:
+    return sum(estimate_tokens(message_content(msg)) for msg in messages)
+
+
+def split_override(content):
+    """(SYSTEM_OVERRIDE_DATA 블록, 나머지) 분리 - 블록이 없으면 ("", content)"""
+    if not content.startswith(OVERRIDE_HEADER):
+        return "", content
+    block, sep, rest = content.partition("\n\n")
+    return block, rest if sep else ""
+
+
+def dedupe_overrides(messages):
+    """직전과 동일한 SYSTEM_OVERRIDE_DATA 블록을 한 줄 표시로 대체"""
+    result = []
+    last_block = None
+    for msg in messages:
+        content = message_content(msg)
+        if msg.get("role") == "user":
+            block, rest = split_override(content)
+            if block:
+                if block == last_block:
+                    content = f"{OVERRIDE_REPEAT_NOTE}\n\n{rest}".strip()
+                last_block = block
+        result.append({"role": msg.get("role"), "content": content})
+    return result
+
+
+def set_headings(text, limit=SUMMARY_MAX_LINES):
+    """본문에서 제목 줄(## SET 01 ...)만 추출 - 제목이 없으면 앞쪽 몇 줄"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    headings = [line for line in lines if line.startswith("#")][:limit]
+    return headings or lines[:3]
+
+
+def summarize_assistant(content, doc=None) -> str:
+    """어시스턴트 응답을 SET 제목 줄 + 추출된 JSON으로 축약 (SET 문서가 있으면 다시 파싱하지 않음)"""
+    if doc is not None:
+        json_data = doc.header
+        headings = [entry.lines[0].strip() for entry in doc.sets[:SUMMARY_MAX_LINES]]
+    else:
+        json_data, text = parse_response(content)
+        headings = set_headings(text)
+
+    parts = [SUMMARY_HEADER, *headings]
+    if json_data is not None:
+        compact_json = json.dumps(json_data, ensure_ascii=False, separators=(",", ":"))
+        parts.append(f"```json\n{compact_json}\n```")
+
+    summary = "\n".join(parts)
+    return summary if len(summary) < len(content) else content
+
+
+def _split_turns(messages):
+    """user 메시지를 기준으로 턴 단위로 묶음"""
+    turns = []
+    for msg in messages:
+        if msg.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return turns
+
+
+def compact_history(messages, budget=None, keep_recent=KEEP_RECENT_TURNS, pending=""):
+    """히스토리 압축 - (압축된 메시지, 통계) 반환
+
+    1. 최근 keep_recent개를 제외한 어시스턴트 응답을 JSON + 요약으로 대체
+    2. 반복되는 SYSTEM_OVERRIDE_DATA 블록 제거
+    3. 그래도 예산을 넘으면 오래된 턴부터 제거 (최근 keep_recent 턴은 유지)
+
+    pending은 이번 턴에 보낼 프롬프트로, 통계의 입력 토큰에만 합산된다.
+    """
+    budget = budget or resolve_token_budget()
+    pending_tokens = estimate_tokens(pending)
+    before = count_message_tokens(messages) + pending_tokens
+
+    compacted = list(messages)
+    assistant_indexes = [i for i, msg in enumerate(compacted) if msg.get("role") == "assistant"]
+    old_indexes = assistant_indexes[:-keep_recent] if keep_recent else assistant_indexes
+    for index in old_indexes:
+        msg = compacted[index]
+        compacted[index] = {"role": msg["role"], "content": summarize_assistant(message_content(msg), msg.get("doc"))}
+
+    # 턴을 제거한 뒤에도 남은 첫 override 블록은 원문이 되도록 중복 제거는 마지막에 적용
+    turns = _split_turns(compacted)
+    compacted = dedupe_overrides(compacted)
+    dropped = 0
+    while (
+        len(turns) > max(keep_recent, 1)
+        and count_message_tokens(compacted) + pending_tokens > budget
+    ):
+        turns.pop(0)
+        dropped += 1
+        compacted = dedupe_overrides([msg for turn in turns for msg in turn])
+
+    stats = {
+        "before": before,
+        "after": count_message_tokens(compacted) + pending_tokens,
+        "dropped_turns": dropped,
+    }
+    return compacted, stats
+
+
+def build_chat_history(messages):
+    """세션 메시지(user/assistant) → 모델 채팅 히스토리 (빈 메시지 제외)"""
+    history = []
+    for msg in messages:
+        role = msg.get("role")
+        content = message_content(msg).strip()
+        if not content:
+            continue
+        if role == "user":
+            history.append({"role": "user", "parts": [content]})
+        elif role == "assistant":
+            history.append({"role": "model", "parts": [content]})
+    return history
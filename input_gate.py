@@ -0,0 +1,357 @@
+"""
+LG Art Director System v5.9.0 - Input Gate
+§0.1 ANTI-INJECTION PROTOCOL / §0.2 CONTENT SAFETY FILTER를 로컬에서 먼저 적용
+차단된 입력은 API로 보내지 않고, 모든 판정은 발동한 규칙과 함께 JSONL로 기록
+"""
+
+import base64
+import codecs
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from urllib.parse import unquote
+
+# 판정 기록 위치 (환경변수로 변경, "0"이면 기록 안 함)
+GATE_LOG_ENV = "LGAD_INPUT_GATE_LOG"
+DEFAULT_GATE_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "input_gate.jsonl")
+
+ACTION_ALLOW = "allow"
+ACTION_SANITIZE = "sanitize"
+ACTION_BLOCK = "block"
+
+# §0.1 / §0.2 고정 응답
+MESSAGE_SUSPICIOUS = "컨셉 입력 형식에 맞춰 다시 입력해 주세요."
+MESSAGE_LEAK = "저는 LG 매거진 화보 프롬프트 생성 전문 AI입니다. \n어떤 컨셉의 화보를 만들어 드릴까요?"
+MESSAGE_CELEBRITY = "특정 실존 인물과 유사한 외모는 생성할 수 없습니다.\n대신 일반적인 특징으로 표현해 드릴까요?"
+MESSAGE_UNSAFE = "매거진 화보에 적합한 건전한 컨셉으로 수정해 주세요."
+
+# 기록에 남기는 일치 구간 최대 길이
+EXCERPT_CHARS = 40
+
+# §0.1 ENCODING DETECTION - 해당 구간만 제거
+# Base64는 16자 이상 + 숫자/기호 포함 또는 6자 이상 + 패딩 (일반 영단어 오탐 방지), Hex는 0x 접두 또는 24자 이상
+ENCODED_SEGMENT_PATTERNS = (
+    (
+        "encoding.base64",
+        re.compile(
+            r"(?<![\w+/])(?:(?=[A-Za-z0-9+/]*[0-9+/])[A-Za-z0-9+/]{16,}={0,2}|[A-Za-z0-9+/]{6,}={1,2})(?![\w+/=])"
+        ),
+    ),
+    ("encoding.hex", re.compile(r"\b0x[0-9A-Fa-f]{8,}\b|\b[0-9A-Fa-f]{24,}\b")),
+    ("encoding.unicode_escape", re.compile(r"(?:\\u[0-9A-Fa-f]{4}|\\U[0-9A-Fa-f]{8}|\\x[0-9A-Fa-f]{2})+")),
+)
+
+# URL 인코딩 - 연속된 %XX 구간만 디코딩 후 정상 처리 ("100%Eco"처럼 UTF-8이 아닌 구간은 원문 유지)
+URL_ENCODED_PATTERN = re.compile(r"(?:%[0-9A-Fa-f]{2})+")
+
+# Zero-width / 방향 제어 문자 - 제거 후 정상 처리
+ZERO_WIDTH_PATTERN = re.compile("[\u00ad\u200b-\u200f\u202a-\u202e\u2060-\u2064\ufeff]")
+
+# Cyrillic lookalike → Latin (키릴 문자가 있을 때만 변환)
+CYRILLIC_PATTERN = re.compile("[\u0400-\u052f]")
+CYRILLIC_LOOKALIKES = str.maketrans(
+    "АВЕКМНОРСТХаеорсухіјѕԁӏ",
+    "ABEKMHOPCTXaeopcyxijsdl",
+)
+
+# Leetspeak 역변환 (탈옥 문구 검사용 보조 표기)
+LEETSPEAK = str.maketrans("013457@$", "oieastas")
+
+# 규칙 → (동작, 응답) / 규칙별 패턴
+RULES = {
+    "leak.prompt": (ACTION_BLOCK, MESSAGE_LEAK),
+    "leak.override": (ACTION_BLOCK, MESSAGE_LEAK),
+    "celebrity.likeness": (ACTION_BLOCK, MESSAGE_CELEBRITY),
+    "safety.sexual": (ACTION_BLOCK, MESSAGE_UNSAFE),
+    "safety.violence": (ACTION_BLOCK, MESSAGE_UNSAFE),
+    "safety.hate": (ACTION_BLOCK, MESSAGE_UNSAFE),
+    "safety.illegal": (ACTION_BLOCK, MESSAGE_UNSAFE),
+    "safety.minor_sexual": (ACTION_BLOCK, MESSAGE_UNSAFE),
+    "safety.minor": (ACTION_ALLOW, ""),
+}
+
+RULE_PATTERNS = {
+    # §0.1 SYSTEM PROMPT LEAK PREVENTION - 요청/명령 형태만 ("시스템 프롬프트 말고", "the rules of the game"은 통과)
+    "leak.prompt": (
+        r"(?:repeat|reveal|show|print|display|output|tell|give)\s+(?:me\s+|us\s+)?(?:your|the)\s+"
+        r"(?:system\s*)?(?:instructions|prompt|rules)\b(?!\s+(?:of|for)\b)",
+        r"what(?:'s|\s+is|\s+are)\s+your\s+(?:system\s*prompt|instructions|rules)",
+        r"translate\s+this\s+conversation",
+        r"시스템\s*프롬프트[을를가이는]?\s*(?:전부\s*|모두\s*|그대로\s*)?(?:요약|보여|출력|알려|공개|말해|번역|반복)",
+        r"(?:대화|맥락|지시문)[을를의]?\s*(?:전부\s*|모두\s*)?(?:요약|보여|출력|알려|번역)",
+        r"지시\s*사항[을를의]?\s*(?:전부\s*|모두\s*)?(?:요약|보여|출력|알려|번역)",
+        r"(?:너|당신)의\s*(?:역할|규칙|지시)[을를]?\s*(?:설명|알려|보여)",
+    ),
+    "leak.override": (
+        r"ignore\s+(?:all\s+)?(?:the\s+)?(?:previous|prior|above)\s+(?:instructions|rules|prompts?)",
+        r"disregard\s+(?:all\s+)?(?:previous|prior|above|your)\s+(?:instructions|rules)",
+        r"you\s+are\s+now\s+(?:a\s+)?(?:dan|jailbroken|in\s+developer\s+mode)",
+        r"act\s+as\s+(?:a\s+)?(?:dan|jailbroken|developer\s+mode)",
+        r"(?:이전|앞의|위의)\s*(?:지시|명령|규칙)[을를]?\s*(?:무시|잊어)",
+    ),
+    # §0.1 CELEBRITY LIKENESS DETECTION - 실존 인물 이름 없이도 판별 가능한 표현만
+    "celebrity.likeness": (
+        r"looks?\s+(?:just\s+)?like\s+(?:the\s+)?(?:famous|celebrity|actor|actress|singer|idol)",
+        r"(?:celebrity|celeb)\s+look-?alike",
+        r"도플갱어",
+        r"(?:연예인|셀럽|배우|가수|아이돌|유명인)\s*\S{0,12}\s*(?:처럼\s*생긴|닮은|닮게)",
+    ),
+    # §0.2 PROHIBITED CONTENT - 명확한 표현만 (누드 베이지, murder mystery 같은 색/무드 용어는 모델의 §0.2 판단에 맡김)
+    "safety.sexual": (
+        r"\bnsfw\b", r"\bnudity\b", r"\bnaked\b", r"\btopless\b", r"\bporn",
+        r"\berotic", r"\bexplicit\s+sex", r"\bnude\s+(?:photo|shoot|model|portrait|body|scene)",
+        r"누드\s*(?:화보|촬영|사진|모델)", r"나체", r"알몸", r"노출\s*(?:이\s*)?(?:심한|과한)", r"선정적",
+    ),
+    "safety.violence": (
+        r"\bgore\b", r"\bgory\b", r"\bblood[\s-]*(?:soaked|splatter|bath)", r"\bdismember",
+        r"\bdecapitat", r"\bmurder(?:ed)?\s+(?:scene|victim|body)", r"\bcorpse", r"고어", r"피투성이", r"유혈",
+        r"살해\s*(?:현장|장면)", r"시체", r"참수",
+    ),
+    "safety.hate": (
+        r"\bnazi", r"\bwhite\s+(?:power|supremac)", r"\bkkk\b", r"인종\s*차별", r"혐오\s*(?:표현|발언)",
+    ),
+    "safety.illegal": (
+        r"\bcocaine\b", r"\bheroin\b", r"\bmeth(?:amphetamine)?\b", r"\bdrug\s+deal",
+        r"마약", r"필로폰", r"코카인",
+    ),
+    # §0.2 AGE CLARITY - 미성년 표현 자체는 허용 (가족/일상 컨셉), 선정성과 함께면 차단
+    "safety.minor": (
+        r"\bminor\b", r"\bunderage\b", r"\bteen(?:ager)?s?\b", r"\bschool\s*girl", r"\bchild(?:ren)?\b",
+        r"고등학생", r"중학생", r"초등학생", r"미성년", r"청소년", r"어린이", r"아동",
+    ),
+}
+
+# 미성년 + 선정성 조합 판정에 쓰는 선정성 표현 (일반 패션 용어 포함)
+MINOR_SEXUAL_TERMS = re.compile(r"sexy|seductive|lingerie|bikini|섹시|유혹|란제리|비키니|속옷")
+MINOR_TERMS = re.compile("|".join(RULE_PATTERNS["safety.minor"]))
+
+# 미성년 표현과 이 거리(문자) 안의 선정성 표현만 조합으로 판정 (떨어진 문장끼리는 모델의 §0.2 판단에 맡김)
+MINOR_SEXUAL_WINDOW = 30
+
+# 선정성 표현을 부정하는 앞/뒤 표현 ("no bikini", "비키니 말고") - 조합 판정에서 제외
+NEGATION_BEFORE = re.compile(r"(?:^|\W)(?:no|not|without|non)[\s-]+(?:\w+\s+){0,2}$")
+NEGATION_AFTER = re.compile(r"\s*(?:은|는|이|가|을|를|도)?\s*(?:말고|빼고|없이|제외|금지|아닌|아니|대신)")
+
+# 우선순위 - 앞쪽 규칙이 응답을 결정
+RULE_ORDER = (
+    "safety.minor_sexual", "leak.override", "leak.prompt", "safety.sexual", "safety.violence",
+    "safety.hate", "safety.illegal", "celebrity.likeness",
+)
+
+GateDecision = namedtuple("GateDecision", ["action", "text", "rules", "message", "elapsed_us"])
+
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+def _literal_anchors(pattern):
+    """패턴이 일치하려면 반드시 들어 있어야 하는 앞쪽 리터럴 (모르면 None)
+
+    '\\b' 접두는 건너뛰고, 리터럴로 시작하면 그 접두를, '(?:a|b)'로 시작하면 각 대안을 쓴다.
+    """
+    if pattern.startswith("\\b"):
+        pattern = pattern[2:]
+    if pattern.startswith("(?:"):
+        depth, end = 0, None
+        for index, char in enumerate(pattern):
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0:
+                    end = index
+                    break
+        options = pattern[3:end].split("|") if end else []
+        if options and all(option and not _REGEX_META & set(option) for option in options):
+            return tuple(options)
+        return None
+    prefix = ""
+    for index, char in enumerate(pattern):
+        if char in _REGEX_META:
+            if char in "?*{" and prefix:
+                prefix = prefix[:-1]
+            break
+        prefix += char
+    return (prefix,) if prefix else None
+
+
+class MultiPatternMatcher:
+    """규칙별 정규식을 미리 컴파일하고, 리터럴 앵커가 입력에 있는 패턴만 실행
+
+    모든 패턴을 한 정규식으로 합치면 위치마다 대안을 전부 시도해 수백 자 입력에서 ms 단위가 걸린다.
+    앵커 검사(str 포함 여부)로 대부분의 패턴을 건너뛰어 수십 µs 안에 끝난다.
+    """
+
+    def __init__(self, rule_patterns):
+        self._entries = [
+            (rule, _literal_anchors(pattern), re.compile(pattern))
+            for rule, patterns in rule_patterns.items()
+            for pattern in patterns
+        ]
+
+    def scan(self, text, matches=None):
+        """{규칙: 첫 일치 구간} (text는 소문자로 넘김)"""
+        matches = {} if matches is None else matches
+        for rule, anchors, regex in self._entries:
+            if rule in matches:
+                continue
+            if anchors is not None and not any(anchor in text for anchor in anchors):
+                continue
+            match = regex.search(text)
+            if match:
+                matches[rule] = match.group(0)
+        return matches
+
+
+_MATCHER = MultiPatternMatcher(RULE_PATTERNS)
+
+# ROT13 / Leetspeak 표기는 탈옥(leak) 규칙만 검사 (안전 키워드 오탐 방지)
+_LEAK_MATCHER = MultiPatternMatcher(
+    {rule: patterns for rule, patterns in RULE_PATTERNS.items() if rule.startswith("leak.")}
+)
+
+
+def _looks_encoded(segment) -> bool:
+    """Base64 후보가 실제로 디코딩되는지 (설정 ID 같은 영숫자 토큰 오탐 방지)"""
+    try:
+        decoded = base64.b64decode(segment + "=" * (-len(segment) % 4), validate=True).decode("utf-8")
+    except ValueError:
+        return False
+    return bool(decoded) and sum(char.isprintable() or char.isspace() for char in decoded) / len(decoded) > 0.9
+
+
+def _decode_percent_run(match):
+    try:
+        return unquote(match.group(0), errors="strict")
+    except UnicodeDecodeError:
+        return match.group(0)
+
+
+def normalize_input(text):
+    """§0.1 인코딩 처리 - (정리된 텍스트, 적용된 정리 규칙 목록)"""
+    fired = []
+    if URL_ENCODED_PATTERN.search(text):
+        decoded = URL_ENCODED_PATTERN.sub(_decode_percent_run, text)
+        if decoded != text:
+            text = decoded
+            fired.append("encoding.url")
+    if ZERO_WIDTH_PATTERN.search(text):
+        text = ZERO_WIDTH_PATTERN.sub("", text)
+        fired.append("encoding.zero_width")
+    if CYRILLIC_PATTERN.search(text):
+        translated = text.translate(CYRILLIC_LOOKALIKES)
+        if translated != text:
+            text = translated
+            fired.append("encoding.cyrillic")
+    text = unicodedata.normalize("NFKC", text)
+
+    for rule, pattern in ENCODED_SEGMENT_PATTERNS:
+        if rule == "encoding.unicode_escape" and "\\" not in text:
+            continue
+        if rule == "encoding.base64":
+            stripped = pattern.sub(lambda match: "" if _looks_encoded(match.group(0)) else match.group(0), text)
+        else:
+            stripped = pattern.sub("", text)
+        if stripped != text:
+            text = stripped
+            fired.append(rule)
+    return re.sub(r"[ \t]{2,}", " ", text).strip(), fired
+
+
+def _match_rules(text):
+    """평문 전체 규칙 + leetspeak 역변환/ROT13 표기의 탈옥 규칙 - {규칙: 일치 구간}
+
+    leetspeak/ROT13은 ASCII에만 해당하므로 ASCII 부분만 변환해 검사한다.
+    """
+    lowered = text.lower()
+    matches = _MATCHER.scan(lowered)
+    ascii_part = lowered.encode("ascii", "ignore").decode("ascii")
+    if any(char.isalpha() for char in ascii_part):
+        for view in (ascii_part.translate(LEETSPEAK), codecs.encode(ascii_part, "rot13")):
+            _LEAK_MATCHER.scan(view, matches)
+    if "safety.minor" in matches:
+        span = _minor_sexual_span(lowered)
+        if span:
+            matches["safety.minor_sexual"] = span
+    return matches
+
+
+def _minor_sexual_span(text):
+    """미성년 표현 가까이에 부정되지 않은 선정성 표현이 있으면 두 표현을 포함한 구간, 없으면 None"""
+    minors = [match.span() for match in MINOR_TERMS.finditer(text)]
+    for match in MINOR_SEXUAL_TERMS.finditer(text):
+        start, end = match.span()
+        if NEGATION_BEFORE.search(text[:start]) or NEGATION_AFTER.match(text, end):
+            continue
+        for minor_start, minor_end in minors:
+            if minor_start - MINOR_SEXUAL_WINDOW <= end and start <= minor_end + MINOR_SEXUAL_WINDOW:
+                return text[min(start, minor_start):max(end, minor_end)]
+    return None
+
+
+def gate_input(text, log=True) -> GateDecision:
+    """사용자 지시사항 판정 - block이면 message를 그대로 보여주고 API 호출 생략"""
+    started = time.perf_counter()
+    cleaned, sanitized = normalize_input(text or "")
+    matches = _match_rules(cleaned)
+
+    blocking = [rule for rule in RULE_ORDER if rule in matches and RULES[rule][0] == ACTION_BLOCK]
+    if blocking:
+        action, message = ACTION_BLOCK, RULES[blocking[0]][1]
+    elif sanitized and not cleaned:
+        # 인코딩 구간만 있던 입력 - 남은 컨셉이 없으므로 다시 입력 요청
+        action, message = ACTION_BLOCK, MESSAGE_SUSPICIOUS
+    elif sanitized:
+        action, message = ACTION_SANITIZE, ""
+    else:
+        action, message = ACTION_ALLOW, ""
+
+    rules = tuple(blocking or sanitized) or tuple(rule for rule in matches)
+    decision = GateDecision(
+        action=action,
+        text=cleaned,
+        rules=rules,
+        message=message,
+        elapsed_us=round((time.perf_counter() - started) * 1e6),
+    )
+    if log:
+        log_decision(decision, text, {rule: matches[rule] for rule in blocking})
+    return decision
+
+
+_log_lock = threading.Lock()
+
+
+def gate_log_path():
+    path = os.getenv(GATE_LOG_ENV, "").strip()
+    if path == "0":
+        return None
+    return path or DEFAULT_GATE_LOG_PATH
+
+
+def log_decision(decision, original, excerpts=None) -> None:
+    """판정 한 건을 JSONL에 추가 - 원문 대신 해시와 일치 구간 일부만 기록"""
+    path = gate_log_path()
+    if path is None:
+        return
+    record = {
+        "ts": round(time.time(), 3),
+        "action": decision.action,
+        "rules": list(decision.rules),
+        "elapsed_us": decision.elapsed_us,
+        "input_sha": hashlib.sha256((original or "").encode("utf-8")).hexdigest()[:16],
+        "excerpts": {rule: span[:EXCERPT_CHARS] for rule, span in (excerpts or {}).items()},
+    }
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        # 기록 실패가 생성 흐름을 막지 않도록 무시
+        pass
@@ -0,0 +1,343 @@
+"""
+LG Art Director System v5.9.0 - Generation Job Queue
+생성 요청을 Streamlit 스크립트 밖의 워커 스레드에서 실행하고 작업 id로 진행 상황/결과를 조회
+(rerun, 새로고침, 웹소켓 재연결 중에도 생성이 계속되며 결과는 세션 id + project_id로 SQLite에 보관)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from streaming import StreamAccumulator
+
+# 작업 DB 위치 (환경변수로 변경 가능)
+JOBS_PATH_ENV = "LGAD_JOBS_PATH"
+DEFAULT_JOBS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite3")
+
+# 동시에 실행하는 생성 작업 수 (실제 API 동시 요청은 client_pool 제한기가 따로 제한)
+JOB_WORKERS_ENV = "LGAD_JOB_WORKERS"
+DEFAULT_JOB_WORKERS = 16
+
+# 메모리에 남겨 두는 끝난 작업 수 (이후는 DB에서 조회)
+MAX_FINISHED_JOBS = 500
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+STATUS_CANCELLED = "cancelled"
+STATUS_INTERRUPTED = "interrupted"
+FINISHED_STATUSES = (STATUS_DONE, STATUS_ERROR, STATUS_CANCELLED, STATUS_INTERRUPTED)
+
+# 작업 종류 - 대화 턴(복원 시 메시지가 됨), 기존 응답의 SET 하나 재생성(원래 턴의 응답을 제자리 갱신)
+KIND_TURN = "turn"
+KIND_REGENERATE = "regenerate"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL,
+    user_content TEXT NOT NULL,
+    model_content TEXT NOT NULL,
+    response TEXT NOT NULL DEFAULT '',
+    metrics TEXT NOT NULL DEFAULT '{}',
+    error TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL DEFAULT 'turn'
+);
+CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, created_at);
+CREATE INDEX IF NOT EXISTS jobs_project ON jobs (project_id, created_at);
+"""
+
+_COLUMNS = (
+    "id",
+    "session_id",
+    "project_id",
+    "created_at",
+    "finished_at",
+    "status",
+    "user_content",
+    "model_content",
+    "response",
+    "metrics",
+    "error",
+    "kind",
+)
+
+# 이전 버전 DB에 없던 컬럼 → ALTER TABLE 정의
+_MIGRATIONS = {
+    "kind": f"kind TEXT NOT NULL DEFAULT '{KIND_TURN}'",
+}
+
+
+class JobCancelled(Exception):
+    """실행 중인 작업이 취소 요청을 확인하고 멈춤"""
+
+
+class Job:
+    """생성 작업 하나 - 워커가 청크/단계를 기록하고 UI가 스냅샷을 폴링
+
+    user_content는 화면에 보이는 지시사항, model_content는 모델에 보낸 조립된 요청.
+    """
+
+    def __init__(self, session_id, project_id, user_content, model_content, job_id=None, created_at=None,
+                 kind=KIND_TURN):
+        self.id = job_id or uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.session_id = session_id
+        self.project_id = project_id
+        self.user_content = user_content
+        self.model_content = model_content
+        self.created_at = created_at if created_at is not None else time.time()
+        self.finished_at = None
+        self.status = STATUS_QUEUED
+        self.stage = ""
+        self.response = ""
+        self.metrics = {}
+        self.error = ""
+        self.accumulator = StreamAccumulator()
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self.future = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        """워커가 청크 사이마다 호출 - 취소 요청이 있으면 JobCancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def set_stage(self, stage) -> None:
+        self.stage = stage
+
+    def feed(self, chunk_text) -> None:
+        with self._lock:
+            self.accumulator.feed(chunk_text)
+
+    def progress(self):
+        """UI용 진행 스냅샷 (json_started, json_text, prose_text)"""
+        with self._lock:
+            accumulator = self.accumulator
+            return SimpleNamespace(
+                json_started=accumulator.json_started,
+                json_text=accumulator.json_text,
+                prose_text=accumulator.prose_text,
+            )
+
+    def row(self) -> tuple:
+        return (
+            self.id,
+            self.session_id,
+            self.project_id,
+            self.created_at,
+            self.finished_at,
+            self.status,
+            self.user_content,
+            self.model_content,
+            self.response,
+            json.dumps(self.metrics, ensure_ascii=False),
+            self.error,
+            self.kind,
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        values = dict(zip(_COLUMNS, row))
+        job = cls(
+            values["session_id"],
+            values["project_id"],
+            values["user_content"],
+            values["model_content"],
+            job_id=values["id"],
+            created_at=values["created_at"],
+            kind=values["kind"],
+        )
+        job.finished_at = values["finished_at"]
+        job.status = values["status"]
+        job.response = values["response"]
+        job.metrics = json.loads(values["metrics"] or "{}")
+        job.error = values["error"]
+        return job
+
+
+class JobStore:
+    """작업 SQLite 보관소 - 시작할 때 이전 프로세스에서 끝나지 않은 작업은 interrupted로 표시"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv(JOBS_PATH_ENV, "").strip() or DEFAULT_JOBS_PATH
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in _MIGRATIONS.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {definition}")
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE status IN (?, ?)",
+                (STATUS_INTERRUPTED, time.time(), STATUS_QUEUED, STATUS_RUNNING),
+            )
+
+    def save(self, job) -> None:
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) VALUES ({placeholders})", job.row())
+
+    def update_response(self, job_id, response) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET response = ? WHERE id = ?", (response, job_id))
+
+    def _select(self, where, params) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE {where} ORDER BY created_at",
+                params,
+            ).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def get(self, job_id):
+        jobs = self._select("id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def for_session(self, session_id) -> list:
+        return self._select("session_id = ?", (session_id,))
+
+    def for_project(self, project_id) -> list:
+        return self._select("project_id = ?", (project_id,))
+
+
+class JobQueue:
+    """생성 작업 큐 - 워커 스레드 풀에서 work(job) 실행, 진행 중인 작업은 메모리에서 바로 조회
+
+    work(job)는 job.feed()/set_stage()로 진행을 알리고 (응답 텍스트, 지표 dict)를 반환한다.
+    """
+
+    def __init__(self, store=None, workers=None):
+        if workers is None:
+            try:
+                workers = int(os.getenv(JOB_WORKERS_ENV, "").strip() or DEFAULT_JOB_WORKERS)
+            except ValueError:
+                workers = DEFAULT_JOB_WORKERS
+        self.store = store or JobStore()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="lgad-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, session_id, project_id, user_content, model_content, work, kind=KIND_TURN) -> Job:
+        job = Job(session_id, project_id, user_content, model_content, kind=kind)
+        self.store.save(job)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, work)
+        return job
+
+    def record(self, session_id, project_id, user_content, response, model_content="", metrics=None) -> Job:
+        """API 호출 없이 끝난 턴(입력 차단, 저장된 패키지 불러오기 등)도 대화 복원용으로 보관
+
+        model_content가 있으면 일반 턴처럼 모델 히스토리에도 복원됨
+        """
+        job = Job(session_id, project_id, user_content, model_content)
+        job.status = STATUS_DONE
+        job.response = response
+        job.metrics = dict(metrics or {})
+        job.finished_at = job.created_at
+        self.store.save(job)
+        return job
+
+    def _run(self, job, work) -> None:
+        if job.cancel_requested:
+            self._finish(job, STATUS_CANCELLED)
+            return
+        job.status = STATUS_RUNNING
+        try:
+            job.response, job.metrics = work(job)
+        except JobCancelled:
+            self._finish(job, STATUS_CANCELLED)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            self._finish(job, STATUS_ERROR)
+        else:
+            self._finish(job, STATUS_DONE)
+
+    def _finish(self, job, status) -> None:
+        job.finished_at = time.time()
+        job.status = status
+        job.stage = ""
+        try:
+            self.store.save(job)
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            finished = [other for other in self._jobs.values() if other.finished]
+            for other in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                self._jobs.pop(other.id, None)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job or self.store.get(job_id)
+
+    def update_response(self, job_id, response) -> None:
+        """끝난 작업의 응답을 교체 (SET 재생성 결과를 원래 턴에 반영해 복원 때도 유지)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.response = response
+        self.store.update_response(job_id, response)
+
+    def cancel(self, job_id) -> bool:
+        """대기 중이면 바로 취소, 실행 중이면 다음 청크에서 멈추도록 요청 - 이미 끝났으면 False"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, STATUS_CANCELLED)
+        return True
+
+    def session_jobs(self, session_id, kind=KIND_TURN) -> list:
+        """세션의 작업 목록 (오래된 순, kind=None이면 모든 종류) - 이 프로세스에서 진행 중인 작업은 메모리의 최신 상태"""
+        with self._lock:
+            live = {job.id: job for job in self._jobs.values() if job.session_id == session_id}
+        return [
+            live.get(job.id, job)
+            for job in self.store.for_session(session_id)
+            if kind is None or job.kind == kind
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "queued": sum(1 for job in jobs if job.status == STATUS_QUEUED),
+            "running": sum(1 for job in jobs if job.status == STATUS_RUNNING),
+        }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """프로세스 공용 작업 큐 (모든 Streamlit 세션이 공유)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,203 @@
+"""
+LG Art Director System v5.9.0 - Model Catalog
+list_models() 결과를 걸러 만든 모델 선택 목록을 키 지문별로 프로세스 전체에서 공유하고 디스크에 보관
+(TTL이 지나면 기존 목록을 그대로 쓰면서 백그라운드에서 갱신, 갱신 실패 시 기존 목록 유지)
+
+사용 예:
+    python model_catalog.py            # 현재 키의 카탈로그 (캐시 사용)
+    python model_catalog.py --refresh  # API에서 다시 받아 저장
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from backend import fake_backend_enabled, fingerprint_key, get_backend, selected_backend
+
+# API 키가 없거나 목록을 받지 못했을 때 쓰는 기본 목록
+MODEL_OPTIONS = [
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-001",
+    "gemini-2.0-flash-lite",
+    "gemini-2.5-flash",
+    "gemini-2.5-pro",
+    "gemini-flash-latest",
+    "gemini-pro-latest",
+]
+
+# 텍스트 생성용이 아닌 모델 이름에 들어가는 토큰
+MODEL_EXCLUDE_TOKENS = (
+    "image",
+    "audio",
+    "tts",
+    "native",
+    "preview",
+    "exp",
+    "embedding",
+    "gemma",
+    "nano",
+    "aqa",
+    "imagen",
+    "veo",
+    "robotics",
+)
+
+# 카탈로그 파일 위치 (환경변수로 변경 가능)
+CATALOG_PATH_ENV = "LGAD_MODEL_CATALOG_PATH"
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "model_catalog.json")
+
+# 목록 유지 시간 - 지나면 기존 목록을 쓰면서 백그라운드 갱신
+CATALOG_TTL = 6 * 3600
+
+# 갱신 실패 후 다시 시도하기까지 대기(초)
+FAILURE_RETRY = 300
+
+
+def filter_models(names) -> list:
+    """list_models() 이름 → 선택 목록 (gemini- 텍스트 모델만, 정렬, 비면 기본 목록)"""
+    options = sorted(
+        {
+            name
+            for name in names
+            if name.startswith("gemini-") and not any(token in name for token in MODEL_EXCLUDE_TOKENS)
+        }
+    )
+    return options or list(MODEL_OPTIONS)
+
+
+class ModelCatalog:
+    """(백엔드, 키 지문) → 걸러진 모델 목록 - TTL + 백그라운드 갱신 + stale-while-revalidate + 디스크 보관"""
+
+    def __init__(self, path=None, ttl=CATALOG_TTL, failure_retry=FAILURE_RETRY, clock=time.time,
+                 fetch=None, background=True):
+        self.path = path or os.getenv(CATALOG_PATH_ENV, "").strip() or DEFAULT_CATALOG_PATH
+        self.ttl = ttl
+        self.failure_retry = failure_retry
+        self.background = background
+        self._clock = clock
+        self._fetch = fetch or (lambda api_key: get_backend(api_key).list_models())
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {key: entry for key, entry in data.items() if isinstance(entry, dict) and entry.get("options")}
+
+    def _save(self) -> None:
+        """원자적 교체로 저장 (키 원문은 남기지 않고 지문만)"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def cache_key(api_key) -> str:
+        return f"{selected_backend()}:{fingerprint_key(api_key)}"
+
+    def refresh(self, api_key) -> list:
+        """API에서 목록을 받아 저장 - 실패하면 기존 목록(없으면 기본 목록)을 유지하고 재시도 시각을 기록한 뒤 예외"""
+        key = self.cache_key(api_key)
+        try:
+            options = filter_models(self._fetch(api_key))
+        except Exception as e:
+            with self._lock:
+                entry = self._entries.setdefault(key, {"options": list(MODEL_OPTIONS), "fetched_at": 0})
+                entry["error"] = f"{type(e).__name__}: {e}"
+                entry["retry_at"] = self._clock() + self.failure_retry
+            raise
+        with self._lock:
+            self._entries[key] = {"options": options, "fetched_at": self._clock()}
+            try:
+                self._save()
+            except OSError:
+                pass
+        return options
+
+    def _refresh_quietly(self, api_key, key) -> None:
+        try:
+            self.refresh(api_key)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, api_key, key) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        if self.background:
+            threading.Thread(target=self._refresh_quietly, args=(api_key, key), daemon=True).start()
+        else:
+            self._refresh_quietly(api_key, key)
+
+    def get(self, api_key) -> list:
+        """선택 목록 - 저장된 목록이 있으면 바로 반환 (만료됐으면 백그라운드 갱신), 없으면 받아옴"""
+        if not api_key and not fake_backend_enabled():
+            return list(MODEL_OPTIONS)
+
+        key = self.cache_key(api_key)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            try:
+                return self.refresh(api_key)
+            except Exception:
+                return list(MODEL_OPTIONS)
+
+        expired = now - entry.get("fetched_at", 0) > self.ttl
+        if expired and now >= entry.get("retry_at", 0):
+            self._schedule_refresh(api_key, key)
+        return list(entry["options"])
+
+    def status(self, api_key) -> dict:
+        """디버그용 - 받은 시각(경과 초), 마지막 갱신 오류"""
+        with self._lock:
+            entry = dict(self._entries.get(self.cache_key(api_key)) or {})
+        if not entry:
+            return {}
+        fetched_at = entry.get("fetched_at", 0)
+        return {
+            "age": round(self._clock() - fetched_at) if fetched_at else None,
+            "models": len(entry["options"]),
+            "error": entry.get("error", ""),
+        }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_model_catalog() -> ModelCatalog:
+    """프로세스 공용 카탈로그 (모든 Streamlit 세션과 check.py가 공유)"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ModelCatalog()
+        return _catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모델 선택 목록 (키별 캐시)")
+    parser.add_argument("--refresh", action="store_true", help="캐시를 무시하고 API에서 다시 받기")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("GOOGLE_API_KEY", "").strip()
+    catalog = get_model_catalog()
+    options = catalog.refresh(api_key) if args.refresh else catalog.get(api_key)
+    for name in options:
+        print(name)
+
+
+if __name__ == "__main__":
+    main()
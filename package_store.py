@@ -0,0 +1,431 @@
+"""
+LG Art Director System v5.9.0 - Package Store
+생성된 패키지(설정, 프롬프트 버전, HEADER_JSON, SET 문서)를 project_id별로 SQLite에 보관하고
+지역/도시/시즌/캐스트 모드/다양성 모드 인덱스 + SET 본문·프롬프트 FTS5 전문 검색으로 바로 찾아 재사용
+
+사용 예:
+    python package_store.py "camel coat" --region LATAM --season AUTUMN --cast-mode MULTI
+    python package_store.py --project LG_AD_2026_CAMPAIGN_01 --limit 20
+    python package_store.py --bench 20000        # 합성 패키지로 검색 지연 측정 (임시 DB)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+from climate import resolve_climate
+from render_cache import percentile
+from request_builder import format_target_date
+from set_document import parse_document
+
+# 저장소 위치 (환경변수로 변경 가능) / LGAD_PACKAGE_STORE=0이면 저장하지 않음
+PACKAGE_STORE_PATH_ENV = "LGAD_PACKAGE_STORE_PATH"
+PACKAGE_STORE_ENV = "LGAD_PACKAGE_STORE"
+DEFAULT_PACKAGE_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "packages.sqlite3")
+
+# 저장 출처
+SOURCE_APP = "app"
+SOURCE_BATCH = "batch"
+
+# 검색 결과 기본/최대 개수
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# 인덱스를 두는 필터 컬럼
+FACET_FIELDS = ("region", "city", "season", "cast_mode", "diversity_mode")
+
+# set_search rowid = 패키지 id * 이 값 + 세트 번호 (패키지 id/세트 번호로 바로 찾고 지움)
+SET_ROWID_STRIDE = 16
+
+# SET 검색용 메타 필드 (set_document.SET_FIELDS 이름)
+SEARCH_FIELDS = ("model", "age", "body", "skin", "styling", "props", "lighting", "gaze", "anchor", "story")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    package_key TEXT NOT NULL UNIQUE,
+    project_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    session_id TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT '',
+    prompt_version TEXT NOT NULL DEFAULT '',
+    region TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL DEFAULT '',
+    season TEXT NOT NULL DEFAULT '',
+    cast_mode TEXT NOT NULL DEFAULT '',
+    diversity_mode TEXT NOT NULL DEFAULT '',
+    direction TEXT NOT NULL DEFAULT '',
+    settings TEXT NOT NULL,
+    header TEXT NOT NULL,
+    request TEXT NOT NULL DEFAULT '',
+    response TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS packages_project ON packages (project_id);
+CREATE INDEX IF NOT EXISTS packages_region ON packages (region);
+CREATE INDEX IF NOT EXISTS packages_city ON packages (city);
+CREATE INDEX IF NOT EXISTS packages_season ON packages (season);
+CREATE INDEX IF NOT EXISTS packages_cast_mode ON packages (cast_mode);
+CREATE INDEX IF NOT EXISTS packages_diversity_mode ON packages (diversity_mode);
+CREATE VIRTUAL TABLE IF NOT EXISTS set_search USING fts5 (
+    title,
+    fields,
+    prompts,
+    direction,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_PACKAGE_COLUMNS = (
+    "id",
+    "package_key",
+    "project_id",
+    "created_at",
+    "source",
+    "session_id",
+    "model",
+    "prompt_version",
+    "region",
+    "city",
+    "season",
+    "cast_mode",
+    "diversity_mode",
+    "direction",
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def store_enabled() -> bool:
+    return os.getenv(PACKAGE_STORE_ENV, "1").strip().lower() not in ("0", "false", "off", "no")
+
+
+def package_key(settings, direction, model_name, prompt_version, output_mode="", translate=False) -> str:
+    """같은 설정 + 지시사항 + 모델 + 시스템 프롬프트 버전이면 같은 키 (배치 재사용 조회용)"""
+    payload = json.dumps(
+        {
+            "settings": {**settings, "target_date": format_target_date(settings.get("target_date", ""))},
+            "direction": " ".join((direction or "").split()),
+            "model": model_name,
+            "prompt_version": prompt_version,
+            "output_mode": output_mode,
+            "translate": bool(translate),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def job_package_key(job_id) -> str:
+    """앱 턴 패키지 키 (작업 id 기준 - SET 재생성 결과도 이 키로 갱신)"""
+    return f"job:{job_id}"
+
+
+def match_query(text) -> str:
+    """자유 입력 → FTS5 MATCH 식 (단어마다 따옴표, 모두 포함 - 특수 문법은 쓰지 않음)"""
+    return " ".join(f'"{token}"' for token in _TOKEN_RE.findall(text or ""))
+
+
+def _season(settings, header):
+    season = header.get("season") if isinstance(header, dict) else None
+    if season:
+        return str(season)
+    facts = resolve_climate(settings.get("region"), settings.get("city"), settings.get("target_date", ""))
+    return facts.season if facts is not None else ""
+
+
+def _search_rows(package_id, doc, direction):
+    """SetDocument → set_search 줄 (세트마다 rowid, 제목, 메타 필드, 프롬프트 본문, 지시사항)"""
+    rows = []
+    for entry in doc.sets:
+        fields = entry.fields()
+        rows.append(
+            (
+                package_id * SET_ROWID_STRIDE + entry.number,
+                f"{entry.batch} {entry.title}".strip(),
+                "\n".join(fields[name] for name in SEARCH_FIELDS if fields.get(name)),
+                "\n".join(block.text or "" for block in entry.prompts),
+                direction,
+            )
+        )
+    return rows
+
+
+class PackageStore:
+    """project_id별 패키지 SQLite 보관소 - 필터 컬럼 인덱스 + SET 단위 FTS5 색인 (모든 세션과 배치가 공유)"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv(PACKAGE_STORE_PATH_ENV, "").strip() or DEFAULT_PACKAGE_STORE_PATH
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ":memory:":
+            # 앱 세션과 배치가 같은 파일을 함께 쓰므로 WAL (쓰는 동안에도 검색 가능)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def _delete_sets(self, package_id):
+        first = package_id * SET_ROWID_STRIDE
+        self._conn.execute("DELETE FROM set_search WHERE rowid BETWEEN ? AND ?", (first, first + SET_ROWID_STRIDE - 1))
+
+    def save(self, key, settings, response, request="", direction="", model="", prompt_version="", source=SOURCE_APP,
+             session_id="", created_at=None):
+        """패키지 저장 (같은 key면 교체) - 패키지 id, SET 문서로 읽히지 않는 응답이면 None
+
+        request는 모델에 보낸 조립된 요청 (불러온 패키지로 대화를 이어가거나 SET을 다시 생성할 때 사용)
+        """
+        doc = parse_document(response)
+        if doc is None:
+            return None
+        settings = {**settings, "target_date": format_target_date(settings.get("target_date", ""))}
+        header = doc.header if isinstance(doc.header, dict) else {}
+        values = (
+            key,
+            settings.get("project_id", ""),
+            created_at if created_at is not None else time.time(),
+            source,
+            session_id or "",
+            model or "",
+            prompt_version or "",
+            settings.get("region", ""),
+            str(settings.get("city", "")).split(" (", 1)[0],
+            _season(settings, header),
+            settings.get("cast_mode", ""),
+            settings.get("diversity_mode", ""),
+            direction or "",
+            json.dumps(settings, ensure_ascii=False, default=str),
+            json.dumps(header, ensure_ascii=False),
+            request or "",
+            response,
+        )
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT id FROM packages WHERE package_key = ?", (key,)).fetchone()
+            if old is not None:
+                self._delete_sets(old[0])
+                self._conn.execute("DELETE FROM packages WHERE id = ?", (old[0],))
+            cursor = self._conn.execute(
+                f"INSERT INTO packages ({', '.join(_PACKAGE_COLUMNS[1:])}, settings, header, request, response) "
+                f"VALUES ({', '.join('?' for _ in values)})",
+                values,
+            )
+            package_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO set_search (rowid, title, fields, prompts, direction) VALUES (?, ?, ?, ?, ?)",
+                _search_rows(package_id, doc, direction or ""),
+            )
+        return package_id
+
+    def update_response(self, key, response) -> bool:
+        """저장된 패키지의 응답만 교체하고 SET 색인을 다시 만듦 (SET 재생성 등) - 없거나 문서가 아니면 False"""
+        doc = parse_document(response)
+        if doc is None:
+            return False
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id, direction FROM packages WHERE package_key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            header = doc.header if isinstance(doc.header, dict) else {}
+            self._conn.execute(
+                "UPDATE packages SET response = ?, header = ? WHERE id = ?",
+                (response, json.dumps(header, ensure_ascii=False), row[0]),
+            )
+            self._delete_sets(row[0])
+            self._conn.executemany(
+                "INSERT INTO set_search (rowid, title, fields, prompts, direction) VALUES (?, ?, ?, ?, ?)",
+                _search_rows(row[0], doc, row[1]),
+            )
+        return True
+
+    def _package(self, where, params):
+        columns = (*_PACKAGE_COLUMNS, "settings", "header", "request", "response")
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(columns)} FROM packages WHERE {where}", params).fetchone()
+        if row is None:
+            return None
+        package = dict(zip(columns, row))
+        package["settings"] = json.loads(package["settings"])
+        package["header"] = json.loads(package["header"])
+        return package
+
+    def get(self, package_id):
+        """패키지 dict (settings/header는 dict, request는 조립된 요청, response는 §9.2 원문) 또는 None"""
+        return self._package("id = ?", (package_id,))
+
+    def find(self, key):
+        return self._package("package_key = ?", (key,))
+
+    def search(self, text="", project_id=None, limit=DEFAULT_LIMIT, **facets) -> list:
+        """SET 단위 검색 - text는 세트 제목/필드/프롬프트/지시사항 전문 검색(모든 단어 포함), facets는 FACET_FIELDS 값 일치
+
+        결과는 [{"package_id", "set_no", "title", project_id, created_at, 필터 컬럼...}] 최신 패키지부터.
+        전문 검색은 FTS를 rowid 역순으로 훑으며 패키지 PK로 필터하고, 필터만 있으면 인덱스로 최신 패키지 limit개를 고른 뒤
+        rowid 범위로 세트를 붙이므로 어느 쪽이든 limit개를 채우면 바로 멈춤 (전체 정렬 없음)
+        """
+        clauses, params = [], []
+        query = match_query(text)
+        if project_id:
+            clauses.append("p.project_id = ?")
+            params.append(project_id)
+        for field in FACET_FIELDS:
+            value = facets.get(field)
+            if value:
+                clauses.append(f"p.{field} = ?")
+                params.append(value)
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        columns = ("package_id", "set_no", "title", "project_id", "created_at", *FACET_FIELDS)
+        select = (
+            f"SELECT p.id, s.rowid - p.id * {SET_ROWID_STRIDE}, s.title, p.project_id, p.created_at, "
+            f"{', '.join(f'p.{field}' for field in FACET_FIELDS)} "
+        )
+        if query:
+            where = " AND ".join(["set_search MATCH ?", *clauses])
+            sql = (
+                f"{select}FROM set_search s JOIN packages p ON p.id = s.rowid / {SET_ROWID_STRIDE} "
+                f"WHERE {where} ORDER BY s.rowid DESC LIMIT ?"
+            )
+            params = [query, *params, limit]
+        else:
+            where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+            sql = (
+                f"{select}FROM (SELECT * FROM packages p {where}ORDER BY p.id DESC LIMIT ?) p "
+                f"JOIN set_search s ON s.rowid BETWEEN p.id * {SET_ROWID_STRIDE} AND p.id * {SET_ROWID_STRIDE} + {SET_ROWID_STRIDE - 1} "
+                "ORDER BY p.id DESC, s.rowid LIMIT ?"
+            )
+            params = [*params, limit, limit]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def facet_values(self, field, project_id=None) -> list:
+        """필터 선택지 (저장된 값 목록)"""
+        if field not in FACET_FIELDS:
+            raise ValueError(f"알 수 없는 필터: {field}")
+        where, params = ("WHERE project_id = ?", (project_id,)) if project_id else ("", ())
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT {field} FROM packages {where} ORDER BY {field}", params).fetchall()
+        return [row[0] for row in rows if row[0]]
+
+    def stats(self, project_id=None) -> dict:
+        where, params = ("WHERE project_id = ?", (project_id,)) if project_id else ("", ())
+        with self._lock:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM packages {where}", params).fetchone()[0]
+        return {"packages": count}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_package_store() -> PackageStore:
+    """프로세스 공용 저장소"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PackageStore()
+        return _store
+
+
+def store_package(key, settings, response, **kwargs):
+    """패키지 저장 - 비활성화됐거나 저장에 실패해도 생성 흐름은 막지 않음 (패키지 id 또는 None)"""
+    if not store_enabled():
+        return None
+    try:
+        return get_package_store().save(key, settings, response, **kwargs)
+    except sqlite3.Error:
+        return None
+
+
+def update_package(key, response) -> None:
+    if not store_enabled():
+        return
+    try:
+        get_package_store().update_response(key, response)
+    except sqlite3.Error:
+        pass
+
+
+def format_hit(hit) -> str:
+    """검색 결과 한 줄"""
+    facets = " · ".join(str(hit[field]) for field in FACET_FIELDS if hit.get(field))
+    return f"#{hit['package_id']} SET {hit['set_no']:02d} {hit['title']} - {hit['project_id']} · {facets}"
+
+
+def run_bench(count, queries=20, log=print) -> dict:
+    """합성 패키지 count개를 임시 DB에 넣고 검색 지연(p50/p95 ms) 측정"""
+    from backend import synthesize_response
+    from request_builder import CITY_OPTIONS, build_combined_prompt, default_settings
+
+    styles = ("Camel cashmere coat", "Ivory linen shirt", "Charcoal wool suit", "Olive trench coat", "Denim jacket")
+    path = os.path.join(tempfile.mkdtemp(prefix="lgad-packages-"), "bench.sqlite3")
+    store = PackageStore(path)
+    rng = random.Random(0)
+    responses = {}
+    started = time.perf_counter()
+    for index in range(count):
+        settings = default_settings()
+        settings["region"] = rng.choice(sorted(CITY_OPTIONS))
+        settings["city"] = rng.choice(CITY_OPTIONS[settings["region"]])
+        settings["cast_mode"] = rng.choice(("SINGLE", "MULTI", "SINGLE_MODEL_LOOKBOOK"))
+        settings["target_date"] = f"2026-{rng.randint(1, 12):02d}-01"
+        combo = (settings["region"], settings["city"], settings["target_date"], settings["cast_mode"])
+        if combo not in responses:
+            responses[combo] = synthesize_response(build_combined_prompt(settings, "", "gemini-2.5-flash", False))
+        response = responses[combo].replace("Camel cashmere coat", rng.choice(styles))
+        store.save(f"bench:{index}", settings, response, source=SOURCE_BATCH)
+    insert_seconds = time.perf_counter() - started
+
+    cases = {
+        "text": {"text": "camel coat"},
+        "text+facets": {"text": "camel coat", "region": "LATAM", "season": "AUTUMN", "cast_mode": "MULTI"},
+        "facets": {"region": "EU", "season": "WINTER"},
+    }
+    results = {"packages": count, "insert_s": round(insert_seconds, 2)}
+    log(f"패키지 {count}개 저장: {insert_seconds:.1f}s ({store.stats()['packages']}개)")
+    for name, query in cases.items():
+        times = []
+        hits = 0
+        for _ in range(queries):
+            query_started = time.perf_counter()
+            hits = len(store.search(limit=DEFAULT_LIMIT, **query))
+            times.append((time.perf_counter() - query_started) * 1000)
+        results[name] = {"p50_ms": round(percentile(times, 50), 2), "p95_ms": round(percentile(times, 95), 2), "hits": hits}
+        log(f"{name}: p50 {results[name]['p50_ms']}ms · p95 {results[name]['p95_ms']}ms · {hits}건")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 패키지 검색")
+    parser.add_argument("text", nargs="?", default="", help="SET 제목/필드/프롬프트/지시사항 전문 검색어")
+    parser.add_argument("--project", default=None, help="이 project_id만")
+    for field in FACET_FIELDS:
+        parser.add_argument(f"--{field.replace('_', '-')}", default=None)
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--bench", type=int, default=0, help="합성 패키지 N개로 검색 지연 측정 (임시 DB)")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        run_bench(args.bench)
+        return
+    facets = {field: getattr(args, field) for field in FACET_FIELDS}
+    started = time.perf_counter()
+    hits = get_package_store().search(args.text, args.project, args.limit, **facets)
+    elapsed = (time.perf_counter() - started) * 1000
+    for hit in hits:
+        print(format_hit(hit))
+    print(f"{len(hits)}건 ({elapsed:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
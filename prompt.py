@@ -1,10 +1,21 @@
 """
 LG Art Director System v5.9.0 - Prompt Loader
 md 파일들을 읽어서 LG_SYSTEM_PROMPT로 조합
+파일 mtime을 확인해 바뀐 모듈만 다시 읽고, 조합 결과마다 내용 해시 기반 버전 ID를 부여
+모듈을 § 섹션 트리로 나눠 요청 설정에 필요한 섹션만 담은 시스템 프롬프트를 조합
 """
 
+import argparse
+import hashlib
 import os
 import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from cast_planner import CAST_MODE_LOOKBOOK
+from history import estimate_tokens
 
 # 프롬프트 파일 로드 순서 (INDEX.md 기준)
 PROMPT_FILES = [
@@ -22,43 +33,175 @@ HTML_COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
 # 예전 방식 잔재 제거 패턴
 LEGACY_PATTERN = re.compile(r'^LG_SYSTEM_PROMPT\s*=\s*"""', re.MULTILINE)
 
+# 모듈 구분자
+MODULE_SEPARATOR = "\n\n---\n\n"
+
+# 파일 변경 확인 간격(초) - 이 간격 안의 호출은 stat 없이 현재 버전 반환
+STAT_INTERVAL = 2.0
+
+# 고정(pin)된 세션을 위해 보관할 이전 버전 수
+MAX_VERSIONS = 5
+
+# 빠진 섹션 자리에 남기는 안내 (다른 섹션의 §참조가 끊기지 않도록)
+CLIMATE_SECTION_STUB = "→ [SYSTEM_OVERRIDE_DATA]의 로컬 계산값(Hemisphere/Season/Climate_*/Lighting_*)을 그대로 사용"
+CAST_SECTION_STUB = "→ [SYSTEM_OVERRIDE_DATA]의 Cast_01~Cast_10 계획(나이/체형/피부톤/헤어/특징)을 그대로 사용, 점수 계산 생략"
+
+# 요청 프롬프트에서 로컬 계산값으로 대체되어 시스템 프롬프트에서 빼는 섹션 (climate.py, cast_planner.py)
+LOCALLY_RESOLVED_SECTIONS = {
+    "10_cast_variation_engine.md": {
+        "§3.2": CLIMATE_SECTION_STUB,
+        "§3.3": CLIMATE_SECTION_STUB,
+        "§3.3A": CLIMATE_SECTION_STUB,
+        "§3.5": CLIMATE_SECTION_STUB,
+        "§5.4": CAST_SECTION_STUB,
+        "§5.5": CAST_SECTION_STUB,
+        "§5.6": CAST_SECTION_STUB,
+    },
+}
+
+# 로컬 계산이 불가능할 때 요청에 원문을 첨부하는 기후 섹션
+CLIMATE_SECTIONS = ("§3.2", "§3.3", "§3.3A", "§3.5")
+
+# "0"이면 로컬 계산 섹션도 시스템 프롬프트에 그대로 둠
+LOCAL_RESOLUTION_ENV = "LGAD_LOCAL_RESOLUTION"
+
+# 섹션 제목 / 섹션 경계 패턴
+SECTION_HEADING_PATTERN = re.compile(r"^## (§[0-9A-Z.]+)\s")
+HEADING_PATTERN = re.compile(r"^#{1,2} ")
+
+
+# 섹션 트리의 최상위 그룹 제목 / 그룹 제목을 감싸는 구분선
+GROUP_HEADING_PATTERN = re.compile(r"^# (SECTION \d+|VERSION HISTORY)\b")
+BANNER_PATTERN = re.compile(r"^# ═")
+
+# 섹션 우선순위 - CORE는 항상 유지, CONDITIONAL은 태그가 요청과 맞을 때만, REFERENCE는 슬라이싱 시 제외
+PRIORITY_CORE = "CORE"
+PRIORITY_CONDITIONAL = "CONDITIONAL"
+PRIORITY_REFERENCE = "REFERENCE"
+
+# 요청에 따라 빠질 수 있는 섹션 (태그 중 하나라도 요청 태그에 있으면 유지, 표에 없는 섹션은 CORE)
+SECTION_TAGS = {
+    "§1.1A": ("cast:MULTI",),
+    "§1.1B": ("mode:LOOKBOOK",),
+    "§4.1": ("region:EU",),
+    "§4.2": ("region:EU",),
+    "§4.3": ("region:LATAM",),
+    "§4.4": ("region:LATAM",),
+    "§6.1": ("region:EU",),
+    "§6.2": ("region:LATAM",),
+    "§8.4": ("cast:MULTI",),
+}
+
+# 모델 출력에 영향이 없는 참고용 섹션
+REFERENCE_SECTIONS = ("VERSION HISTORY",)
+
+# 태그와 관계없이 항상 유지하는 그룹 (§0 보안/안전 규칙)
+CORE_GROUPS = ("SECTION 0",)
+
+# 지역 태그 - 설정 지역을 알 수 없으면 모두 포함
+REGION_TAGS = ("region:EU", "region:LATAM")
+
+# 지시사항에 이 표현이 있으면 해당 태그 섹션을 포함 (§1.1A/§1.1B TRIGGER, 오탐은 섹션을 더 남길 뿐)
+# 설정의 cast_mode가 MULTI/룩북이면 지시사항과 관계없이 태그가 붙음
+TAG_TRIGGERS = {
+    "cast:MULTI": ("커플", "파트너", "가족", "둘이", "여러명", "여러 명", "팀", "그룹",
+                   "couple", "partner", "family", "group"),
+    "mode:LOOKBOOK": ("룩북", "한 명으로", "싱글 모델", "같은 모델", "lookbook"),
+}
+
+# "0"이면 요청별 슬라이싱 없이 전체 시스템 프롬프트 사용
+PROMPT_SLICING_ENV = "LGAD_PROMPT_SLICING"
+
+
+def local_resolution_enabled() -> bool:
+    return os.getenv(LOCAL_RESOLUTION_ENV, "1").strip() != "0"
+
+
+def split_sections(content: str, stubs) -> tuple:
+    """지정한 § 섹션을 떼어냄 - (남은 내용, 떼어낸 섹션 목록)
+
+    stubs는 {섹션 ID: 안내 문구}. 섹션은 다음 '#'/'##' 제목 직전까지이며,
+    코드 블록 안의 '#' 줄은 경계로 보지 않는다. 떼어낸 자리에는 제목 + 안내 문구만 남긴다.
+    """
+    kept, removed, current = [], [], None
+    in_fence = False
+    for line in content.split("\n"):
+        if line.startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and HEADING_PATTERN.match(line):
+            if current is not None:
+                removed.append("\n".join(current).strip())
+                current = None
+            match = SECTION_HEADING_PATTERN.match(line)
+            if match and match.group(1) in stubs:
+                current = [line]
+                kept.extend([line, stubs[match.group(1)], ""])
+                continue
+        if current is not None:
+            current.append(line)
+        else:
+            kept.append(line)
+    if current is not None:
+        removed.append("\n".join(current).strip())
+    return "\n".join(kept), removed
+
+
+def read_prompt_file(filename: str, prompts_dir: str = PROMPTS_DIR) -> str:
+    """프롬프트 파일 원문 (없으면 빈 문자열)"""
+    filepath = os.path.join(prompts_dir, filename)
 
-def load_prompt_file(filename: str) -> str:
-    """단일 프롬프트 파일 로드 및 정리"""
-    filepath = os.path.join(PROMPTS_DIR, filename)
-    
     if not os.path.exists(filepath):
         return ""
-    
+
     with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
-    
+        return f.read()
+
+
+def resolved_sections_text(section_ids=CLIMATE_SECTIONS, prompts_dir: str = PROMPTS_DIR) -> str:
+    """시스템 프롬프트에서 뺀 섹션 원문 (로컬 계산이 불가능한 요청에 대신 첨부)"""
+    sections = []
+    for filename, stubs in LOCALLY_RESOLVED_SECTIONS.items():
+        selected = {section_id: stub for section_id, stub in stubs.items() if section_id in section_ids}
+        if selected:
+            _, removed = split_sections(read_prompt_file(filename, prompts_dir), selected)
+            sections.extend(removed)
+    return "\n\n".join(sections)
+
+
+def load_prompt_file(filename: str, prompts_dir: str = PROMPTS_DIR) -> str:
+    """단일 프롬프트 파일 로드 및 정리"""
+    content = read_prompt_file(filename, prompts_dir)
+    if not content:
+        return ""
+
+    # 로컬에서 미리 계산하는 섹션 제거
+    stubs = LOCALLY_RESOLVED_SECTIONS.get(filename)
+    if stubs and local_resolution_enabled():
+        content, _ = split_sections(content, stubs)
+
     # HTML 코멘트 제거
     content = HTML_COMMENT_PATTERN.sub("", content)
-    
+
     # 예전 방식 잔재 제거 (LG_SYSTEM_PROMPT = """)
     content = LEGACY_PATTERN.sub("", content)
-    
+
     # 앞뒤 공백 정리
     content = content.strip()
-    
+
     return content
 
 
-def load_system_prompt() -> str:
-    """모든 프롬프트 파일을 순서대로 로드하여 조합"""
-    parts = []
-    
-    for filename in PROMPT_FILES:
-        content = load_prompt_file(filename)
-        if content:
-            parts.append(content)
-    
+def join_prompt_parts(parts) -> str:
+    """정리된 모듈들을 구분자로 연결"""
+    parts = [part for part in parts if part]
     if not parts:
         return "LG Art Director System v5.9.0 - Prompt files not found"
-    
-    # 구분자로 연결
-    return "\n\n---\n\n".join(parts)
+    return MODULE_SEPARATOR.join(parts)
+
+
+def load_system_prompt() -> str:
+    """모든 프롬프트 파일을 순서대로 로드하여 조합"""
+    return join_prompt_parts(load_prompt_file(filename) for filename in PROMPT_FILES)
 
 
 def get_version() -> str:
@@ -66,15 +209,303 @@ def get_version() -> str:
     return "5.9.0"
 
 
-# 메인 export - app.py에서 import할 변수
-LG_SYSTEM_PROMPT = load_system_prompt()
 SYSTEM_VERSION = get_version()
 
 
-if __name__ == "__main__":
-    # 테스트용
+def content_hash(text: str) -> str:
+    """조합된 시스템 프롬프트의 내용 해시"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PromptVersion:
+    """조합된 시스템 프롬프트 한 버전 (내용이 같으면 같은 version_id)"""
+
+    __slots__ = ("text", "hash", "version_id", "loaded_at", "modules")
+
+    def __init__(self, text, modules=()):
+        self.text = text
+        self.modules = tuple(modules)
+        self.hash = content_hash(text)
+        self.version_id = f"{SYSTEM_VERSION}-{self.hash}"
+        self.loaded_at = time.time()
+
+
+class PromptRegistry:
+    """프롬프트 모듈 레지스트리 - 처음 요청할 때 로드하고, 바뀐 파일만 다시 읽음
+
+    새 세션은 current()로 최신 버전을, 진행 중인 세션은 get(version_id)로 시작 시 버전을 사용한다.
+    """
+
+    def __init__(self, prompts_dir=PROMPTS_DIR, files=PROMPT_FILES, stat_interval=STAT_INTERVAL,
+                 max_versions=MAX_VERSIONS, clock=time.monotonic):
+        self.prompts_dir = prompts_dir
+        self.files = list(files)
+        self.stat_interval = stat_interval
+        self.max_versions = max_versions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._modules = {}
+        self._versions = OrderedDict()
+        self._current = None
+        self._checked_at = None
+
+    def _stat_key(self, filename):
+        try:
+            stat = os.stat(os.path.join(self.prompts_dir, filename))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        changed = False
+        parts = []
+        modules = []
+        for filename in self.files:
+            stat_key = self._stat_key(filename)
+            cached = self._modules.get(filename)
+            if cached is None or cached[0] != stat_key:
+                content = load_prompt_file(filename, self.prompts_dir) if stat_key else ""
+                self._modules[filename] = (stat_key, content)
+                changed = True
+            parts.append(self._modules[filename][1])
+            modules.append((filename, self._modules[filename][1]))
+
+        if not changed and self._current is not None:
+            return
+
+        version = PromptVersion(join_prompt_parts(parts), modules)
+        if self._current is not None and version.hash == self._current.hash:
+            return
+
+        self._versions.pop(version.version_id, None)
+        self._versions[version.version_id] = version
+        while len(self._versions) > self.max_versions:
+            self._versions.popitem(last=False)
+        self._current = version
+
+    def current(self) -> PromptVersion:
+        """최신 버전 (stat_interval마다 파일 변경 확인)"""
+        with self._lock:
+            now = self._clock()
+            if self._checked_at is None or now - self._checked_at >= self.stat_interval:
+                self._refresh()
+                self._checked_at = now
+            return self._current
+
+    def get(self, version_id):
+        """보관 중인 버전 - 너무 오래되어 제거됐으면 None"""
+        with self._lock:
+            return self._versions.get(version_id)
+
+
+_registry = PromptRegistry()
+
+
+def current_prompt() -> PromptVersion:
+    """새 세션이 사용할 최신 시스템 프롬프트 버전"""
+    return _registry.current()
+
+
+def get_prompt_version(version_id):
+    """세션이 고정한 버전 조회 (없으면 None)"""
+    return _registry.get(version_id)
+
+
+class PromptSection:
+    """§ 섹션 트리의 노드 - 제목 줄부터 다음 제목 직전까지 (그룹은 앞뒤 구분선 포함)
+
+    id가 None인 노드는 머리말 등 이름 없는 구간으로 항상 유지한다.
+    """
+
+    __slots__ = ("id", "title", "module", "parent", "tags", "priority", "lines", "children")
+
+    def __init__(self, section_id, title, module, parent=None, lines=()):
+        self.id = section_id
+        self.title = title
+        self.module = module
+        self.parent = parent
+        self.lines = list(lines)
+        self.children = []
+        group = parent.id if parent is not None else section_id
+        if section_id in REFERENCE_SECTIONS:
+            self.tags, self.priority = (), PRIORITY_REFERENCE
+        elif section_id in SECTION_TAGS and group not in CORE_GROUPS:
+            self.tags, self.priority = SECTION_TAGS[section_id], PRIORITY_CONDITIONAL
+        else:
+            self.tags, self.priority = (), PRIORITY_CORE
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def keep(self, tags) -> bool:
+        if self.priority == PRIORITY_CORE:
+            return True
+        return any(tag in tags for tag in self.tags)
+
+
+def parse_sections(content: str, module: str = "") -> list:
+    """정리된 모듈 본문 → PromptSection 목록 (문서 순서, 모두 이어 붙이면 원문과 같음)
+
+    '#' 그룹 제목과 '## §' 섹션 제목이 경계이며 코드 블록 안의 '#' 줄은 경계로 보지 않는다.
+    """
+    current = PromptSection(None, "", module)
+    sections = [current]
+    group = None
+    in_fence = False
+    for line in content.split("\n"):
+        if line.startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and HEADING_PATTERN.match(line) and not BANNER_PATTERN.match(line):
+            group_match = GROUP_HEADING_PATTERN.match(line)
+            section_match = SECTION_HEADING_PATTERN.match(line)
+            carried = []
+            if group_match:
+                # 그룹 제목 위의 구분선은 그룹에 붙임
+                while current.lines and BANNER_PATTERN.match(current.lines[-1]):
+                    carried.insert(0, current.lines.pop())
+                current = group = PromptSection(group_match.group(1), line.lstrip("# ").strip(), module)
+            elif section_match:
+                current = PromptSection(section_match.group(1), line[3:].strip(), module, group)
+                if group is not None:
+                    group.children.append(current)
+            else:
+                current = PromptSection(None, line.lstrip("# ").strip(), module, group)
+            current.lines = carried + [line]
+            sections.append(current)
+            continue
+        current.lines.append(line)
+    return [section for section in sections if section.lines]
+
+
+class PromptTree:
+    """조합된 시스템 프롬프트의 섹션 트리 + ID 색인"""
+
+    __slots__ = ("modules", "index")
+
+    def __init__(self, modules):
+        self.modules = [(filename, parse_sections(content, filename)) for filename, content in modules]
+        self.index = {
+            section.id: section
+            for _, sections in self.modules
+            for section in sections
+            if section.id is not None
+        }
+
+    def render(self, tags) -> tuple:
+        """태그에 맞는 섹션만 이어 붙인 시스템 프롬프트 - (본문, 뺀 섹션 ID 목록)"""
+        parts, dropped = [], []
+        for _, sections in self.modules:
+            kept = []
+            for section in sections:
+                if section.keep(tags):
+                    kept.append(section.text)
+                else:
+                    dropped.append(section.id)
+            parts.append("\n".join(kept).strip())
+        return join_prompt_parts(parts), dropped
+
+
+# 슬라이싱 결과 - 조합된 버전 ID, 추정 토큰(슬라이스/전체/절감), 뺀 섹션
+SliceReport = namedtuple("SliceReport", "version_id tokens full_tokens saved_tokens dropped")
+
+
+def prompt_slicing_enabled() -> bool:
+    return os.getenv(PROMPT_SLICING_ENV, "1").strip() != "0"
+
+
+def request_tags(settings, texts=()) -> frozenset:
+    """요청 설정 + 지시사항 → 섹션 선택 태그"""
+    tags = set()
+    region_tag = f"region:{settings.get('region', '')}"
+    tags.update([region_tag] if region_tag in REGION_TAGS else REGION_TAGS)
+    tags.add(f"cast:{settings.get('cast_mode', '')}")
+    if settings.get("cast_mode") == CAST_MODE_LOOKBOOK:
+        tags.add("mode:LOOKBOOK")
+    lowered = " ".join(text for text in texts if text).lower()
+    for tag, triggers in TAG_TRIGGERS.items():
+        if any(trigger in lowered for trigger in triggers):
+            tags.add(tag)
+    return frozenset(tags)
+
+
+@lru_cache(maxsize=MAX_VERSIONS * 2)
+def prompt_tree(version) -> PromptTree:
+    """버전별 섹션 트리 (버전 객체는 불변이라 한 번만 파싱)"""
+    return PromptTree(version.modules)
+
+
+@lru_cache(maxsize=64)
+def _sliced_version(version, tags):
+    text, dropped = prompt_tree(version).render(tags)
+    if not dropped:
+        sliced = version
+    else:
+        sliced = PromptVersion(text)
+    full_tokens = estimate_tokens(version.text)
+    tokens = estimate_tokens(sliced.text)
+    return sliced, SliceReport(sliced.version_id, tokens, full_tokens, full_tokens - tokens, tuple(dropped))
+
+
+def slice_prompt(version, settings, texts=(), enabled=None) -> tuple:
+    """요청에 필요한 섹션만 담은 시스템 프롬프트 - (PromptVersion, SliceReport)
+
+    슬라이싱이 꺼져 있거나 섹션 정보가 없는 버전은 그대로 반환한다.
+    같은 (버전, 태그) 조합은 같은 객체를 돌려주므로 모델 캐시도 조합별로 재사용된다.
+    """
+    if enabled is None:
+        enabled = prompt_slicing_enabled()
+    if not enabled or not getattr(version, "modules", None):
+        tokens = estimate_tokens(version.text)
+        return version, SliceReport(version.version_id, tokens, tokens, 0, ())
+    return _sliced_version(version, request_tags(settings, texts))
+
+
+def slicing_report(version=None) -> list:
+    """지역 × 캐스트 모드 × 룩북 조합별 SliceReport 목록 - [(조합 이름, SliceReport)]"""
+    version = version or current_prompt()
+    rows = []
+    for region in ("EU", "LATAM"):
+        for cast_mode in ("SINGLE", "MULTI", CAST_MODE_LOOKBOOK):
+            _, report = slice_prompt(version, {"region": region, "cast_mode": cast_mode}, enabled=True)
+            rows.append((f"{region}/{cast_mode}", report))
+    return rows
+
+
+def __getattr__(name):
+    # 예전 import 호환 - LG_SYSTEM_PROMPT는 접근 시점의 최신 버전
+    if name == "LG_SYSTEM_PROMPT":
+        return current_prompt().text
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LG Art Director 시스템 프롬프트 확인")
+    parser.add_argument("--report", action="store_true", help="요청 조합별 슬라이싱 토큰 절감 보고")
+    args = parser.parse_args(argv)
+
+    version = current_prompt()
     print(f"=== LG Art Director System v{SYSTEM_VERSION} ===")
-    print(f"Loaded prompt length: {len(LG_SYSTEM_PROMPT)} chars")
+    print(f"Prompt version: {version.version_id}")
+    print(f"Loaded prompt length: {len(version.text)} chars")
     print(f"Prompt files: {PROMPT_FILES}")
+
+    if args.report:
+        tree = prompt_tree(version)
+        print(f"Sections: {len(tree.index)} (조건부 {sum(s.priority != PRIORITY_CORE for s in tree.index.values())})")
+        print("\n--- 요청 조합별 시스템 프롬프트 (추정 토큰) ---")
+        for name, report in slicing_report(version):
+            ratio = report.saved_tokens / report.full_tokens * 100 if report.full_tokens else 0
+            print(
+                f"{name:<28} {report.tokens:>6,} / {report.full_tokens:,} "
+                f"(-{report.saved_tokens:,}, {ratio:.1f}%)  제외: {', '.join(report.dropped)}"
+            )
+        return
+
     print("\n--- First 500 chars ---")
-    print(LG_SYSTEM_PROMPT[:500])
+    print(version.text[:500])
+
+
+if __name__ == "__main__":
+    # 테스트용
+    main()
@@ -0,0 +1,188 @@
+"""
+LG Art Director System v5.9.0 - System Prompt Context Cache
+LG_SYSTEM_PROMPT를 Gemini 캐시 컨텍스트로 한 번만 올려두고 모든 세션/턴에서 재사용
+
+요청은 API 키별 공유 클라이언트(client_pool.KeyClients)로 보내며 genai 전역 기본 클라이언트는 쓰지 않는다.
+"""
+
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+import google.generativeai as genai
+from google.generativeai import protos
+from google.protobuf import duration_pb2, field_mask_pb2
+
+# 캐시 컨텍스트 유지 시간
+CACHE_TTL = timedelta(hours=1)
+
+# 만료 전 이 시간 안으로 들어오면 TTL 연장
+REFRESH_MARGIN = timedelta(minutes=10)
+
+# 캐싱 미지원 모델은 이 시간 동안 재시도하지 않음
+UNSUPPORTED_RETRY = timedelta(minutes=30)
+
+# _entries/_unsupported 조회·갱신만 보호 (네트워크 호출 중에는 잡지 않음)
+_lock = threading.Lock()
+_entries = {}
+_unsupported = {}
+
+# 캐시 키별 생성/연장 잠금 - 같은 키만 업로드를 기다리고 다른 키/세션의 조회는 막지 않음
+_key_locks = {}
+
+
+def prompt_hash(system_prompt: str) -> str:
+    """조합된 시스템 프롬프트의 내용 해시"""
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _model_path(model_name: str) -> str:
+    return model_name if model_name.startswith("models/") else f"models/{model_name}"
+
+
+def _cache_key(model_name, system_prompt, key_fingerprint, prompt_id=None):
+    return (key_fingerprint, model_name, prompt_id or prompt_hash(system_prompt))
+
+
+def _ttl():
+    return duration_pb2.Duration(seconds=int(CACHE_TTL.total_seconds()))
+
+
+def _key_lock(key):
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _valid_entry(key, now):
+    """연장이 필요 없는 캐시 항목 또는 None"""
+    with _lock:
+        entry = _entries.get(key)
+    if entry and entry["expires_at"] - now > REFRESH_MARGIN:
+        return entry
+    return None
+
+
+def _acquire_cached_content(clients, key, model_name, system_prompt):
+    """캐시 컨텍스트 확보 - (cached_content proto, 상태) 반환, 미지원이면 (None, "inline")
+
+    생성/연장(프롬프트 업로드)은 키별 잠금 안에서만 하고 전역 잠금은 항목을 읽고 쓸 때만 잡는다.
+    """
+    entry = _valid_entry(key, _now())
+    if entry:
+        return entry["cached"], "hit"
+
+    key_lock = _key_lock(key)
+    if not key_lock.acquire(blocking=False):
+        # 다른 스레드가 이 키를 연장 중 - 아직 만료 전이면 기다리지 않고 그대로 사용
+        with _lock:
+            entry = _entries.get(key)
+        if entry and entry["expires_at"] > _now():
+            return entry["cached"], "hit"
+        key_lock.acquire()
+    try:
+        now = _now()
+        # 기다리는 동안 다른 스레드가 만들었거나 연장했을 수 있음
+        entry = _valid_entry(key, now)
+        if entry:
+            return entry["cached"], "hit"
+        with _lock:
+            entry = _entries.get(key)
+            retry_at = _unsupported.get(key)
+
+        if entry and entry["expires_at"] > now:
+            try:
+                clients.cache.update_cached_content(
+                    protos.UpdateCachedContentRequest(
+                        cached_content=protos.CachedContent(name=entry["cached"].name, ttl=_ttl()),
+                        update_mask=field_mask_pb2.FieldMask(paths=["ttl"]),
+                    )
+                )
+            except Exception:
+                with _lock:
+                    _entries.pop(key, None)
+            else:
+                with _lock:
+                    _entries[key] = {"cached": entry["cached"], "expires_at": now + CACHE_TTL}
+                return entry["cached"], "refreshed"
+
+        if retry_at and retry_at > now:
+            return None, "inline"
+
+        try:
+            cached = clients.cache.create_cached_content(
+                protos.CreateCachedContentRequest(
+                    cached_content=protos.CachedContent(
+                        model=_model_path(model_name),
+                        display_name=f"lgad-{key[2]}",
+                        system_instruction=protos.Content(parts=[protos.Part(text=system_prompt)]),
+                        ttl=_ttl(),
+                    )
+                )
+            )
+        except Exception:
+            # 모델 미지원, 최소 토큰 미달, 권한 없음 등 → 인라인 system_instruction으로 폴백
+            with _lock:
+                _unsupported[key] = now + UNSUPPORTED_RETRY
+            return None, "inline"
+
+        with _lock:
+            _unsupported.pop(key, None)
+            _entries[key] = {"cached": cached, "expires_at": now + CACHE_TTL}
+        return cached, "created"
+    finally:
+        key_lock.release()
+
+
+def _bind(model, clients, cached_name=None):
+    """모델이 전역 기본 클라이언트 대신 키별 공유 클라이언트로 요청하도록 연결 (cached_name이 있으면 캐시 컨텍스트도)
+
+    SDK 비공개 속성(_client, _cached_content)을 쓰므로 requirements.txt에 고정한 버전과 구조가 다르면
+    전역 클라이언트로 보내거나 캐시를 조용히 빠뜨리지 않도록 바로 실패한다.
+    """
+    if not hasattr(model, "_client"):
+        raise RuntimeError(
+            f"google-generativeai {genai.__version__}: GenerativeModel._client가 없습니다 (requirements.txt 고정 버전 확인)"
+        )
+    model._client = clients.generative
+    if cached_name is not None:
+        model._cached_content = cached_name
+        if model.cached_content != cached_name:
+            raise RuntimeError(
+                f"google-generativeai {genai.__version__}: GenerativeModel.cached_content가 "
+                "_cached_content를 읽지 않습니다 (requirements.txt 고정 버전 확인)"
+            )
+    return model
+
+
+def get_cached_model(clients, model_name, generation_config, system_prompt, prompt_id=None):
+    """시스템 프롬프트 캐시를 적용한 GenerativeModel 반환 - (model, 캐시 상태)
+
+    상태: "hit" | "created" | "refreshed" | "inline"
+    prompt_id(프롬프트 버전 해시)를 넘기면 매번 프롬프트 전체를 해시하지 않는다.
+    """
+    key = _cache_key(model_name, system_prompt, clients.fingerprint, prompt_id)
+
+    cached, status = _acquire_cached_content(clients, key, model_name, system_prompt)
+
+    if cached is not None:
+        # GenerativeModel.from_cached_content와 같지만 전역 클라이언트로 캐시를 다시 조회하지 않음
+        model = genai.GenerativeModel(model_name=cached.model, generation_config=generation_config)
+        return _bind(model, clients, cached.name), status
+
+    model = genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=generation_config,
+        system_instruction=system_prompt,
+    )
+    return _bind(model, clients), "inline"
+
+
+def clear_prompt_cache() -> None:
+    """로컬 캐시 참조 초기화 (서버 측 캐시는 TTL로 자연 만료)"""
+    with _lock:
+        _entries.clear()
+        _unsupported.clear()
@@ -0,0 +1,84 @@
+"""
+LG Art Director System v5.9.0 - Chat Render Cache
+메시지별(내용 해시) 파싱/렌더링 산출물을 캐시해서 Streamlit rerun마다 다시 계산하지 않음
+"""
+
+import hashlib
+
+from history import set_headings
+from response_parser import parse_result
+from schema_validator import validate_step1
+from set_document import message_content
+
+# rerun 시 기본으로 보여줄 최근 메시지 수 / "더 보기" 한 번에 늘어나는 수
+VISIBLE_MESSAGES = 6
+SHOW_MORE_STEP = 6
+
+# 세션당 보관할 산출물 최대 개수
+MAX_ARTIFACTS = 200
+
+# 이 길이 이하이고 JSON이 없는 응답(인사말, 안내 등)은 접지 않음
+COMPACT_TEXT_CHARS = 600
+
+# 접힌 메시지에 보여줄 미리보기 줄 수
+PREVIEW_LINES = 2
+
+
+def message_id(msg) -> str:
+    """메시지 식별자 - 역할 + 내용 해시"""
+    payload = f"{msg.get('role')}\0{message_content(msg)}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class MessageArtifact:
+    """한 메시지의 렌더링 준비물 (파싱된 JSON, 스키마 오류, 본문, 요약)
+
+    SET 문서 메시지는 문서를 그대로 참조하고 본문은 펼칠 때만 문서에서 만든다 (원문 사본을 두지 않음).
+    """
+
+    __slots__ = ("id", "doc", "json_data", "_text", "headings", "preview", "compact", "schema_errors")
+
+    def __init__(self, msg_id, msg):
+        self.id = msg_id
+        self.doc = msg.get("doc")
+        if self.doc is not None:
+            json_data, text = self.doc.header, self.doc.prose()
+            self._text = None
+        else:
+            parsed, text = parse_result(msg.get("content") or "")
+            json_data = parsed.data
+            self._text = text
+        self.json_data = json_data
+        self.schema_errors = validate_step1(json_data) if isinstance(json_data, dict) else []
+        self.headings = set_headings(text) if json_data is not None else []
+        lines = [line for line in text.splitlines() if line.strip()]
+        self.preview = "\n\n".join(lines[:PREVIEW_LINES])
+        self.compact = json_data is None and len(text) <= COMPACT_TEXT_CHARS
+
+    @property
+    def text(self) -> str:
+        return self.doc.prose() if self.doc is not None else self._text
+
+
+def get_artifact(cache, msg) -> MessageArtifact:
+    """cache(dict, 보통 st.session_state 안)에서 메시지 산출물을 찾거나 만들어 넣음"""
+    msg_id = msg.get("id")
+    if not msg_id:
+        msg_id = msg["id"] = message_id(msg)
+
+    artifact = cache.get(msg_id)
+    if artifact is None:
+        artifact = MessageArtifact(msg_id, msg)
+        cache[msg_id] = artifact
+        while len(cache) > MAX_ARTIFACTS:
+            cache.pop(next(iter(cache)))
+    return artifact
+
+
+def percentile(values, pct):
+    """정렬 후 최근접 순위 백분위수 (값이 없으면 None)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
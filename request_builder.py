@@ -0,0 +1,188 @@
+"""
+LG Art Director System v5.9.0 - Request Builder
+설정값 + 사용자 지시사항을 [SYSTEM_OVERRIDE_DATA] 요청 프롬프트로 조립 (앱/배치 공용)
+"""
+
+from datetime import datetime
+
+import cast_planner
+import climate
+
+REGION_OPTIONS = ["EU", "LATAM"]
+CITY_OPTIONS = {
+    "EU": [
+        "Paris (파리)",
+        "London (런던)",
+        "Rome (로마)",
+        "Barcelona (바르셀로나)",
+        "Amsterdam (암스테르담)",
+        "Berlin (베를린)",
+        "Prague (프라하)",
+        "Vienna (비엔나)",
+        "Madrid (마드리드)",
+        "Florence (피렌체)",
+        "Venice (베네치아)",
+        "Lisbon (리스본)",
+        "Athens (아테네)",
+        "Munich (뮌헨)",
+        "Budapest (부다페스트)",
+        "Brussels (브뤼셀)",
+        "Zurich (취리히)",
+        "Copenhagen (코펜하겐)",
+        "Lyon (리옹)",
+        "Krakow (크라쿠프)",
+    ],
+    "LATAM": [
+        "Mexico City (멕시코시티)",
+        "Sao Paulo (상파울루)",
+        "Buenos Aires (부에노스아이레스)",
+        "Rio de Janeiro (리우데자네이루)",
+        "Bogota (보고타)",
+        "Lima (리마)",
+        "Santiago (산티아고)",
+        "Medellin (메데인)",
+        "Cusco (쿠스코)",
+        "Havana (아바나)",
+        "Cartagena (카르타헤나)",
+        "Quito (키토)",
+        "Panama City (파나마시티)",
+        "Montevideo (몬테비데오)",
+        "San Jose (산호세)",
+        "La Paz (라파스)",
+        "Cancun (칸쿤)",
+        "San Juan (산후안)",
+        "Brasilia (브라질리아)",
+        "Guadalajara (과달라하라)",
+    ],
+}
+
+# 모든 생성 경로에서 공유하는 생성 설정
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+# 출력 모드 - 프로즈+JSON(기본) / 구조화 JSON만 / 구조화 JSON + SET 본문 문자열
+OUTPUT_MODE_PROSE = "PROSE"
+OUTPUT_MODE_JSON = "JSON"
+OUTPUT_MODE_JSON_PROSE = "JSON_PROSE"
+OUTPUT_MODES = [OUTPUT_MODE_PROSE, OUTPUT_MODE_JSON, OUTPUT_MODE_JSON_PROSE]
+
+# 요청 프롬프트에 들어가는 설정 필드
+SETTINGS_FIELDS = (
+    "project_id",
+    "region",
+    "city",
+    "target_date",
+    "age",
+    "gender",
+    "occupation",
+    "ethnicity",
+    "cast_mode",
+    "family_count",
+    "diversity_mode",
+    "aspect_ratio",
+    "cast_seed",
+)
+
+
+def default_settings():
+    return {
+        "project_id": "LG_AD_2026_CAMPAIGN_01",
+        "region": "EU",
+        "city": CITY_OPTIONS["EU"][0],
+        "target_date": datetime.today().date(),
+        "age": 35,
+        "gender": "FEMALE",
+        "occupation": "직업 없음",
+        "ethnicity": "",
+        "cast_mode": "SINGLE",
+        "family_count": 3,
+        "diversity_mode": "SAFE",
+        "aspect_ratio": "4:5",
+        "cast_seed": None,
+    }
+
+
+def climate_rules_text() -> str:
+    """시스템 프롬프트에서 빠진 기후 섹션 원문 (섹션을 빼지 않았으면 참조 안내만)"""
+    from prompt import local_resolution_enabled, resolved_sections_text
+
+    if not local_resolution_enabled():
+        return "시스템 프롬프트 §3.2~§3.5 규칙을 적용하세요."
+    return resolved_sections_text()
+
+
+def format_target_date(value):
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def build_combined_prompt(settings, user_input, model_name, translate_enabled, output_mode=OUTPUT_MODE_PROSE):
+    ethnicity_value = settings["ethnicity"].strip() if settings["ethnicity"] else "Auto"
+    target_date = format_target_date(settings["target_date"])
+
+    lines = [
+        "[SYSTEM_OVERRIDE_DATA]",
+        f"Project_ID: {settings['project_id']}",
+        f"Region: {settings['region']}",
+        f"City: {settings['city']}",
+        f"Target_Date: {target_date}",
+        f"Fixed_Age: {settings['age']}",
+        f"Fixed_Gender: {settings['gender']}",
+        f"Fixed_Occupation: {settings['occupation']}",
+        f"Fixed_Ethnicity: {ethnicity_value}",
+        f"Cast_Mode: {settings['cast_mode']}",
+        f"Diversity_Mode: {settings['diversity_mode']}",
+        f"Aspect_Ratio: {settings['aspect_ratio']}",
+        f"Model_Version: {model_name}",
+    ]
+
+    if settings.get("cast_mode") == "MULTI":
+        lines.append(f"Family_Count: {settings.get('family_count', 3)}")
+
+    # §3.2~§3.5는 로컬에서 계산한 고정값으로 전달 (분류할 수 없는 도시면 규칙 원문 첨부)
+    climate_facts = climate.resolve_climate(settings["region"], settings["city"], settings["target_date"])
+    if climate_facts is not None:
+        lines.extend(climate.override_lines(climate_facts))
+    else:
+        lines.append("Climate_Resolution: MODEL (아래 [CLIMATE_RULES]로 계산)")
+
+    # §1.3/§4/§5.4~§5.6 세트별 인물 속성은 로컬 계획으로 고정 (모델은 묘사만 작성)
+    lines.extend(cast_planner.override_lines(cast_planner.plan_for_settings(settings)))
+
+    if climate_facts is None:
+        lines.extend(["", "[CLIMATE_RULES]", climate_rules_text()])
+
+    if translate_enabled:
+        lines.extend(
+            [
+                "",
+                "[OUTPUT_TRANSLATION]",
+                "응답에 영어가 포함되면 마지막에 한국어 번역 섹션을 추가하세요.",
+                "한국어 원문은 그대로 유지하고, JSON 블록은 번역하지 마세요.",
+            ]
+        )
+
+    if output_mode == OUTPUT_MODE_JSON:
+        lines.extend(
+            [
+                "",
+                "[OUTPUT_MODE]",
+                "STRUCTURED_JSON: HEADER_JSON 객체 하나만 JSON으로 출력하세요. SET 본문과 설명은 생략합니다.",
+            ]
+        )
+    elif output_mode == OUTPUT_MODE_JSON_PROSE:
+        lines.extend(
+            [
+                "",
+                "[OUTPUT_MODE]",
+                "STRUCTURED_JSON: header에는 HEADER_JSON 객체를, sets_markdown에는 §9.2 SET 본문 마크다운을 넣으세요.",
+            ]
+        )
+
+    lines.extend(["", "[USER_CREATIVE_DIRECTION]", user_input])
+    return "\n".join(lines).strip()
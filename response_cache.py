@@ -0,0 +1,173 @@
+"""
+LG Art Director System v5.9.0 - Response Cache
+동일한 요청(프롬프트 버전 + 모델 + 생성 설정 + 정규화된 요청 프롬프트)의 응답을 SQLite에 저장하고 재사용
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 캐시 DB 위치 (환경변수로 변경 가능)
+CACHE_PATH_ENV = "LGAD_RESPONSE_CACHE_PATH"
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses.sqlite3")
+
+# 저장된 응답 유지 시간 / 전체 용량 상한
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# 키당 보관할 응답 변형 수 (temperature > 0이라 같은 요청도 결과가 다름)
+DEFAULT_VARIANTS = 1
+MAX_VARIANTS = 5
+
+_WHITESPACE_RE = re.compile(r"[ \t]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT NOT NULL,
+    variant INTEGER NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (key, variant)
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+CREATE TABLE IF NOT EXISTS cursors (
+    key TEXT PRIMARY KEY,
+    next_variant INTEGER NOT NULL
+);
+"""
+
+
+def normalize_prompt(prompt) -> str:
+    """줄바꿈/공백 차이만 있는 요청을 같은 키로 묶기 위한 정규화"""
+    lines = (_WHITESPACE_RE.sub(" ", line).strip() for line in prompt.replace("\r\n", "\n").split("\n"))
+    return "\n".join(lines).strip()
+
+
+def response_key(prompt_id, model_name, generation_config, combined_prompt, history=()) -> str:
+    """응답 캐시 키 - prompt_id는 시스템 프롬프트 버전 해시
+
+    대화 중이면 (압축된) 히스토리도 결과에 영향을 주므로 키에 포함
+    """
+    payload = json.dumps(
+        {
+            "system": prompt_id,
+            "model": model_name,
+            "config": generation_config,
+            "prompt": normalize_prompt(combined_prompt),
+            "history": [[msg.get("role"), normalize_prompt(msg.get("content") or "")] for msg in history],
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite 응답 캐시 - TTL 만료, 용량 초과 시 LRU 제거, 키당 N개 변형 라운드로빈"""
+
+    def __init__(self, path=None, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES, clock=time.time):
+        self.path = path or os.getenv(CACHE_PATH_ENV, "").strip() or DEFAULT_CACHE_PATH
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def lookup(self, key, variants=DEFAULT_VARIANTS):
+        """키에 변형이 variants개 모였으면 라운드로빈으로 하나 반환, 아니면 None (새로 생성해서 put)"""
+        now = self._clock()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            rows = self._conn.execute(
+                "SELECT variant, response FROM responses WHERE key = ? ORDER BY variant",
+                (key,),
+            ).fetchall()
+
+            if len(rows) < max(1, variants):
+                self.misses += 1
+                return None
+
+            cursor = self._conn.execute("SELECT next_variant FROM cursors WHERE key = ?", (key,)).fetchone()
+            position = (cursor[0] if cursor else 0) % len(rows)
+            variant, response = rows[position]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cursors (key, next_variant) VALUES (?, ?)",
+                (key, position + 1),
+            )
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ? AND variant = ?",
+                (now, key, variant),
+            )
+            self.hits += 1
+            return response
+
+    def put(self, key, response, variants=DEFAULT_VARIANTS) -> None:
+        """응답 저장 - 변형이 가득 찼으면 가장 오래된 변형을 교체"""
+        now = self._clock()
+        variants = max(1, min(variants, MAX_VARIANTS))
+        size = len(response.encode("utf-8"))
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT variant FROM responses WHERE key = ? ORDER BY created_at",
+                (key,),
+            ).fetchall()
+            used = {row[0] for row in rows}
+            free = [variant for variant in range(variants) if variant not in used]
+            variant = free[0] if free else rows[0][0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, variant, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, variant, response, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """전체 용량이 max_bytes를 넘으면 최근 사용이 가장 오래된 것부터 제거"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, variant, size FROM responses ORDER BY last_used").fetchall()
+        for key, variant, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ? AND variant = ?", (key, variant))
+            total -= size
+        self._conn.execute("DELETE FROM cursors WHERE key NOT IN (SELECT DISTINCT key FROM responses)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM cursors")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """프로세스 공용 응답 캐시 (모든 Streamlit 세션이 공유)"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
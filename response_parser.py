@@ -0,0 +1,278 @@
+"""
+LG Art Director System v5.9.0 - Response Parser
+응답 텍스트(또는 스트리밍 청크)에서 첫 번째 JSON 객체를 찾아 본문과 분리
+펜스 없는 JSON, 잘린 JSON, 흔한 모델 실수(후행 쉼표 등)는 제한적으로 복구하고 실패 위치를 보고
+"""
+
+import json
+import re
+from functools import lru_cache
+
+# 응답 내 JSON 블록 시작/종료 펜스
+JSON_FENCE_OPEN = "```json"
+FENCE_CLOSE = "```"
+
+# 스캐너가 멈춰야 하는 문자 (문자열 밖 / 문자열 안)
+_STRUCTURE_RE = re.compile(r'["{}\[\]]')
+_STRING_RE = re.compile(r'["\\]')
+
+# 복구 규칙
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_PY_LITERAL_RE = re.compile(r"([:\[,]\s*)(True|False|None)(?=\s*[,}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_DANGLING_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"\s*$')
+_DANGLING_TOKEN_RE = re.compile(r"[A-Za-z0-9.+\-]+$")
+
+# 복구를 시도할 최대 후보 길이 (이보다 크면 엄격 파싱만)
+MAX_REPAIR_CHARS = 200_000
+
+# 메시지별 파싱 결과 메모이즈 개수
+PARSE_CACHE_SIZE = 256
+
+
+class ParseResult:
+    """JSON 추출 결과 - data가 None이면 error에 실패 위치가 담김"""
+
+    __slots__ = ("data", "start", "end", "repairs", "truncated", "error")
+
+    def __init__(self, data=None, start=None, end=None, repairs=(), truncated=False, error=None):
+        self.data = data
+        self.start = start
+        self.end = end
+        self.repairs = tuple(repairs)
+        self.truncated = truncated
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+
+def _location(text, pos, message) -> dict:
+    line = text.count("\n", 0, pos) + 1
+    col = pos - (text.rfind("\n", 0, pos) + 1) + 1
+    return {"message": message, "pos": pos, "line": line, "col": col}
+
+
+def _repair_syntax(candidate):
+    """후행 쉼표, 파이썬 리터럴(True/False/None) 보정 - (보정 문자열, 적용된 규칙) 반환"""
+    repairs = []
+    repaired = _TRAILING_COMMA_RE.sub(r"\1", candidate)
+    if repaired != candidate:
+        repairs.append("trailing_comma")
+    fixed = _PY_LITERAL_RE.sub(lambda m: m.group(1) + _PY_LITERALS[m.group(2)], repaired)
+    if fixed != repaired:
+        repairs.append("python_literal")
+    return fixed, repairs
+
+
+def _close_truncated(candidate, stack, in_string):
+    """잘린 JSON을 마지막 완결 값까지 되돌린 뒤 열린 괄호를 닫음 - 시도할 후보 목록 반환"""
+    text = candidate + '"' if in_string else candidate
+    closers = "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+    attempts = []
+    for _ in range(4):
+        text = text.rstrip()
+        attempts.append(text + closers)
+        if text.endswith((",", ":")):
+            text = text[:-1]
+        elif text.endswith('"'):
+            text = _DANGLING_STRING_RE.sub("", text)
+        elif _DANGLING_TOKEN_RE.search(text):
+            text = _DANGLING_TOKEN_RE.sub("", text)
+        else:
+            break
+    return attempts
+
+
+def _parse_candidate(text, start, end, stack=(), in_string=False):
+    """text[start:end] 후보 파싱 (엄격 → 문법 보정 → 잘림 복구 순)"""
+    candidate = text[start:end]
+    truncated = bool(stack)
+    if truncated:
+        error = _location(text, end, "JSON이 닫히지 않고 끝남")
+    else:
+        try:
+            return ParseResult(json.loads(candidate), start, end)
+        except json.JSONDecodeError as e:
+            error = _location(text, start + e.pos, e.msg)
+
+    if len(candidate) > MAX_REPAIR_CHARS:
+        return ParseResult(start=start, end=end, truncated=truncated, error=error)
+
+    repaired, repairs = _repair_syntax(candidate)
+    options = _close_truncated(repaired, stack, in_string) if truncated else [repaired]
+    for option in options:
+        try:
+            data = json.loads(option)
+        except json.JSONDecodeError:
+            continue
+        if truncated:
+            repairs = repairs + ["truncated"]
+        return ParseResult(data, start, end, repairs, truncated)
+
+    return ParseResult(start=start, end=end, truncated=truncated, error=error)
+
+
+class JsonStreamExtractor:
+    """청크 단위로 들어오는 텍스트에서 첫 번째 균형 잡힌 JSON 객체를 찾는 증분 스캐너
+
+    이미 스캔한 위치를 기억하므로 전체 스트림을 한 번만 훑는다.
+    """
+
+    def __init__(self, text="", offset=0):
+        self.text = text
+        self.result = None
+        self.last_failure = None
+        self._pos = offset
+        self._start = None
+        self._stack = []
+        self._in_string = False
+        if text:
+            self._scan()
+
+    @property
+    def started(self) -> bool:
+        return self.result is not None or self._start is not None
+
+    @property
+    def start(self):
+        return self.result.start if self.result is not None else self._start
+
+    @property
+    def end(self):
+        return self.result.end if self.result is not None else None
+
+    def feed(self, chunk):
+        """청크 추가 - 완성된 JSON 객체를 찾았으면 ParseResult, 아니면 None"""
+        if chunk:
+            self.text += chunk
+            if self.result is None:
+                self._scan()
+        return self.result
+
+    def finish(self) -> ParseResult:
+        """스트림 종료 - 닫히지 않은 객체는 잘림 복구를 시도"""
+        if self.result is not None:
+            return self.result
+        if self._start is not None:
+            result = _parse_candidate(self.text, self._start, len(self.text), self._stack, self._in_string)
+            if result.ok:
+                self.result = result
+            return result
+        if self.last_failure is not None:
+            return self.last_failure
+        return ParseResult(error=_location(self.text, len(self.text), "JSON 객체를 찾지 못함"))
+
+    def _reset_candidate(self):
+        self._start = None
+        self._stack = []
+        self._in_string = False
+
+    def _scan(self):
+        text = self.text
+        i = self._pos
+        n = len(text)
+        while i < n:
+            if self._start is None:
+                i = text.find("{", i)
+                if i < 0:
+                    i = n
+                    break
+                self._start = i
+                self._stack = ["{"]
+                i += 1
+                continue
+
+            if self._in_string:
+                match = _STRING_RE.search(text, i)
+                if match is None:
+                    i = n
+                    break
+                if match.group() == "\\":
+                    if match.end() >= n:
+                        # 이스케이프 문자가 다음 청크에 올 수 있으므로 백슬래시부터 다시 스캔
+                        i = match.start()
+                        break
+                    i = match.end() + 1
+                    continue
+                self._in_string = False
+                i = match.end()
+                continue
+
+            match = _STRUCTURE_RE.search(text, i)
+            if match is None:
+                i = n
+                break
+            ch = match.group()
+            i = match.end()
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append(ch)
+            else:
+                self._stack.pop()
+                if not self._stack:
+                    result = _parse_candidate(text, self._start, i)
+                    if result.ok and isinstance(result.data, dict):
+                        self.result = result
+                        self._pos = i
+                        return
+                    # 객체처럼 보였지만 JSON이 아님 → 다음 '{'부터 다시 탐색
+                    self.last_failure = result
+                    i = self._start + 1
+                    self._reset_candidate()
+        self._pos = i
+
+
+def fence_bounds(text, start, end):
+    """JSON 구간을 감싼 ```json ... ``` 펜스까지 포함한 (시작, 끝) 반환"""
+    head = text[:start].rstrip()
+    if head.lower().endswith(JSON_FENCE_OPEN):
+        start = len(head) - len(JSON_FENCE_OPEN)
+        if end is not None:
+            tail = text[end:]
+            stripped = tail.lstrip()
+            if stripped.startswith(FENCE_CLOSE):
+                end += len(tail) - len(stripped) + len(FENCE_CLOSE)
+    return start, end
+
+
+def strip_json(text, start, end) -> str:
+    """JSON 구간(과 감싼 펜스)을 제외한 본문 - end가 None이면 JSON 시작 전까지"""
+    if start is None:
+        return text.strip()
+    start, end = fence_bounds(text, start, end)
+    if end is None:
+        return text[:start].strip()
+    return (text[:start] + text[end:]).strip()
+
+
+def extract_json(text) -> ParseResult:
+    """전체 텍스트에서 첫 번째 JSON 객체 추출 (```json 펜스 안을 우선 탐색)"""
+    fence = text.lower().find(JSON_FENCE_OPEN)
+    offsets = [fence + len(JSON_FENCE_OPEN), 0] if fence >= 0 else [0]
+
+    first_failure = None
+    for offset in offsets:
+        result = JsonStreamExtractor(text, offset).finish()
+        if result.ok:
+            return result
+        first_failure = first_failure or result
+    return first_failure
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_result(text):
+    """메시지 단위 메모이즈된 파싱 - (ParseResult, JSON을 제외한 본문)"""
+    result = extract_json(text)
+    if result.ok:
+        return result, strip_json(text, result.start, result.end)
+    return result, text
+
+
+def parse_response(text):
+    """(첫 번째로 파싱되는 JSON 객체 또는 None, JSON 블록을 제외한 본문) 반환"""
+    result, clean_text = parse_result(text)
+    return result.data, clean_text
@@ -0,0 +1,230 @@
+"""
+LG Art Director System v5.9.0 - Step 1 Schema Validator
+schemas/LG_Step1_Schema_v1_1.json을 시작 시 한 번 검증 함수로 컴파일하고,
+실패한 필드만 다시 요청하는 수정(repair) 프롬프트를 만든다
+"""
+
+import json
+import os
+import re
+from collections import namedtuple
+
+from response_parser import parse_result
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas", "LG_Step1_Schema_v1_1.json"
+)
+
+# 검증에 영향을 주지 않는 주석성 키워드
+ANNOTATION_KEYWORDS = {"$schema", "$id", "title", "description", "examples"}
+
+# 한 턴에서 수정 요청을 보낼 최대 횟수
+MAX_REPAIR_ATTEMPTS = 1
+
+FieldError = namedtuple("FieldError", ["path", "message"])
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+def _join(path, key) -> str:
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+
+def compile_schema(schema):
+    """스키마 노드 → validate(value, path) 함수 (오류 목록 반환)
+
+    사용 중인 키워드만 지원하며, 모르는 키워드가 있으면 컴파일 시점에 ValueError.
+    """
+    checks = []
+
+    for keyword, rule in schema.items():
+        if keyword in ANNOTATION_KEYWORDS:
+            continue
+
+        if keyword == "type":
+            type_check = _TYPE_CHECKS[rule]
+            checks.append(
+                lambda value, path, rule=rule, type_check=type_check:
+                [] if type_check(value) else [FieldError(path, f"{rule} 타입이어야 함")]
+            )
+        elif keyword == "required":
+            checks.append(
+                lambda value, path, rule=tuple(rule): [
+                    FieldError(_join(path, key), "필수 필드 누락")
+                    for key in rule
+                    if isinstance(value, dict) and key not in value
+                ]
+            )
+        elif keyword == "properties":
+            compiled = {key: compile_schema(sub) for key, sub in rule.items()}
+
+            def check_properties(value, path, compiled=compiled):
+                if not isinstance(value, dict):
+                    return []
+                errors = []
+                for key, validate in compiled.items():
+                    if key in value:
+                        errors.extend(validate(value[key], _join(path, key)))
+                return errors
+
+            checks.append(check_properties)
+        elif keyword == "additionalProperties":
+            if rule is not True:
+                allowed = set(schema.get("properties", {}))
+                checks.append(
+                    lambda value, path, allowed=allowed: [
+                        FieldError(_join(path, key), "허용되지 않은 필드")
+                        for key in (value if isinstance(value, dict) else ())
+                        if key not in allowed
+                    ]
+                )
+        elif keyword == "items":
+            validate_item = compile_schema(rule)
+            checks.append(
+                lambda value, path, validate_item=validate_item: [
+                    error
+                    for index, item in enumerate(value if isinstance(value, list) else ())
+                    for error in validate_item(item, _join(path, index))
+                ]
+            )
+        elif keyword == "minItems":
+            checks.append(
+                lambda value, path, rule=rule:
+                [FieldError(path, f"항목이 {rule}개 이상이어야 함")]
+                if isinstance(value, list) and len(value) < rule
+                else []
+            )
+        elif keyword == "minLength":
+            checks.append(
+                lambda value, path, rule=rule:
+                [FieldError(path, f"{rule}자 이상이어야 함")]
+                if isinstance(value, str) and len(value) < rule
+                else []
+            )
+        elif keyword == "minimum":
+            checks.append(
+                lambda value, path, rule=rule:
+                [FieldError(path, f"{rule} 이상이어야 함")]
+                if _TYPE_CHECKS["number"](value) and value < rule
+                else []
+            )
+        elif keyword == "pattern":
+            regex = re.compile(rule)
+            checks.append(
+                lambda value, path, regex=regex:
+                [FieldError(path, f"형식 불일치 (패턴 {regex.pattern})")]
+                if isinstance(value, str) and not regex.search(value)
+                else []
+            )
+        elif keyword == "enum":
+            checks.append(
+                lambda value, path, rule=tuple(rule):
+                [] if value in rule else [FieldError(path, f"허용 값: {', '.join(map(str, rule))}")]
+            )
+        elif keyword == "const":
+            checks.append(
+                lambda value, path, rule=rule:
+                [] if value == rule else [FieldError(path, f"값은 {rule}이어야 함")]
+            )
+        elif keyword == "allOf":
+            compiled = [compile_schema(sub) for sub in rule]
+            checks.append(
+                lambda value, path, compiled=compiled: [
+                    error for validate in compiled for error in validate(value, path)
+                ]
+            )
+        elif keyword == "if":
+            condition = compile_schema(rule)
+            then = compile_schema(schema.get("then", {}))
+            otherwise = compile_schema(schema.get("else", {}))
+            checks.append(
+                lambda value, path, condition=condition, then=then, otherwise=otherwise:
+                then(value, path) if not condition(value, path) else otherwise(value, path)
+            )
+        elif keyword in ("then", "else"):
+            continue
+        else:
+            raise ValueError(f"지원하지 않는 스키마 키워드: {keyword}")
+
+    def validate(value, path=""):
+        errors = []
+        for check in checks:
+            errors.extend(check(value, path))
+        return errors
+
+    return validate
+
+
+def load_schema(path=SCHEMA_PATH) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+STEP1_SCHEMA = load_schema()
+_validate_step1 = compile_schema(STEP1_SCHEMA)
+
+
+def validate_step1(data):
+    """Step 1 HEADER_JSON 검증 - FieldError 목록 (비어 있으면 통과)"""
+    return _validate_step1(data, "")
+
+
+def format_errors(errors) -> str:
+    return "\n".join(f"- {error.path or '(root)'}: {error.message}" for error in errors)
+
+
+def build_repair_prompt(data, errors) -> str:
+    """오류 필드만 고쳐 달라는 후속 요청 (전체 재생성 대신)"""
+    return "\n".join(
+        [
+            "[SCHEMA_REPAIR]",
+            "직전 응답의 HEADER_JSON이 LG Step1 Schema v1.1 검증에 실패했습니다.",
+            "아래 필드만 수정하고 나머지 값은 그대로 유지한 HEADER_JSON 하나만 ```json 블록으로 출력하세요.",
+            "SET 본문이나 설명은 다시 쓰지 마세요.",
+            "",
+            "[ERRORS]",
+            format_errors(errors),
+            "",
+            "[CURRENT_JSON]",
+            "```json",
+            json.dumps(data, ensure_ascii=False, indent=2),
+            "```",
+        ]
+    )
+
+
+def splice_json(text, parsed, data) -> str:
+    """응답 텍스트의 JSON 구간을 새 객체로 교체 (본문은 그대로)"""
+    replacement = json.dumps(data, ensure_ascii=False, indent=2)
+    return text[:parsed.start] + replacement + text[parsed.end:]
+
+
+def repair_response(send, text, parsed, errors):
+    """send(prompt) -> 응답 텍스트 로 수정 요청 - (응답 텍스트, ParseResult, 남은 오류) 반환
+
+    수정본이 오류를 줄이지 못하면 원래 응답을 그대로 돌려준다.
+    """
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        reply = send(build_repair_prompt(parsed.data, errors))
+        repaired, _ = parse_result(reply or "")
+        if not isinstance(repaired.data, dict):
+            break
+        repaired_errors = validate_step1(repaired.data)
+        if len(repaired_errors) >= len(errors):
+            break
+        text = splice_json(text, parsed, repaired.data)
+        parsed, _ = parse_result(text)
+        errors = repaired_errors
+        if not errors:
+            break
+    return text, parsed, errors
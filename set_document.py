@@ -0,0 +1,339 @@
+"""
+LG Art Director System v5.9.0 - Set Document Model
+§9.2 응답 → HEADER_JSON + SET별 필드/이미지 프롬프트 블록 + §9.3 네거티브 프롬프트 문서
+세션에는 원문 대신 이 문서를 보관 (줄 단위 intern으로 반복 문자열 공유, 원문은 markdown()으로 그대로 복원)
+"""
+
+import re
+import sys
+import threading
+
+from cast_planner import SET_HEADING_RE
+from response_parser import FENCE_CLOSE, extract_json, fence_bounds
+from schema_validator import splice_json
+
+# 세트 머리말 "## SET 01 [TYPICAL] - Baseline"
+SET_TITLE_RE = re.compile(r"^## SET (\d{2})(?:\s*\[([A-Z_]+)\])?(?:\s*-\s*(.*))?$")
+
+# 세트 메타 줄 "Key: value" (Age 줄은 "Age: 35 | Body: Standard")
+FIELD_LINE_RE = re.compile(r"^([A-Z][A-Za-z ]*?):\s*(.*)$")
+SECONDARY_LINE_RE = re.compile(r"^- Model ([A-Z]):\s*(.*)$")
+
+# 메타 줄 키 → 문서 필드 이름
+SET_FIELDS = {
+    "Model": "model",
+    "Age": "age",
+    "Body": "body",
+    "Skin": "skin",
+    "Styling": "styling",
+    "Props": "props",
+    "Lighting": "lighting",
+    "Gaze": "gaze",
+    "Primary Biometric Anchor": "anchor",
+    "Story Position": "story",
+}
+
+# 프롬프트 블록 첫 줄 "[Image 1 - Profile]" → 종류
+PROMPT_KINDS = (
+    ("[Image 1", "image1"),
+    ("[Image 2", "image2"),
+    ("[Secondary Character Sheet - Model ", "secondary"),
+    ("[Group Prompt", "group"),
+)
+
+NEGATIVE_MARKER = "NEGATIVE"
+
+# replace_set 동시 호출(세트 여러 개를 동시에 재생성)에서 교체가 서로 덮어쓰지 않도록
+_REPLACE_LOCK = threading.Lock()
+
+
+def _intern(line):
+    return sys.intern(line)
+
+
+def _intern_json(value):
+    """헤더 JSON의 문자열 값/키를 intern (세트·턴 사이에 반복되는 값 공유)"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(key): _intern_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_intern_json(item) for item in value]
+    return value
+
+
+class PromptBlock:
+    """세트 안의 ```markdown 프롬프트 블록 - title은 첫 줄("[Image 1 - Profile]"), text는 나머지 본문 (줄이 없으면 None)"""
+
+    __slots__ = ("lang", "title", "text", "closed")
+
+    def __init__(self, lang, title, text, closed=True):
+        self.lang = lang
+        self.title = title
+        self.text = text
+        self.closed = closed
+
+    @property
+    def kind(self) -> str:
+        for prefix, kind in PROMPT_KINDS:
+            if self.title.startswith(prefix):
+                if kind == "secondary":
+                    return f"secondary_{self.title[len(prefix):len(prefix) + 1].lower()}"
+                return kind
+        return "other"
+
+    def lines(self) -> list:
+        lines = [f"```{self.lang}"]
+        if self.title:
+            lines.append(self.title)
+        if self.text is not None:
+            lines.append(self.text)
+        if self.closed:
+            lines.append(FENCE_CLOSE)
+        return lines
+
+
+class SetEntry:
+    """SET 하나 - 원문 줄(intern된 문자열)과 PromptBlock을 순서대로 보관하고 필드는 줄에서 읽음"""
+
+    __slots__ = ("number", "batch", "title", "lines")
+
+    def __init__(self, number, batch, title, lines):
+        self.number = number
+        self.batch = batch
+        self.title = title
+        self.lines = lines
+
+    def fields(self) -> dict:
+        """메타 필드 이름 → 값 (첫 프롬프트 블록 전까지의 "Key: value" 줄)"""
+        values = {}
+        for line in self.lines[1:]:
+            if isinstance(line, PromptBlock):
+                break
+            for part in line.split(" | "):
+                match = FIELD_LINE_RE.match(part.strip())
+                if match and match.group(1) in SET_FIELDS:
+                    values.setdefault(SET_FIELDS[match.group(1)], match.group(2).strip())
+        return values
+
+    def field(self, name, default=""):
+        return self.fields().get(name, default)
+
+    @property
+    def anchors(self) -> tuple:
+        return tuple(part.strip() for part in self.field("anchor").split(",") if part.strip())
+
+    @property
+    def secondary(self) -> dict:
+        """MULTI 보조 인물 줄 "- Model B: ..." → {"B": 묘사}"""
+        models = {}
+        for line in self.lines:
+            if isinstance(line, str):
+                match = SECONDARY_LINE_RE.match(line.strip())
+                if match:
+                    models[match.group(1)] = match.group(2)
+        return models
+
+    @property
+    def prompts(self) -> list:
+        return [line for line in self.lines if isinstance(line, PromptBlock)]
+
+    def prompt(self, kind):
+        """종류("image1", "image2", "secondary_b", "group")의 프롬프트 본문 또는 None"""
+        for block in self.prompts:
+            if block.kind == kind:
+                return block.text or ""
+        return None
+
+    def markdown_lines(self) -> list:
+        lines = []
+        for line in self.lines:
+            lines.extend(line.lines() if isinstance(line, PromptBlock) else (line,))
+        return lines
+
+    def content_lines(self) -> list:
+        """세트 끝 구분 줄(빈 줄, ---)을 뺀 마크다운 줄 (세트별 화면 표시용)"""
+        lines = []
+        for line in self.lines[:len(self.lines) - _layout_count(self.lines)]:
+            lines.extend(line.lines() if isinstance(line, PromptBlock) else (line,))
+        return lines
+
+    def to_dict(self) -> dict:
+        data = {"set": self.number, "batch": self.batch, "title": self.title}
+        data.update(self.fields())
+        data["anchors"] = list(self.anchors)
+        if self.secondary:
+            data["secondary"] = self.secondary
+        data["prompts"] = {block.kind: block.text or "" for block in self.prompts}
+        return data
+
+
+class SetDocument:
+    """§9.2 응답 문서 - 헤더 앞 줄, HEADER_JSON(dict + 원문 구간), 세트 앞 줄, SET 목록, 세트 뒤 줄(§9.3 네거티브, 번역 등)"""
+
+    __slots__ = ("before", "header", "header_source", "lead", "sets", "tail")
+
+    def __init__(self, before, header, header_source, lead, sets, tail):
+        self.before = before
+        self.header = header
+        self.header_source = header_source
+        self.lead = lead
+        self.sets = sets
+        self.tail = tail
+
+    def _body_lines(self) -> list:
+        lines = list(self.lead)
+        for entry in self.sets:
+            lines.extend(entry.markdown_lines())
+        lines.extend(self.tail)
+        return lines
+
+    def markdown(self) -> str:
+        """원문 복원 (모델 히스토리/저장용)"""
+        head = "\n".join(self.before)
+        return head + self.header_source + "\n".join(self._body_lines())
+
+    def prose(self) -> str:
+        """HEADER_JSON 블록을 뺀 본문 (화면 표시용, response_parser.strip_json과 같은 결과)"""
+        return ("\n".join(self.before) + "\n".join(self._body_lines())).strip()
+
+    def get(self, set_no):
+        for entry in self.sets:
+            if entry.number == set_no:
+                return entry
+        return None
+
+    def update_header(self, **values) -> None:
+        """HEADER_JSON 값 교체 (원문 구간의 JSON만 다시 씀, 세트는 그대로)"""
+        header = {**self.header, **values}
+        result = extract_json(self.header_source)
+        if result.ok and result.end is not None:
+            self.header_source = splice_json(self.header_source, result, header)
+        self.header = _intern_json(header)
+
+    def replace_set(self, entry) -> None:
+        """같은 번호의 SET을 제자리 교체 - 세트 사이 구분 줄(빈 줄, ---)은 기존 것을 유지하고 다른 세트는 그대로"""
+        with _REPLACE_LOCK:
+            sets = list(self.sets)
+            for index, old in enumerate(sets):
+                if old.number == entry.number:
+                    lines = entry.lines[:len(entry.lines) - _layout_count(entry.lines)]
+                    entry.lines = lines + old.lines[len(old.lines) - _layout_count(old.lines):]
+                    sets[index] = entry
+                    self.sets = tuple(sets)
+                    return
+        raise ValueError(f"SET {entry.number:02d}가 문서에 없습니다.")
+
+    @property
+    def negative(self) -> str:
+        """§9.3 네거티브 프롬프트 (세트 뒤 'NEGATIVE' 제목 다음 펜스 또는 줄들)"""
+        lines = None
+        for line in self.tail:
+            if lines is None:
+                if NEGATIVE_MARKER in line.upper() and line.lstrip().startswith(("#", "[")):
+                    lines = []
+                continue
+            if line.startswith("#") or line.strip() == "---":
+                break
+            if not line.startswith("```"):
+                lines.append(line)
+        return "\n".join(lines or ()).strip()
+
+    def to_dict(self) -> dict:
+        """Step 2 전달용 - 세트별 필드와 프롬프트를 다시 파싱하지 않고 읽을 수 있는 형태"""
+        return {
+            "header": self.header,
+            "sets": [entry.to_dict() for entry in self.sets],
+            "negative": self.negative,
+        }
+
+
+def _layout_count(lines) -> int:
+    """세트 끝의 구분 줄(빈 줄, ---) 수 - 첫 줄(머리말)은 세지 않음"""
+    count = 0
+    for line in reversed(lines[1:]):
+        if not isinstance(line, str) or line.strip() not in ("", "---"):
+            break
+        count += 1
+    return count
+
+
+def _parse_lines(lines):
+    """헤더 뒤 줄 → (세트 앞 줄, SET 목록, 세트 뒤 줄) - 펜스 블록은 PromptBlock으로"""
+    lead, sets, tail = [], [], []
+    current = None
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if tail:
+            tail.append(_intern(line))
+            continue
+        if current is not None and line.startswith("```"):
+            body = []
+            closed = False
+            while index < len(lines):
+                inner = lines[index]
+                index += 1
+                if inner.strip() == FENCE_CLOSE:
+                    closed = True
+                    break
+                body.append(inner)
+            title = _intern(body.pop(0)) if body and body[0].startswith("[") else ""
+            current.lines.append(PromptBlock(_intern(line[3:]), title, "\n".join(body) if body else None, closed))
+            continue
+        heading = SET_TITLE_RE.match(line) if line.startswith("## SET ") else None
+        if heading:
+            batch = _intern(heading.group(2)) if heading.group(2) else ""
+            current = SetEntry(int(heading.group(1)), batch, (heading.group(3) or "").strip(), [_intern(line)])
+            sets.append(current)
+        elif current is not None and line.startswith("#"):
+            # 세트 뒤 다른 제목(§9.3 네거티브, 번역 등)부터는 모두 꼬리
+            tail.append(_intern(line))
+        elif current is not None:
+            current.lines.append(_intern(line))
+        else:
+            lead.append(_intern(line))
+    for entry in sets:
+        entry.lines = tuple(entry.lines)
+    return tuple(lead), tuple(sets), tuple(tail)
+
+
+def parse_document(text):
+    """§9.2 응답 → SetDocument, HEADER_JSON이 온전히 닫히지 않았거나 SET이 없으면 None (원문 그대로 보관)"""
+    text = text or ""
+    if not SET_HEADING_RE.search(text):
+        return None
+    result = extract_json(text)
+    if not result.ok or result.end is None or not isinstance(result.data, dict):
+        return None
+    start, end = fence_bounds(text, result.start, result.end)
+    lead, sets, tail = _parse_lines(text[end:].split("\n"))
+    if not sets:
+        return None
+    before = tuple(_intern(line) for line in text[:start].split("\n"))
+    return SetDocument(before, _intern_json(result.data), text[start:end], lead, sets, tail)
+
+
+def parse_set(text, set_no):
+    """'## SET NN' 블록 하나 → SetEntry, 머리말이 없거나 번호가 다르면 None (세트 재생성 응답용, 세트 뒤 제목 줄은 버림)"""
+    _, sets, _ = _parse_lines((text or "").strip().split("\n"))
+    if len(sets) != 1 or sets[0].number != set_no:
+        return None
+    return sets[0]
+
+
+def assistant_message(text, **extra) -> dict:
+    """어시스턴트 메시지 dict - SET 문서로 읽히면 원문 대신 doc 보관"""
+    doc = parse_document(text)
+    if doc is None:
+        return {"role": "assistant", "content": text, **extra}
+    return {"role": "assistant", "doc": doc, **extra}
+
+
+def message_content(msg) -> str:
+    """메시지 원문 (doc 메시지는 문서에서 복원)"""
+    doc = msg.get("doc")
+    if doc is not None:
+        return doc.markdown()
+    return msg.get("content") or ""
@@ -0,0 +1,135 @@
+"""
+LG Art Director System v5.9.0 - Streaming Response
+send_message(stream=True) 청크를 누적하면서 JSON 객체를 증분 추출하고 턴별 지연을 측정
+"""
+
+import time
+
+from response_parser import JsonStreamExtractor, strip_json
+
+
+class StreamAccumulator:
+    """스트리밍 청크 누적기 - 본문/JSON 분리와 TTFT·전체 지연 기록"""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._started = clock()
+        self._first_token_at = None
+        self._finished_at = None
+        self._extractor = JsonStreamExtractor()
+        self.chunks = 0
+
+    @property
+    def text(self) -> str:
+        return self._extractor.text
+
+    def feed(self, chunk_text: str) -> None:
+        """청크 하나를 누적 (JSON 객체는 도착하는 대로 증분 스캔)"""
+        if not chunk_text:
+            return
+        if self._first_token_at is None:
+            self._first_token_at = self._clock()
+        self._extractor.feed(chunk_text)
+        self.chunks += 1
+
+    def finish(self) -> None:
+        """스트림 종료 시각 기록"""
+        if self._finished_at is None:
+            self._finished_at = self._clock()
+
+    def parse(self):
+        """스트림에서 추출한 JSON 결과 (잘린 경우 복구 시도 포함)"""
+        return self._extractor.finish()
+
+    @property
+    def json_started(self) -> bool:
+        return self._extractor.started
+
+    @property
+    def json_closed(self) -> bool:
+        return self._extractor.result is not None
+
+    @property
+    def json_text(self) -> str:
+        """지금까지 도착한 JSON 본문 (닫히지 않았으면 부분 문자열)"""
+        start = self._extractor.start
+        if start is None:
+            return ""
+        return self.text[start:self._extractor.end].strip()
+
+    @property
+    def prose_text(self) -> str:
+        """JSON 블록을 제외한 본문"""
+        return strip_json(self.text, self._extractor.start, self._extractor.end)
+
+    @property
+    def ttft(self):
+        """첫 토큰까지 걸린 시간(초)"""
+        if self._first_token_at is None:
+            return None
+        return self._first_token_at - self._started
+
+    @property
+    def total(self):
+        """전체 응답 시간(초)"""
+        end = self._finished_at if self._finished_at is not None else self._clock()
+        return end - self._started
+
+    def metrics(self) -> dict:
+        ttft = self.ttft
+        return {
+            "ttft": round(ttft, 3) if ttft is not None else None,
+            "total": round(self.total, 3),
+            "chunks": self.chunks,
+        }
+
+
+def iter_chunk_text(response, on_usage=None):
+    """스트리밍 응답에서 텍스트 청크만 추출 (안전 필터 등으로 비어 있는 청크는 건너뜀)
+
+    on_usage를 주면 usage_metadata가 있는 청크마다 호출 (마지막 호출이 턴 전체 사용량)
+    """
+    for chunk in response:
+        if on_usage is not None and getattr(chunk, "usage_metadata", None) is not None:
+            on_usage(chunk)
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+        if text:
+            yield text
+
+
+def format_metrics(metrics) -> str:
+    """턴 지연 지표를 캡션용 문자열로 변환"""
+    if not metrics:
+        return ""
+    if metrics.get("reused_package") is not None:
+        text = f"📂 저장된 패키지 #{metrics['reused_package']} 불러옴 (생성 없음)"
+    else:
+        ttft = metrics.get("ttft")
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "-"
+        text = f"⏱️ 첫 토큰 {ttft_text} · 전체 {metrics.get('total', 0):.2f}s"
+    if metrics.get("cached"):
+        text += " · ♻️ 캐시 재사용"
+    if metrics.get("fanout_sets") is not None:
+        text += f" · 🔀 SET {metrics['fanout_sets']}개 병렬 (최장 {metrics.get('fanout_slowest', 0):.2f}s)"
+        if metrics.get("fanout_failed"):
+            text += " · ⚠️ 실패 " + ", ".join(f"SET {set_no:02d}" for set_no in metrics["fanout_failed"])
+    if metrics.get("anchor_repaired"):
+        text += " · 🧬 앵커 수정 " + ", ".join(f"SET {set_no:02d}" for set_no in metrics["anchor_repaired"])
+    if metrics.get("anchor_remaining"):
+        text += f" · ⚠️ 앵커 위반 {len(metrics['anchor_remaining'])}건"
+    if metrics.get("regenerated_sets"):
+        text += " · 🔄 재생성 " + ", ".join(f"SET {set_no:02d}" for set_no in metrics["regenerated_sets"])
+    if metrics.get("input_tokens_before") is not None:
+        text += f" · 입력 ~{metrics['input_tokens_before']:,}→{metrics['input_tokens_after']:,} 토큰"
+    if metrics.get("cost_usd") is not None:
+        text += f" · 💵 ~${metrics['cost_usd']:.4f}"
+    if metrics.get("prompt_tokens_saved"):
+        text += f" · ✂️ 시스템 프롬프트 -{metrics['prompt_tokens_saved']:,} 토큰"
+    if metrics.get("diversity_score") is not None:
+        text += f" · 📊 다양성 {metrics['diversity_score']}/100"
+        if metrics.get("plan_mismatches"):
+            text += f" (계획 불일치 {metrics['plan_mismatches']})"
+    return text
@@ -0,0 +1,162 @@
+"""
+LG Art Director System v5.9.0 - Structured Output Mode
+LG_Step1_Schema_v1_1.json에서 Gemini response_schema를 만들어 JSON mime-type 출력을 요청하고,
+결과를 기존 응답 형식(HEADER_JSON 펜스 + SET 본문)으로 되돌려 이후 단계가 그대로 동작하게 함
+
+벤치마크 (프로즈+JSON 모드와 토큰/시간 비교):
+    python structured_output.py --runs 3 --model gemini-2.5-flash
+    LGAD_FAKE_BACKEND=1 python structured_output.py --runs 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+from history import estimate_tokens
+from request_builder import (
+    GENERATION_CONFIG,
+    OUTPUT_MODE_JSON,
+    OUTPUT_MODE_JSON_PROSE,
+    OUTPUT_MODE_PROSE,
+    build_combined_prompt,
+    default_settings,
+)
+from response_parser import parse_result
+from schema_validator import STEP1_SCHEMA
+
+# Gemini response_schema(OpenAPI 부분집합)가 받는 키워드
+RESPONSE_SCHEMA_KEYWORDS = ("type", "description", "enum", "properties", "required", "items", "nullable")
+
+# 구조화 응답을 기존 형식으로 되돌릴 때 붙이는 머리말
+HEADER_LABEL = "[1️⃣ HEADER_JSON - Step 2/3 전달용]"
+
+# SET 본문까지 함께 받을 때의 래퍼 필드
+PROSE_FIELD = "sets_markdown"
+
+
+def derive_response_schema(schema) -> dict:
+    """JSON Schema → response_schema (pattern/minLength/allOf 등 미지원 키워드 제거)"""
+    derived = {}
+    for keyword in RESPONSE_SCHEMA_KEYWORDS:
+        if keyword not in schema:
+            continue
+        value = schema[keyword]
+        if keyword == "properties":
+            value = {key: derive_response_schema(sub) for key, sub in value.items()}
+        elif keyword == "items":
+            value = derive_response_schema(value)
+        derived[keyword] = value
+    return derived
+
+
+STEP1_RESPONSE_SCHEMA = derive_response_schema(STEP1_SCHEMA)
+
+# 헤더 + SET 본문(마크다운 문자열) 래퍼
+STEP1_WITH_PROSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "header": STEP1_RESPONSE_SCHEMA,
+        PROSE_FIELD: {"type": "string"},
+    },
+    "required": ["header", PROSE_FIELD],
+}
+
+
+def generation_overrides(output_mode) -> dict:
+    """send_message/generate_content에 넘길 생성 설정 덮어쓰기 (프로즈 모드는 빈 dict)"""
+    if output_mode == OUTPUT_MODE_JSON:
+        schema = STEP1_RESPONSE_SCHEMA
+    elif output_mode == OUTPUT_MODE_JSON_PROSE:
+        schema = STEP1_WITH_PROSE_SCHEMA
+    else:
+        return {}
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+
+def generation_config_for(output_mode) -> dict:
+    """출력 모드가 반영된 전체 생성 설정 (캐시 키 등에 사용)"""
+    return {**GENERATION_CONFIG, **generation_overrides(output_mode)}
+
+
+def to_response_text(raw, output_mode) -> str:
+    """구조화 응답 → 기존 응답 형식 (프로즈 모드이거나 파싱 실패면 원문 그대로)"""
+    if output_mode == OUTPUT_MODE_PROSE:
+        return raw
+    parsed, _ = parse_result(raw)
+    data = parsed.data
+    if not isinstance(data, dict):
+        return raw
+
+    prose = ""
+    if isinstance(data.get("header"), dict):
+        prose = str(data.get(PROSE_FIELD) or "").strip()
+        data = data["header"]
+
+    text = f"{HEADER_LABEL}\n```json\n{json.dumps(data, ensure_ascii=False, indent=2)}\n```"
+    return f"{text}\n\n{prose}" if prose else text
+
+
+def structured_fake_response(response_text, output_mode) -> str:
+    """가짜 백엔드용 - 샘플 응답을 구조화 출력 형태로 변환"""
+    parsed, prose = parse_result(response_text)
+    if output_mode == OUTPUT_MODE_JSON_PROSE:
+        return json.dumps({"header": parsed.data, PROSE_FIELD: prose}, ensure_ascii=False)
+    return json.dumps(parsed.data, ensure_ascii=False)
+
+
+def _output_tokens(response, text):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "candidates_token_count", None):
+        return usage.candidates_token_count
+    # 가짜 백엔드 등 사용량 정보가 없으면 추정치
+    return estimate_tokens(text)
+
+
+def benchmark(model_name, runs, direction, api_key=""):
+    """출력 모드별 (전체 시간, 출력 토큰, 파싱 성공률) 비교"""
+    from backend import get_backend
+    from prompt import current_prompt
+
+    backend = get_backend(api_key)
+    prompt_version = current_prompt()
+
+    def send(prompt, overrides):
+        return backend.generate(model_name, prompt_version, prompt, generation_config=overrides)
+
+    report = {}
+    for output_mode in (OUTPUT_MODE_PROSE, OUTPUT_MODE_JSON, OUTPUT_MODE_JSON_PROSE):
+        prompt = build_combined_prompt(default_settings(), direction, model_name, False, output_mode)
+        overrides = generation_overrides(output_mode)
+        times, tokens, parsed_ok = [], [], 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = send(prompt, overrides)
+            text = response.text or ""
+            times.append(time.perf_counter() - started)
+            tokens.append(_output_tokens(response, text))
+            parsed, _ = parse_result(to_response_text(text, output_mode))
+            parsed_ok += parsed.ok
+        report[output_mode] = {
+            "wall_p50": round(statistics.median(times), 3),
+            "output_tokens_p50": statistics.median(tokens),
+            "parse_ok": f"{parsed_ok}/{runs}",
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="출력 모드별 토큰/시간 벤치마크")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--direction", default="카멜 코트, 모던한 분위기, 미술관 프리오프닝 데이")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("GOOGLE_API_KEY", "").strip()
+    report = benchmark(args.model, args.runs, args.direction, api_key)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
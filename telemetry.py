@@ -0,0 +1,373 @@
+"""
+LG Art Director System v5.9.0 - Turn Telemetry
+턴별 토큰 사용량(입력/캐시/출력), 지연(TTFT/전체), 재시도, 파싱·검증 결과, 모델, 프롬프트 버전을
+SQLite 원장에 추가 전용으로 기록하고 프로젝트/모델별 합계·백분위수·예상 비용을 집계
+
+사용 예:
+    python telemetry.py                         # 프로젝트 × 모델별 요약
+    python telemetry.py --project LG-2026 --export ledger.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from render_cache import percentile
+
+# 원장 DB 위치 (환경변수로 변경 가능) / LGAD_TELEMETRY=0이면 기록하지 않음
+TELEMETRY_PATH_ENV = "LGAD_TELEMETRY_PATH"
+TELEMETRY_ENV = "LGAD_TELEMETRY"
+DEFAULT_TELEMETRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "telemetry.sqlite3")
+
+# 모델별 가격 (USD / 100만 토큰: 입력, 캐시된 입력, 출력) - 공개 가격표 기준, 바뀌면 여기만 수정
+# 가장 긴 접두사로 매칭하고, 목록에 없는 모델(latest 별칭 등)은 비용을 계산하지 않음
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.025, 0.40),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.075, 0.30),
+}
+
+# 기록 출처
+SOURCE_APP = "app"
+SOURCE_BATCH = "batch"
+
+# 턴 상태
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_BLOCKED = "blocked"
+
+# 원장 컬럼 (export 순서)
+LEDGER_FIELDS = (
+    "created_at",
+    "source",
+    "project_id",
+    "session_id",
+    "model",
+    "prompt_version",
+    "output_mode",
+    "status",
+    "prompt_tokens",
+    "cached_tokens",
+    "output_tokens",
+    "usage_reported",
+    "ttft",
+    "latency",
+    "retries",
+    "repairs",
+    "response_cached",
+    "json_parsed",
+    "schema_errors",
+    "cost_usd",
+    "error",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    output_mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    usage_reported INTEGER NOT NULL,
+    ttft REAL,
+    latency REAL NOT NULL,
+    retries INTEGER NOT NULL,
+    repairs INTEGER NOT NULL,
+    response_cached INTEGER NOT NULL,
+    json_parsed INTEGER NOT NULL,
+    schema_errors INTEGER NOT NULL,
+    cost_usd REAL,
+    error TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_project ON turns (project_id, created_at);
+"""
+
+# 응답 usage_metadata 필드 → 원장 필드
+_USAGE_FIELDS = (
+    ("prompt_token_count", "prompt_tokens"),
+    ("cached_content_token_count", "cached_tokens"),
+    ("candidates_token_count", "output_tokens"),
+)
+
+
+def telemetry_enabled() -> bool:
+    return os.getenv(TELEMETRY_ENV, "").strip().lower() not in ("0", "false", "no", "off")
+
+
+def read_usage(response):
+    """응답(또는 스트리밍 청크)의 usage_metadata → {prompt_tokens, cached_tokens, output_tokens} (없으면 None)"""
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return None
+    return {field: int(getattr(metadata, name, 0) or 0) for name, field in _USAGE_FIELDS}
+
+
+def add_usage(total, usage) -> dict:
+    """여러 호출(재시도, 스키마 수정 요청)의 사용량 누적 - total을 갱신해서 반환"""
+    if usage:
+        for field in ("prompt_tokens", "cached_tokens", "output_tokens"):
+            total[field] = total.get(field, 0) + usage.get(field, 0)
+    return total
+
+
+def model_price(model_name):
+    """가장 긴 접두사가 일치하는 모델 가격 (입력, 캐시 입력, 출력) 또는 None"""
+    matches = [prefix for prefix in MODEL_PRICES if (model_name or "").startswith(prefix)]
+    if not matches:
+        return None
+    return MODEL_PRICES[max(matches, key=len)]
+
+
+def estimate_cost(model_name, prompt_tokens, cached_tokens, output_tokens):
+    """예상 비용(USD) - 캐시된 입력은 캐시 단가, 나머지 입력은 일반 단가"""
+    price = model_price(model_name)
+    if price is None:
+        return None
+    input_price, cached_price, output_price = price
+    fresh = max(0, prompt_tokens - cached_tokens)
+    cost = fresh * input_price + cached_tokens * cached_price + output_tokens * output_price
+    return round(cost / 1_000_000, 6)
+
+
+def make_entry(
+    source,
+    model,
+    prompt_version="",
+    project_id="",
+    session_id="",
+    output_mode="",
+    status=STATUS_OK,
+    usage=None,
+    ttft=None,
+    latency=0.0,
+    retries=0,
+    repairs=0,
+    response_cached=False,
+    json_parsed=False,
+    schema_errors=0,
+    error="",
+    created_at=None,
+) -> dict:
+    """원장 한 줄 - usage가 없으면(캐시 재사용, 차단, API가 보고하지 않음) 토큰 0과 usage_reported=0"""
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    cached_tokens = usage.get("cached_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    return {
+        "created_at": created_at if created_at is not None else time.time(),
+        "source": source,
+        "project_id": project_id or "",
+        "session_id": session_id or "",
+        "model": model or "",
+        "prompt_version": prompt_version or "",
+        "output_mode": output_mode or "",
+        "status": status,
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "output_tokens": output_tokens,
+        "usage_reported": int(bool(usage)),
+        "ttft": round(ttft, 3) if ttft is not None else None,
+        "latency": round(latency or 0.0, 3),
+        "retries": retries,
+        "repairs": repairs,
+        "response_cached": int(bool(response_cached)),
+        "json_parsed": int(bool(json_parsed)),
+        "schema_errors": schema_errors,
+        "cost_usd": estimate_cost(model, prompt_tokens, cached_tokens, output_tokens) if usage else None,
+        "error": error or "",
+    }
+
+
+def batch_entry(record, project_id="") -> dict:
+    """batch.run_row 결과 레코드 → 원장 한 줄"""
+    settings = record.get("settings") or {}
+    return make_entry(
+        SOURCE_BATCH,
+        record.get("model", ""),
+        prompt_version=(record.get("prompt_slice") or {}).get("version") or record.get("prompt_version", ""),
+        project_id=project_id or settings.get("project_id", ""),
+        session_id=str(record.get("row_id", "")),
+        output_mode=record.get("output_mode", ""),
+        status=record.get("status", STATUS_ERROR),
+        usage=record.get("usage"),
+        latency=(record.get("timings") or {}).get("generate", 0.0),
+        retries=max(0, record.get("attempts", 1) - 1),
+        repairs=record.get("repairs", 0),
+        json_parsed=isinstance(record.get("json"), dict),
+        schema_errors=len(record.get("schema_errors") or []),
+        error=record.get("error", ""),
+    )
+
+
+def summarize_entries(entries) -> dict:
+    """원장 줄 목록 → 턴 수, 토큰/비용 합계, 지연·TTFT p50/p95, 파싱/검증 성공률"""
+    latencies = [entry["latency"] for entry in entries if entry["status"] == STATUS_OK]
+    ttfts = [entry["ttft"] for entry in entries if entry["ttft"] is not None]
+    costs = [entry["cost_usd"] for entry in entries if entry["cost_usd"] is not None]
+    completed = [entry for entry in entries if entry["status"] == STATUS_OK]
+    return {
+        "turns": len(entries),
+        "errors": sum(1 for entry in entries if entry["status"] == STATUS_ERROR),
+        "prompt_tokens": sum(entry["prompt_tokens"] for entry in entries),
+        "cached_tokens": sum(entry["cached_tokens"] for entry in entries),
+        "output_tokens": sum(entry["output_tokens"] for entry in entries),
+        "cost_usd": round(sum(costs), 4) if costs else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "ttft_p50": percentile(ttfts, 50),
+        "ttft_p95": percentile(ttfts, 95),
+        "retries": sum(entry["retries"] for entry in entries),
+        "json_ok_rate": (
+            round(sum(entry["json_parsed"] for entry in completed) / len(completed), 3) if completed else None
+        ),
+        "schema_ok_rate": (
+            round(sum(1 for entry in completed if not entry["schema_errors"]) / len(completed), 3)
+            if completed
+            else None
+        ),
+    }
+
+
+class TelemetryLedger:
+    """추가 전용 SQLite 턴 원장 (모든 Streamlit 세션과 배치 워커가 공유)"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv(TELEMETRY_PATH_ENV, "").strip() or DEFAULT_TELEMETRY_PATH
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def record(self, entry) -> None:
+        columns = ", ".join(LEDGER_FIELDS)
+        placeholders = ", ".join("?" for _ in LEDGER_FIELDS)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO turns ({columns}) VALUES ({placeholders})",
+                [entry[field] for field in LEDGER_FIELDS],
+            )
+
+    def entries(self, project_id=None, since=None) -> list:
+        """원장 줄 목록 (오래된 순) - project_id/since(epoch 초)로 거르기"""
+        clauses, params = [], []
+        if project_id is not None:
+            clauses.append("project_id = ?")
+            params.append(project_id)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(LEDGER_FIELDS)} FROM turns{where} ORDER BY id",
+                params,
+            ).fetchall()
+        return [dict(zip(LEDGER_FIELDS, row)) for row in rows]
+
+    def summary(self, project_id=None, since=None, by=("project_id", "model")) -> list:
+        """by 컬럼 조합별 집계 행 목록 (모델 간 비용/지연 비교용)"""
+        groups = {}
+        for entry in self.entries(project_id, since):
+            groups.setdefault(tuple(entry[field] for field in by), []).append(entry)
+        return [
+            {**dict(zip(by, key)), **summarize_entries(entries)}
+            for key, entries in sorted(groups.items())
+        ]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM turns")
+
+
+def export_csv(entries) -> str:
+    """원장 줄 → CSV 문자열"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=LEDGER_FIELDS)
+    writer.writeheader()
+    writer.writerows(entries)
+    return buffer.getvalue()
+
+
+def export_jsonl(entries) -> str:
+    return "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+
+
+_default_ledger = None
+_default_lock = threading.Lock()
+
+
+def get_ledger() -> TelemetryLedger:
+    """프로세스 공용 원장"""
+    global _default_ledger
+    with _default_lock:
+        if _default_ledger is None:
+            _default_ledger = TelemetryLedger()
+        return _default_ledger
+
+
+def record_turn(entry) -> None:
+    """원장에 한 줄 기록 - 비활성화됐거나 기록에 실패해도 생성 흐름은 막지 않음"""
+    if not telemetry_enabled():
+        return
+    try:
+        get_ledger().record(entry)
+    except sqlite3.Error:
+        pass
+
+
+def format_summary(row) -> str:
+    """집계 행 → 한 줄 요약"""
+    cost = f"${row['cost_usd']:.4f}" if row["cost_usd"] is not None else "-"
+    latency = f"{row['latency_p50']:.1f}/{row['latency_p95']:.1f}s" if row["latency_p50"] is not None else "-"
+    ttft = f"{row['ttft_p50']:.2f}/{row['ttft_p95']:.2f}s" if row["ttft_p50"] is not None else "-"
+    return (
+        f"{row['turns']}턴 (오류 {row['errors']}) · 입력 {row['prompt_tokens']:,} (캐시 {row['cached_tokens']:,}) · "
+        f"출력 {row['output_tokens']:,} 토큰 · {cost} · 지연 p50/p95 {latency} · TTFT {ttft}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="턴별 사용량/비용 원장 요약")
+    parser.add_argument("--project", default=None, help="이 project_id만")
+    parser.add_argument("--days", type=float, default=None, help="최근 N일만")
+    parser.add_argument("--by", default="project_id,model", help="집계 기준 컬럼 (쉼표 구분)")
+    parser.add_argument("--export", default="", help="원장 내보내기 경로 (.csv 또는 .jsonl)")
+    args = parser.parse_args(argv)
+
+    ledger = get_ledger()
+    since = time.time() - args.days * 86400 if args.days else None
+    if args.export:
+        entries = ledger.entries(args.project, since)
+        content = export_jsonl(entries) if args.export.endswith(".jsonl") else export_csv(entries)
+        with open(args.export, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        print(f"{len(entries)}턴 내보냄 → {args.export}")
+        return
+
+    by = tuple(field.strip() for field in args.by.split(",") if field.strip())
+    unknown = [field for field in by if field not in LEDGER_FIELDS]
+    if unknown:
+        raise SystemExit(f"알 수 없는 컬럼: {', '.join(unknown)}")
+    for row in ledger.summary(args.project, since, by):
+        label = " / ".join(str(row[field]) or "-" for field in by)
+        print(f"{label}: {format_summary(row)}")
+
+
+if __name__ == "__main__":
+    main()
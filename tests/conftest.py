@@ -0,0 +1,56 @@
+"""
+LG Art Director System v5.9.0 - Test Fixtures
+저장소 루트를 import 경로에 넣고 가짜 백엔드(지연 없음) + 임시 SQLite/로그 경로로 오프라인 실행
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 모듈 import 전에 설정해야 프로세스 공용 싱글턴이 임시 경로를 씀
+_STATE_DIR = tempfile.mkdtemp(prefix="lgad-tests-")
+os.environ.update(
+    {
+        "LGAD_FAKE_BACKEND": "1",
+        "LGAD_FAKE_LATENCY": "0",
+        "LGAD_FAKE_TOKEN_RATE": "0",
+        "LGAD_FAKE_ERROR_RATE": "0",
+        "LGAD_INPUT_GATE_LOG": "0",
+        "LGAD_JOBS_PATH": os.path.join(_STATE_DIR, "jobs.sqlite3"),
+        "LGAD_TELEMETRY_PATH": os.path.join(_STATE_DIR, "telemetry.sqlite3"),
+        "LGAD_RESPONSE_CACHE_PATH": os.path.join(_STATE_DIR, "responses.sqlite3"),
+        "LGAD_MODEL_CATALOG_PATH": os.path.join(_STATE_DIR, "model_catalog.json"),
+        "LGAD_PACKAGE_STORE_PATH": os.path.join(_STATE_DIR, "packages.sqlite3"),
+    }
+)
+
+
+@pytest.fixture
+def package_store(tmp_path, monkeypatch):
+    """테스트마다 빈 패키지 저장소 (get_package_store()도 이 저장소를 돌려줌)"""
+    import package_store as module
+
+    store = module.PackageStore(str(tmp_path / "packages.sqlite3"))
+    monkeypatch.setattr(module, "_store", store)
+    return store
+
+
+@pytest.fixture
+def make_settings():
+    """default_settings() + 덮어쓸 값 (target_date는 고정해 시즌/계획이 매번 같음)"""
+    from datetime import date
+
+    from request_builder import default_settings
+
+    def make(**values):
+        settings = default_settings()
+        settings["target_date"] = date(2026, 10, 1)
+        settings.update(values)
+        return settings
+
+    return make
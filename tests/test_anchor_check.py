@@ -0,0 +1,90 @@
+from anchor_check import AnchorIndex, check_document, repair_anchors
+from backend import synthesize_response
+from batch import RateLimiter, make_generator, run_row
+from cast_planner import CAST_MODE_LOOKBOOK, plan_for_settings
+from prompt import current_prompt
+from request_builder import build_combined_prompt
+from set_document import parse_document
+
+MODEL = "gemini-2.5-flash"
+
+
+def _package(settings):
+    prompt = build_combined_prompt(settings, "", MODEL, False)
+    return prompt, parse_document(synthesize_response(prompt))
+
+
+def _combos(doc):
+    return {frozenset(entry.anchors) for entry in doc.sets}
+
+
+def test_distinct_sets_pass(make_settings):
+    _, doc = _package(make_settings())
+    report = check_document(doc, lookbook=False)
+    assert report.ok, report.issues
+    assert len(_combos(doc)) == 10
+
+
+def test_duplicate_set_is_repaired_alone(make_settings):
+    settings = make_settings()
+    prompt, doc = _package(settings)
+    doc.replace_set(parse_document(doc.markdown().replace(
+        doc.get(3).field("anchor"), doc.get(2).field("anchor"))).get(3))
+    report = check_document(doc, lookbook=False)
+    assert report.sets == [3]
+
+    calls = []
+
+    def generate_set(set_prompt):
+        calls.append(set_prompt)
+        return synthesize_response(set_prompt)
+
+    repaired, failed = repair_anchors(doc, report, generate_set, prompt, plan_for_settings(settings))
+    assert (repaired, failed) == ([3], {})
+    assert len(calls) == 1
+    assert check_document(doc, lookbook=False).ok
+
+
+def test_lookbook_from_settings_without_header_cast_mode(make_settings):
+    # HEADER_JSON cast_mode는 선택 키 - 호출 쪽이 설정으로 룩북을 알려야 SET 02~10을 중복으로 보지 않음
+    _, doc = _package(make_settings(cast_mode=CAST_MODE_LOOKBOOK))
+    doc.header.pop("cast_mode", None)
+    assert len(_combos(doc)) == 1
+    assert check_document(doc, lookbook=True).ok
+    assert check_document(doc, lookbook=False).sets == list(range(2, 11))
+
+
+def test_fake_lookbook_header_marks_cast_mode(make_settings):
+    _, doc = _package(make_settings(cast_mode=CAST_MODE_LOOKBOOK))
+    assert doc.header["cast_mode"] == CAST_MODE_LOOKBOOK
+    assert check_document(doc).ok
+
+
+def test_lookbook_reused_anchor_moves_every_set(make_settings):
+    # 다른 패키지가 쓴 SET 01 조합이면 새 조합을 골라 모든 세트가 함께 바꿔야 단일 모델 정체성이 유지됨
+    settings = make_settings(cast_mode=CAST_MODE_LOOKBOOK)
+    prompt, doc = _package(settings)
+    original = frozenset(doc.get(1).anchors)
+    index = AnchorIndex()
+    index.add(settings["project_id"], [frozenset(original)])
+    report = check_document(doc, lookbook=True, index=index, project_id=settings["project_id"])
+    assert report.sets == [1]
+
+    repaired, failed = repair_anchors(doc, report, synthesize_response, prompt, plan_for_settings(settings), index,
+                                      settings["project_id"])
+    assert failed == {}
+    assert repaired == list(range(1, 11))
+    combos = _combos(doc)
+    assert len(combos) == 1 and combos != {original}
+    assert set(doc.header["biometric_ids"]) == set(doc.get(1).anchors)
+
+
+def test_batch_lookbook_row_keeps_shared_anchor(make_settings):
+    settings = make_settings(cast_mode=CAST_MODE_LOOKBOOK)
+    generate = make_generator("", MODEL, current_prompt())
+    for fanout in (False, True):
+        record = run_row(generate, RateLimiter(0), "lb", settings, "", MODEL, 0, fanout=fanout,
+                         anchor_index=AnchorIndex())
+        assert record["status"] == "ok"
+        assert record["anchors"] == {"issues": []}
+        assert len({tuple(entry["anchors"]) for entry in record["sets"]}) == 1
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from batch import load_completed, regenerate_results, run_batch
+
+ROWS = [
+    {"row_id": "r1", "region": "EU", "cast_mode": "MULTI"},
+    {"row_id": "r2", "region": "LATAM", "cast_mode": "SINGLE"},
+    {"row_id": "r3", "region": "EU", "cast_mode": "SINGLE_MODEL_LOOKBOOK"},
+]
+
+
+def _quiet(*args):
+    pass
+
+
+def _records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {record["row_id"]: record for record in map(json.loads, f)}
+
+
+def _batch(rows, path, **options):
+    return run_batch(rows, "카멜 코트", str(path), rpm=0, workers=2, log=_quiet, **options)
+
+
+@pytest.fixture
+def results(tmp_path, package_store):
+    path = tmp_path / "results.jsonl"
+    assert _batch(ROWS, path) == (3, 0, 0)
+    return path
+
+
+def test_resume_skips_completed_rows(tmp_path, package_store):
+    path = tmp_path / "results.jsonl"
+    path.write_text(json.dumps({"row_id": "r3", "status": "error", "error": "timeout"}) + "\n", encoding="utf-8")
+
+    assert _batch(ROWS[:2], path) == (2, 0, 0)
+    assert load_completed(str(path)) == {"r1", "r2"}
+    assert _batch(ROWS, path) == (1, 0, 2)
+    assert load_completed(str(path)) == {"r1", "r2", "r3"}
+    assert _batch(ROWS, path) == (0, 0, 3)
+
+
+def test_results_are_stored(results, package_store):
+    records = _records(results)
+    for record in records.values():
+        assert record["status"] == "ok" and len(record["sets"]) == 10
+        stored = package_store.find(record["package_key"])
+        assert stored["id"] == record["package_id"]
+        assert stored["response"] == record["raw"]
+
+
+def test_reuse_packages_skips_generation(results, tmp_path, package_store):
+    reused_path = tmp_path / "reused.jsonl"
+    assert _batch(ROWS, reused_path, reuse_packages=True) == (3, 0, 0)
+
+    original = _records(results)
+    for row_id, record in _records(reused_path).items():
+        assert record["reused_package"] == original[row_id]["package_id"]
+        assert record["raw"] == original[row_id]["raw"]
+        assert record["attempts"] == 0
+
+
+def test_regenerate_updates_result_and_store(results, package_store):
+    before = _records(results)
+    assert regenerate_results(str(results), 3, row_ids={"r2"}, note="조명을 더 밝게", log=_quiet) == (1, 0)
+
+    records = _records(results)
+    after = records["r2"]
+    assert after["regenerated"][-1]["set"] == 3
+    assert after["raw"] != before["r2"]["raw"]
+    assert after["sets"][3:] == before["r2"]["sets"][3:] and after["sets"][:2] == before["r2"]["sets"][:2]
+    assert records["r1"] == before["r1"]
+
+    # --reuse-packages가 옛 SET 03을 쓰지 않도록 저장소도 갱신
+    assert package_store.find(after["package_key"])["response"] == after["raw"]
+
+
+def test_regenerate_refuses_other_prompt_version(results, package_store):
+    records = _records(results)
+    records["r1"]["prompt_version"] = "5.9.0-old"
+    results.write_text("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records.values()), encoding="utf-8")
+
+    assert regenerate_results(str(results), 2, row_ids={"r1"}, log=_quiet) == (0, 1)
+    assert "regenerated" not in _records(results)["r1"]
+
+    assert regenerate_results(str(results), 2, row_ids={"r1"}, allow_prompt_change=True, log=_quiet) == (1, 0)
+    record = _records(results)["r1"]
+    assert record["regenerated"][-1]["previous_prompt_version"] == "5.9.0-old"
+    assert record["prompt_version"] != "5.9.0-old"
+    assert package_store.find(record["package_key"])["response"] == record["raw"]
@@ -0,0 +1,24 @@
+from cast_planner import CAST_MODE_LOOKBOOK
+from prompt import current_prompt, request_tags, slice_prompt
+
+
+def _dropped(settings, texts=()):
+    _, report = slice_prompt(current_prompt(), settings, texts, enabled=True)
+    return report.dropped
+
+
+def test_lookbook_setting_keeps_lookbook_rules(make_settings):
+    dropped = _dropped(make_settings(cast_mode=CAST_MODE_LOOKBOOK), ["카멜 코트, 모던한 분위기"])
+    assert "§1.1B" not in dropped
+    assert "§1.1A" in dropped
+    assert "mode:LOOKBOOK" in request_tags({"cast_mode": CAST_MODE_LOOKBOOK})
+
+
+def test_sections_follow_settings_and_triggers(make_settings):
+    single = _dropped(make_settings(region="EU", cast_mode="SINGLE"), ["카멜 코트"])
+    assert {"§1.1A", "§1.1B", "§4.3", "§8.4"} <= set(single)
+    assert "§4.1" not in single
+
+    assert "§1.1B" not in _dropped(make_settings(cast_mode="SINGLE"), ["한 명으로 룩북 촬영"])
+    assert "§1.1A" not in _dropped(make_settings(cast_mode="SINGLE"), ["가족 화보"])
+    assert "§1.1A" not in _dropped(make_settings(cast_mode="MULTI"), ["카멜 코트"])
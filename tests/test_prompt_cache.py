@@ -0,0 +1,116 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import prompt_cache
+
+
+class FakeCacheClient:
+    """create/update 호출을 세고, gate가 있으면 열릴 때까지 업로드를 붙잡음"""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.created = 0
+        self.updated = 0
+
+    def create_cached_content(self, request):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.created += 1
+        return SimpleNamespace(name=f"cachedContents/{self.created}", model=request.cached_content.model)
+
+    def update_cached_content(self, request):
+        self.updated += 1
+
+
+def _clients(fingerprint, gate=None):
+    return SimpleNamespace(fingerprint=fingerprint, cache=FakeCacheClient(gate), generative=object())
+
+
+@pytest.fixture(autouse=True)
+def _clear():
+    prompt_cache.clear_prompt_cache()
+    yield
+    prompt_cache.clear_prompt_cache()
+
+
+def _acquire(clients, prompt="system"):
+    key = prompt_cache._cache_key("gemini-2.5-flash", prompt, clients.fingerprint)
+    return prompt_cache._acquire_cached_content(clients, key, "gemini-2.5-flash", prompt)
+
+
+def test_create_then_hit():
+    clients = _clients("a")
+    assert _acquire(clients)[1] == "created"
+    assert _acquire(clients)[1] == "hit"
+    assert clients.cache.created == 1
+
+
+def test_slow_upload_does_not_block_other_keys():
+    warm = _clients("warm")
+    _acquire(warm)
+    gate = threading.Event()
+    slow = _clients("slow", gate)
+    worker = threading.Thread(target=_acquire, args=(slow,))
+    worker.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    assert _acquire(warm)[1] == "hit"
+    assert _acquire(_clients("other"))[1] == "created"
+    assert time.perf_counter() - started < 1
+    gate.set()
+    worker.join()
+
+
+def test_same_key_uploads_once():
+    gate = threading.Event()
+    clients = _clients("a", gate)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(_acquire(clients)[1])) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.05)
+    gate.set()
+    for worker in workers:
+        worker.join()
+    assert clients.cache.created == 1
+    assert sorted(results) == ["created", "hit", "hit", "hit"]
+
+
+def test_refresh_near_expiry():
+    clients = _clients("a")
+    _acquire(clients)
+    key = prompt_cache._cache_key("gemini-2.5-flash", "system", "a")
+    prompt_cache._entries[key]["expires_at"] = prompt_cache._now() + prompt_cache.REFRESH_MARGIN / 2
+    assert _acquire(clients)[1] == "refreshed"
+    assert clients.cache.updated == 1
+    assert _acquire(clients)[1] == "hit"
+
+
+def test_unsupported_falls_back_inline():
+    clients = _clients("a")
+    clients.cache.create_cached_content = lambda request: (_ for _ in ()).throw(RuntimeError("unsupported"))
+    assert _acquire(clients) == (None, "inline")
+    assert _acquire(clients) == (None, "inline")
+
+
+def test_cached_model_uses_key_client_and_cache():
+    clients = _clients("a")
+    model, status = prompt_cache.get_cached_model(clients, "gemini-2.5-flash", None, "system")
+    assert status == "created"
+    assert model._client is clients.generative
+    assert model.cached_content == "cachedContents/1"
+
+
+def test_bind_fails_loudly_when_sdk_attributes_change():
+    with pytest.raises(RuntimeError):
+        prompt_cache._bind(SimpleNamespace(), _clients("a"))
+
+    class NoCacheProperty:
+        _client = None
+        cached_content = None
+
+    with pytest.raises(RuntimeError):
+        prompt_cache._bind(NoCacheProperty(), _clients("a"), "cachedContents/1")
@@ -0,0 +1,65 @@
+import json
+
+from backend import synthesize_response
+from request_builder import build_combined_prompt
+from response_parser import extract_json, parse_result
+from schema_validator import repair_response, validate_step1
+
+MODEL = "gemini-2.5-flash"
+
+
+def _response(settings):
+    return synthesize_response(build_combined_prompt(settings, "카멜 코트", MODEL, False))
+
+
+def test_fake_response_parses_and_validates(make_settings):
+    raw = _response(make_settings())
+    result, text = parse_result(raw)
+    assert result.ok and not result.repairs
+    assert validate_step1(result.data) == []
+    assert '"schema_version"' not in text
+    assert "## SET 01" in text
+
+
+def test_syntax_and_truncation_repairs():
+    result = extract_json('설명 ```json\n{"a": 1, "b": [True, None,],}\n``` 끝')
+    assert result.data == {"a": 1, "b": [True, None]}
+    assert result.repairs == ("trailing_comma", "python_literal")
+
+    result = extract_json('head {"a": {"b": [1, 2')
+    assert result.data == {"a": {"b": [1, 2]}}
+    assert result.truncated
+
+    result = extract_json("JSON 없음")
+    assert not result.ok
+    assert result.error["line"] == 1
+
+
+def test_repair_response_splices_fixed_header(make_settings):
+    raw = _response(make_settings()).replace('"age": 35,', '"age": "35",', 1)
+    parsed, _ = parse_result(raw)
+    errors = validate_step1(parsed.data)
+    assert [error.path for error in errors] == ["fixed.age"]
+
+    prompts = []
+
+    def send(prompt):
+        prompts.append(prompt)
+        data = dict(parsed.data, fixed=dict(parsed.data["fixed"], age=35))
+        return "```json\n" + json.dumps(data, ensure_ascii=False) + "\n```"
+
+    text, repaired, remaining = repair_response(send, raw, parsed, errors)
+    assert len(prompts) == 1 and "fixed.age" in prompts[0]
+    assert remaining == []
+    assert repaired.data["fixed"]["age"] == 35
+    assert text.split("## SET 01", 1)[1] == raw.split("## SET 01", 1)[1]
+
+
+def test_repair_response_keeps_original_when_not_better(make_settings):
+    raw = _response(make_settings()).replace('"age": 35,', '"age": "35",', 1)
+    parsed, _ = parse_result(raw)
+    errors = validate_step1(parsed.data)
+
+    text, repaired, remaining = repair_response(lambda prompt: "수정 불가", raw, parsed, errors)
+    assert text == raw
+    assert remaining == errors
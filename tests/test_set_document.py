@@ -0,0 +1,60 @@
+from backend import synthesize_response
+from request_builder import build_combined_prompt
+from response_parser import parse_result, strip_json
+from set_document import assistant_message, message_content, parse_document, parse_set
+
+MODEL = "gemini-2.5-flash"
+
+
+def _raw(settings):
+    raw = synthesize_response(build_combined_prompt(settings, "카멜 코트", MODEL, False))
+    return raw + "\n\n## NEGATIVE\n```\nblurry, watermark\n```\n"
+
+
+def test_round_trip(make_settings):
+    raw = _raw(make_settings())
+    doc = parse_document(raw)
+    assert doc.markdown() == raw
+    assert [entry.number for entry in doc.sets] == list(range(1, 11))
+    assert doc.header["project_id"] == make_settings()["project_id"]
+    assert doc.negative == "blurry, watermark"
+
+    result, text = parse_result(raw)
+    assert doc.prose() == strip_json(raw, result.start, result.end).strip()
+
+    message = assistant_message(raw)
+    assert message["doc"] is not None and message_content(message) == raw
+
+
+def test_set_fields(make_settings):
+    entry = parse_document(_raw(make_settings())).get(1)
+    data = entry.to_dict()
+    assert data["set"] == 1
+    assert data["anchors"] == list(entry.anchors) and entry.anchors
+    assert entry.prompt("image1")
+    assert entry.prompt("unknown") is None
+
+
+def test_replace_set_keeps_other_sets(make_settings):
+    raw = _raw(make_settings())
+    doc = parse_document(raw)
+    old = "\n".join(doc.get(3).content_lines())
+    new = parse_set(old.replace(doc.get(3).title, "Replaced Title"), 3)
+    assert new is not None and parse_set(old, 4) is None
+
+    doc.replace_set(new)
+    assert doc.get(3).title == "Replaced Title"
+    assert doc.markdown() == raw.replace(old, old.replace(parse_document(raw).get(3).title, "Replaced Title"))
+
+
+def test_update_header_and_invalid_documents(make_settings):
+    raw = _raw(make_settings())
+    doc = parse_document(raw)
+    doc.update_header(batch_n=2)
+    reparsed = parse_document(doc.markdown())
+    assert reparsed.header["batch_n"] == 2
+    assert [entry.markdown_lines() for entry in reparsed.sets] == [entry.markdown_lines() for entry in doc.sets]
+
+    assert parse_document("## SET 01 [TYPICAL] - 헤더 없음") is None
+    assert parse_document(raw.split("## SET 01", 1)[0]) is None
+    assert assistant_message("일반 답변") == {"role": "assistant", "content": "일반 답변"}